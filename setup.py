@@ -30,6 +30,9 @@ setup(
         'huobi_restful @ git+ssh://git@github.com/firefirer1983/huobi_restful.git@main#egg=huobi_restful',
         'SQLAlchemy==1.3.20',
     ],
+    extras_require={
+        'backtest': ['numpy', 'scipy'],
+    },
     dependency_links=[
         'git+ssh://git@github.com/firefirer1983/huobi_restful.git@main#egg=huobi_restful'
     ]
@@ -0,0 +1,138 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+
+from zolo.adapters import Adapter
+from zolo.consts import BUY, SELL, LONG
+from zolo.dtypes import Credential, Order, OrderStatus, Lot, Timer
+from zolo.hub import evt_hub
+from zolo.orders import OrderAggregator
+from zolo.posts import MarketOrder, LimitOrder, LimitIocOrder
+
+TS = datetime(2021, 1, 1)
+
+
+class FakeAdapter:
+    def __init__(self, fill_ratio=1.0):
+        self.credential = Credential("key", "secret", "")
+        self.batches = list()
+        self.posts = dict()
+        self.fill_ratio = fill_ratio
+        self.polled = 0
+
+    def estimate_lot(self, instrument_id, size, price=0):
+        return Lot(int(size))
+
+    def create_orders(self, posts):
+        self.batches.append(posts)
+        res = list()
+        for post in posts:
+            oid = f"ex{len(self.posts)}"
+            self.posts[oid] = post
+            res.append(oid)
+        return res
+
+    def get_order_by_client_oid(self, instrument_id, client_oid):
+        self.polled += 1
+        post = self.posts[client_oid]
+        filled = int(post.qty * self.fill_ratio)
+        state = OrderStatus.FULFILLED if filled == post.qty else \
+            OrderStatus.PARTIAL_FILED_OTHER_CANCELED
+        return Order(post.exchange, post.market, post.side, post.pos_side,
+                     post.qty, instrument_id, client_oid, post.order_type, 1,
+                     price=100.0, fee=float(filled), state=state,
+                     filled=filled)
+
+
+def market(side, qty):
+    return MarketOrder("huobi", "swap@coin", "BTC-USD", side, LONG, Lot(qty))
+
+
+def test_merge_market_orders_pro_rata():
+    adapter, agg, got = FakeAdapter(), OrderAggregator(0.5), list()
+    oids = [
+        agg.submit(adapter, market(BUY, qty), TS, got.append).client_oid
+        for qty in (1, 2, 3)
+    ]
+    agg.refresh(TS + timedelta(seconds=0.1))
+    assert not adapter.batches
+    agg.refresh(TS + timedelta(seconds=0.5))
+    assert len(adapter.batches) == 1
+    assert [int(post.qty) for post in adapter.batches[0]] == [6]
+    assert [(o.client_oid, o.qty, o.fee) for o in got] == \
+        list(zip(oids, (1, 2, 3), (1, 2, 3)))
+    assert all(o.state == OrderStatus.FULFILLED for o in got)
+    assert agg.is_routed("ex0") and not agg.pending
+
+
+def test_partial_fill_allocation():
+    adapter, agg = FakeAdapter(fill_ratio=0.5), OrderAggregator(0)
+    oids = [
+        agg.submit(adapter, market(SELL, qty), TS).client_oid
+        for qty in (3, 3, 4)
+    ]
+    agg.refresh(TS)
+    orders = [agg.get_order(oid) for oid in oids]
+    assert sum(o.qty for o in orders) == 5
+    assert all(o.state == OrderStatus.PARTIAL_FILED_OTHER_CANCELED
+               for o in orders)
+
+
+def test_batch_distinct_orders():
+    adapter, agg = FakeAdapter(), OrderAggregator(0)
+    limit = LimitIocOrder("huobi", "swap@coin", "BTC-USD", BUY, LONG, 100,
+                          Lot(1), 0)
+    agg.submit(adapter, limit, TS)
+    agg.submit(adapter, replace(limit, qty=Lot(2)), TS)
+    agg.submit(adapter, replace(limit, price=99), TS)
+    agg.submit(adapter, market(SELL, 1), TS)
+    agg.refresh(TS)
+    # 同价限价单合并, 不同价格同一批提交, 方向不同分开
+    sizes = sorted(
+        [(post.side, getattr(post, "price", 0), int(post.qty))
+         for post in batch] for batch in adapter.batches
+    )
+    assert sizes == [[(BUY, 100, 3), (BUY, 99, 1)], [(SELL, 0, 1)]]
+
+
+class FlakyAdapter(FakeAdapter):
+    # 默认的逐笔 create_orders, 第二笔下单失败
+    create_orders = Adapter.create_orders
+
+    def create_order(self, post):
+        if post.side == SELL:
+            raise ConnectionError
+        return FakeAdapter.create_orders(self, [post])[0]
+
+
+def test_partial_batch_failure():
+    adapter, agg = FlakyAdapter(), OrderAggregator(0)
+    buy = agg.submit(adapter, market(BUY, 1), TS).client_oid
+    limit = LimitIocOrder("huobi", "swap@coin", "BTC-USD", SELL, LONG, 100,
+                          Lot(1), 0)
+    sell = agg.submit(adapter, limit, TS).client_oid
+    agg.refresh(TS)
+    # 已提交的买单正常分配, 只有失败的卖单标记为 FAIL
+    assert agg.get_order(buy).state == OrderStatus.FULFILLED
+    assert agg.get_order(sell).state == OrderStatus.FAIL
+
+
+def test_only_immediate_orders():
+    agg = OrderAggregator(0)
+    limit = LimitOrder("huobi", "swap@coin", "BTC-USD", BUY, LONG, 100,
+                       Lot(1), 0)
+    assert not agg.accepts(limit)
+    with pytest.raises(AssertionError):
+        agg.submit(FakeAdapter(), limit, TS)
+
+
+def test_poll_once_per_timer():
+    adapter, agg = FakeAdapter(), OrderAggregator(0)
+    for _ in range(3):
+        # 多个聚合 context 注册时只挂一个 Timer sink
+        agg.attach(evt_hub)
+    agg.submit(adapter, market(BUY, 1), TS)
+    agg.flush(TS)
+    evt_hub.dispatch(Timer(TS))
+    assert adapter.polled == 1 and not agg.pending
@@ -0,0 +1,211 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from zolo.consts import CLOSE, LONG, SHORT
+from zolo.dtypes import Trade
+from zolo.benchmarks import create_benchmark, merge_benchmarks
+
+
+def create_trades(cnt, seed=3):
+    rnd = random.Random(seed)
+    return [
+        Trade(str(i), "huobi", "swap@coin", "BTC-USD",
+              rnd.choice((LONG, SHORT)), 1, rnd.uniform(-10, 10), 0.1,
+              status=CLOSE)
+        for i in range(cnt)
+    ]
+
+
+def create_equity(cnt, seed=5):
+    rnd, equity, res = random.Random(seed), 100.0, list()
+    for i in range(cnt):
+        equity *= 1 + rnd.gauss(0, 0.02)
+        res.append((datetime(2021, 1, 1) + timedelta(hours=i), equity))
+    return res
+
+
+def shards(items, *cuts):
+    bounds = (0,) + cuts + (len(items),)
+    return [items[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def test_trade_counter_merge():
+    trades = create_trades(100)
+    full = create_benchmark("trades", "key")
+    for trd in trades:
+        full.on_trade(trd)
+    states = list()
+    for part in shards(trades, 10, 55):
+        bch = create_benchmark("trades", "key")
+        for trd in part:
+            bch.on_trade(trd)
+        # state 可以经 json 往返
+        states.append(json.loads(json.dumps(bch.state())))
+    merged = merge_benchmarks("trades", "key", reversed(states))
+    assert merged.state() == pytest.approx(full.state())
+    assert merged.wins + merged.losses == 100
+
+
+def test_sharp_ratio_merge():
+    rnd = random.Random(11)
+    returns = [rnd.gauss(0.001, 0.01) for _ in range(300)]
+    ts = datetime(2021, 1, 1)
+    full = create_benchmark("sharp", "key")
+    for ret in returns:
+        full.on_return(ts, ret)
+    states = list()
+    for part in shards(returns, 1, 120, 121):
+        bch = create_benchmark("sharp", "key")
+        for ret in part:
+            bch.on_return(ts, ret)
+        states.append(bch.state())
+    left = merge_benchmarks("sharp", "key", states[:2]).state()
+    right = merge_benchmarks("sharp", "key", states[2:]).state()
+    merged = merge_benchmarks("sharp", "key", [left, right])
+    assert merged.count == full.count
+    assert merged.ratio == pytest.approx(full.ratio)
+    assert merged.sortino == pytest.approx(full.sortino)
+
+
+@pytest.mark.parametrize("cuts", [(50,), (30, 200), (120, 121, 300)])
+def test_drawdown_merge(cuts):
+    marks = create_equity(400)
+    full = create_benchmark("drawdown", "key")
+    for ts, equity in marks:
+        full.mark(ts, equity)
+    states = list()
+    for part in shards(marks, *cuts):
+        bch = create_benchmark("drawdown", "key")
+        for ts, equity in part:
+            bch.mark(ts, equity)
+        states.append(bch.state())
+    merged = merge_benchmarks("drawdown", "key", states[::-1])
+    assert merged.max_drawdown == pytest.approx(full.max_drawdown)
+    assert merged.drawdown == pytest.approx(full.drawdown)
+    assert merged.peak == full.peak
+    assert merged.max_duration == full.max_duration == \
+        timedelta(days=13, hours=2)
+    assert merged.duration == full.duration
+
+
+@pytest.mark.parametrize("cuts", [(50,), (30, 200), (120, 121, 300)])
+def test_time_return_merge(cuts):
+    marks = create_equity(400)
+    tiers = ((3600, 24), (4 * 3600, 12), (24 * 3600, 30))
+    full = create_benchmark("timeret", "key", tiers=tiers)
+    for ts, equity in marks:
+        full.mark(ts, equity)
+    states = list()
+    for part in shards(marks, *cuts):
+        bch = create_benchmark("timeret", "key", tiers=tiers)
+        for ts, equity in part:
+            bch.mark(ts, equity)
+        states.append(json.loads(json.dumps(bch.state())))
+    merged = merge_benchmarks("timeret", "key", states[::-1], tiers=tiers)
+    assert merged.curve() == full.curve()
+    assert merged.total_return == pytest.approx(full.total_return)
+    assert merged.last_return == pytest.approx(full.last_return)
+    assert merged.last_ts == full.last_ts
+
+
+def test_merge_unsupported_benchmark():
+    with pytest.raises(TypeError, match="profitfactor"):
+        merge_benchmarks("profitfactor", "key", [dict()])
+
+
+class EquityBroker:
+    # 只提供 register_equity_mark 用到的接口
+    def __init__(self, equity):
+        self.equity = equity
+        self.on_tick = list()
+
+    def get_equity(self, portfolio=False):
+        return self.equity
+
+    def register_on_tick(self, on_tick):
+        self.on_tick.append(on_tick)
+
+    def register_on_trade(self, api_key, on_trade):
+        pass
+
+
+def test_equity_mark_on_timer():
+    from zolo.brokers.base import BrokerBase
+    from zolo.dtypes import Timer
+    from zolo.hub import evt_hub
+
+    broker, ts = EquityBroker(100.0), datetime(2021, 1, 1)
+    bch = create_benchmark("sharp", "key", interval=60)
+    BrokerBase.register_equity_mark(broker, bch)
+    evt_hub.dispatch(Timer(ts))
+    broker.equity = 110.0
+    # 未到采样点不查询权益
+    evt_hub.dispatch(Timer(ts + timedelta(seconds=30)))
+    assert bch.count == 0
+    evt_hub.dispatch(Timer(ts + timedelta(seconds=60)))
+    assert bch.count == 1 and bch.mean == pytest.approx(0.1)
+    assert bch.last_ts == ts + timedelta(seconds=60)
+
+
+def test_drawdown_depth_and_curve():
+    ts = datetime(2021, 1, 1)
+    bch = create_benchmark("drawdown", "key", interval=60, curve=4)
+    for i, equity in enumerate((100, 90, 80, 120, 60, 60, 130)):
+        bch.mark(ts + timedelta(minutes=i), equity)
+    assert bch.max_drawdown == pytest.approx(0.5)
+    assert bch.max_drawdown_ts == ts + timedelta(minutes=4)
+    assert bch.max_duration == timedelta(minutes=2)
+    assert bch.under_water == timedelta(minutes=4)
+    assert bch.drawdown == 0 and bch.peak == 130
+    # 第 5 个格子放不下, 两两合并后步长翻倍
+    assert bch.stride == 120
+    assert bch.underwater_curve() == [
+        (ts + timedelta(minutes=2 * i), pytest.approx(dd))
+        for i, dd in enumerate((0.1, 0.2, 0.5, 0))
+    ]
+    # 乱序的标记被丢弃
+    bch.mark(ts + timedelta(minutes=3), 10)
+    assert bch.max_drawdown == pytest.approx(0.5) and bch.drawdown == 0
+
+
+def test_time_return_tier_rollover():
+    ts = datetime(2021, 1, 1)
+    bch = create_benchmark("timeret", "key", tiers=((60, 3), (300, 2)))
+    for i in range(18):
+        bch.mark(ts + timedelta(minutes=i), 100 + i)
+    # 最细一级保留最近 3 分钟, 溢出的按 5 分钟桶保留最后的权益, 再溢出则丢弃
+    assert bch.curve() == [
+        (ts + timedelta(minutes=i), 100 + e)
+        for i, e in ((5, 9), (10, 14), (15, 15), (16, 16), (17, 17))
+    ]
+    assert bch.resample(300) == [
+        (ts + timedelta(minutes=i), 100 + e)
+        for i, e in ((5, 9), (10, 14), (15, 17))
+    ]
+    assert bch.returns(300) == [
+        (ts + timedelta(minutes=10), pytest.approx(114 / 109 - 1)),
+        (ts + timedelta(minutes=15), pytest.approx(117 / 114 - 1)),
+    ]
+    assert bch.total_return == pytest.approx(0.17)
+
+
+def test_time_return_daily_boundaries():
+    ts = datetime(2021, 1, 1, 22)
+    bch = create_benchmark("timeret", "key", tiers=((3600, 100),))
+    for hours, equity in ((0, 100), (1, 110), (2, 120), (3, 121), (25, 132),
+                          (26, 99)):
+        bch.mark(ts + timedelta(hours=hours), equity)
+    # 零点的权益属于新的一天, 每天取最后一次权益
+    assert bch.daily_returns() == [
+        (datetime(2021, 1, 2).date(), pytest.approx(0.2)),
+        (datetime(2021, 1, 3).date(), pytest.approx(-0.25)),
+    ]
+    assert bch.daily_returns(start=datetime(2021, 1, 2)) == [
+        (datetime(2021, 1, 3).date(), pytest.approx(-0.25)),
+    ]
+    assert bch.daily_returns(end=datetime(2021, 1, 2, 23)) == [
+        (datetime(2021, 1, 2).date(), pytest.approx(0.2)),
+    ]
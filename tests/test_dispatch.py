@@ -0,0 +1,112 @@
+import random
+import time
+from datetime import datetime
+
+from zolo.dispatch import KeyedDispatcher
+from zolo.dtypes import Tick, Fill
+from zolo.pipelines import PipelineRegistry
+from zolo.utils import create_filter
+
+TS = datetime(2021, 1, 1)
+
+
+def create_tick(exchange, instrument_id, price):
+    return Tick(exchange, "swap@coin", instrument_id, TS, price)
+
+
+def start(workers):
+    res = KeyedDispatcher(PipelineRegistry(), workers)
+    res.start()
+    return res
+
+
+def test_per_key_fifo():
+    seen, rnd = dict(), random.Random(1)
+
+    def on_tick(tick):
+        time.sleep(rnd.random() / 10000)
+        seen.setdefault(tick.instrument_id, list()).append(tick.price)
+
+    PipelineRegistry().attach_sink(
+        Tick, create_filter(exchange="fifo"), on_tick)
+    dsp = start(3)
+    try:
+        for i in range(200):
+            dsp.dispatch(create_tick("fifo", f"I{i % 5}", i))
+        dsp.join()
+    finally:
+        dsp.stop()
+    assert sorted(seen) == [f"I{i}" for i in range(5)]
+    for instrument_id, prices in seen.items():
+        assert prices == sorted(prices) and len(prices) == 40
+
+
+def test_join_barrier_before_account_events():
+    ticks, at_fill = list(), list()
+
+    def on_tick(tick):
+        time.sleep(0.001)
+        ticks.append(tick.price)
+
+    registry = PipelineRegistry()
+    registry.attach_sink(Tick, create_filter(exchange="barrier"), on_tick)
+    registry.attach_sink(Fill, create_filter(exchange="barrier"),
+                         lambda fill: at_fill.append(len(ticks)))
+    dsp = start(4)
+    try:
+        for i in range(20):
+            dsp.dispatch(create_tick("barrier", f"I{i % 4}", i))
+        # Fill 在当前线程分派, 之前的行情必须全部处理完
+        dsp.dispatch(Fill("f", "barrier", "I0", 1.0, "Buy", "Long", TS, 0, 1,
+                          0, "f"))
+        assert at_fill == [20]
+    finally:
+        dsp.stop()
+
+
+class Strategy:
+    def __init__(self):
+        self.active = 0
+        self.overlap = 0
+        self.count = 0
+
+    def on_tick(self, tick):
+        self.active += 1
+        self.overlap = max(self.overlap, self.active)
+        time.sleep(0.001)
+        self.count += 1
+        self.active -= 1
+
+
+def test_strategy_sinks_serialized():
+    stg = Strategy()
+    PipelineRegistry().attach_sink(
+        Tick, create_filter(exchange="serial"), stg.on_tick)
+    dsp = start(4)
+    try:
+        for i in range(40):
+            dsp.dispatch(create_tick("serial", f"I{i % 8}", i))
+        dsp.join()
+    finally:
+        dsp.stop()
+    # 行情分散在多个 worker, 同一策略的 sink 仍串行
+    assert len({dsp.route(f"serial.swap@coin.i{i}") for i in range(8)}) > 1
+    assert stg.count == 40 and stg.overlap == 1
+
+
+def test_owner_lock_follows_owner_lifetime():
+    import gc
+    from zolo import pipelines
+    stg = Strategy()
+    lock = pipelines.owner_lock(stg.on_tick)
+    assert pipelines.owner_lock(stg.on_tick) is lock
+    # 策略回收后锁随之释放, 不会留给复用同一 id 的新对象
+    size = len(pipelines._owner_locks)
+    del stg
+    gc.collect()
+    assert len(pipelines._owner_locks) == size - 1
+    # 不可哈希的 owner(如 list.append)仍然各自一把锁
+    a, b = list(), list()
+    assert pipelines.owner_lock(a.append) is pipelines.owner_lock(a.append)
+    assert pipelines.owner_lock(a.append) is not \
+        pipelines.owner_lock(b.append)
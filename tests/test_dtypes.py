@@ -0,0 +1,9 @@
+from zolo.dtypes import Lot, Size
+
+
+def test_qty_str():
+    # str()/格式化不能经由 __repr__ 递归, 下单时直接用 str(qty) 作为数量
+    assert (str(Lot(3)), f"{Lot(3)}", repr(Lot(3))) == ("3", "3", "Lot(3)")
+    assert (str(Size(0.5)), f"{Size(0.5)}", repr(Size(0.5))) == \
+        ("0.5", "0.5", "Size(0.5)")
+    assert str(Lot(3) + 1) == "4"
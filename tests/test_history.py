@@ -0,0 +1,90 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from zolo.dtypes import Bar
+
+
+@pytest.fixture
+def db(tmp_path):
+    from zolo.db import config_db_engine
+    url = f"sqlite:///{tmp_path / 'zolo.db'}"
+    # 旧版本的 history_bar 没有 market 列
+    with create_engine(url).begin() as c:
+        c.execute(
+            "CREATE TABLE history_bar (id INTEGER PRIMARY KEY, "
+            "exchange VARCHAR(32), instrument_id VARCHAR(32), "
+            "timestamp DATETIME, open DECIMAL(20, 7), close DECIMAL(20, 7), "
+            "high DECIMAL(20, 7), low DECIMAL(20, 7), volume INTEGER, "
+            "currency_volume DECIMAL(20, 7), granularity INTEGER)"
+        )
+        c.execute(
+            "INSERT INTO history_bar (exchange, instrument_id, timestamp, "
+            "open, close, high, low, volume, currency_volume, granularity) "
+            "VALUES ('huobi', 'BTC-USD', '2021-01-01 00:00:00', "
+            "1, 1, 1, 1, 1, 1, 60)"
+        )
+    config_db_engine(url)
+    yield
+    config_db_engine("")
+
+
+def test_history_bar_migration(db, caplog):
+    from zolo.db import load_last_n_bars, log_bar_to_db
+    bars = [
+        Bar("huobi", market, "BTC-USD", datetime(2021, 1, 1, h), 2, 2, 2, 2,
+            1, 1, 60)
+        for h, market in ((1, "swap@coin"), (2, "future@coin"))
+    ]
+    for bar in bars:
+        log_bar_to_db(bar)
+    assert "history_bar.market" in caplog.text
+    # 补列前的行没有 market, 不会混入任何市场的预热数据
+    assert load_last_n_bars("huobi", "swap@coin", "BTC-USD", 60, 10) == \
+        bars[:1]
+
+
+class FakeKlineClient:
+    def __init__(self, now):
+        self.now, self.calls = now, list()
+
+    def get_market_history_kline(self, symbol, period, size, from_ts):
+        self.calls.append((period, int(size)))
+        # 返回 from_ts 起的 size 根 1min bar, 最后一根(当前分钟)尚未走完
+        start = math.ceil((from_ts - datetime(1970, 1, 1)).total_seconds() / 60)
+        end = int((self.now - datetime(1970, 1, 1)).total_seconds()) // 60
+        return dict(data=[
+            dict(id=ts * 60, open=1, close=1, high=1, low=1, vol=1, amount=1)
+            for ts in range(start, min(start + int(size), end + 1))
+        ])
+
+
+def test_get_last_n_bars_pages_requests(monkeypatch):
+    from zolo.adapters import huobi_klines
+    now = datetime(2021, 1, 2, 0, 0, 30)
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now
+
+    monkeypatch.setattr(huobi_klines, "datetime", FakeDatetime)
+    client = FakeKlineClient(now)
+    bars = huobi_klines.get_last_n_bars(
+        client, "huobi", "swap@coin", 4500, "BTC-USD", 1
+    )
+    assert client.calls == [("1min", 2000), ("1min", 2000), ("1min", 502)]
+    assert len(bars) == 4500
+    assert bars[-1].timestamp == datetime(2021, 1, 1, 23, 59)
+    assert all(b.timestamp - a.timestamp == timedelta(minutes=1)
+               for a, b in zip(bars, bars[1:]))
+
+
+def test_kline_period():
+    from zolo.adapters.huobi_klines import kline_period
+    assert [kline_period(g) for g in (1, 60, 240, 1440)] == \
+        ["1min", "60min", "4hour", "1day"]
+    with pytest.raises(ValueError):
+        kline_period(10)
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from queue import Full
+
+import pytest
+
+from zolo.consts import BLOCK_PRODUCER, DROP_OLDEST, HUB_STATS_ENABLE, \
+    HUB_STATS_DISABLE, HUB_STATS_RESET, HUB_STATS_DUMP
+from zolo.dtypes import Tick, Bar, Timer, Fill, Message, SinkWrapper
+from zolo.hub import EventQueue, EventHub
+from zolo.metrics import Histogram, EventStats, evt_stats
+from zolo.utils import create_filter
+
+
+def create_tick(price):
+    return Tick("huobi", "swap@coin", "BTC-USD", datetime(2021, 1, 1), price)
+
+
+def create_fill(fill_id):
+    return Fill(fill_id, "huobi", "BTC-USD", 1.0, "Buy", "Long",
+                datetime(2021, 1, 1), 0, 1, 0, fill_id)
+
+
+def test_drop_oldest_market_data():
+    q = EventQueue({Tick: (DROP_OLDEST, 3)})
+    for price in range(10):
+        q.put(create_tick(price))
+    assert q.qsize() == 3
+    assert q.dropped["Tick"] == 7
+    assert [q.get().price for _ in range(3)] == [7, 8, 9]
+
+
+def test_never_drop_private_events():
+    q = EventQueue({Tick: (DROP_OLDEST, 1)})
+    for i in range(100):
+        q.put(create_fill(str(i)))
+    assert q.qsize() == 100
+    assert not q.dropped
+
+
+def test_never_drop_bars_under_pressure():
+    q = EventQueue()
+    for i in range(10000):
+        q.put(create_tick(i))
+        q.put(Bar("huobi", "swap@coin", "BTC-USD", datetime(2021, 1, 1), i,
+                  i, i, i, 1, 1, 60))
+    assert q.dropped["Tick"] > 0 and "Bar" not in q.dropped
+    bars = [evt.close for evt in (q.get() for _ in range(q.qsize()))
+            if isinstance(evt, Bar)]
+    assert bars == list(range(10000))
+
+
+def test_keep_order_across_types():
+    q = EventQueue({Tick: (DROP_OLDEST, 2)})
+    q.put(create_tick(1))
+    q.put(create_fill("a"))
+    q.put(Timer(datetime(2021, 1, 1)))
+    q.put(create_tick(2))
+    res = [q.get() for _ in range(4)]
+    assert [type(evt) for evt in res] == [Tick, Fill, Timer, Tick]
+
+
+def test_block_producer():
+    q = EventQueue({Tick: (BLOCK_PRODUCER, 1)})
+    q.put(create_tick(1))
+    with pytest.raises(Full):
+        q.put(create_tick(2), timeout=0.01)
+    assert q.blocked["Tick"] == 1
+    q.get()
+    q.put(create_tick(3), block=False)
+    assert q.get().price == 3
+
+
+def test_histogram():
+    hist = Histogram()
+    for seconds in (0.0000005, 0.000003, 10.0):
+        hist.add(seconds)
+    # log2 微秒分桶, 超出范围的计入最后一个桶
+    assert hist.snapshot()["buckets"][:3] == [1, 0, 1]
+    assert hist.snapshot()["buckets"][-1] == 1
+    assert hist.percentile(0.5) == 0.000004
+    assert (hist.count, hist.max) == (3, 10.0)
+    assert hist.mean == pytest.approx(10.0000035 / 3)
+
+
+def test_concurrent_sink_stats():
+    stats, sink = EventStats(), SinkWrapper(None, print)
+
+    def worker():
+        for _ in range(2000):
+            stats.on_event(Tick)
+            stats.on_sink(Tick, sink, 0.000001)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    res = stats.snapshot()
+    assert res["events"]["Tick"]["count"] == 16000
+    assert res["sinks"][0]["count"] == 16000
+
+
+@pytest.fixture
+def hub():
+    yield EventHub()
+    evt_stats.disable()
+    evt_stats.reset()
+
+
+def test_queue_wait_and_sink_stats(hub):
+    ticks = list()
+    hub.attach_sink(Tick, create_filter(exchange="stats"), ticks.append)
+    hub.enable_stats()
+    hub.post_event(Tick("stats", "swap@coin", "BTC-USD", datetime(2021, 1, 1),
+                        1))
+    time.sleep(0.01)
+    hub.dispatch(hub.get_event())
+    res = hub.get_stats()
+    assert ticks and res["events"]["Tick"]["count"] == 1
+    assert res["events"]["Tick"]["wait"]["max"] >= 0.01
+    assert [s["count"] for s in res["sinks"]
+            if "append" in s["name"]] == [1]
+    assert res["queue"]["size"] == 0
+
+
+def test_stats_commands(hub, caplog):
+    hub.on_message(Message(HUB_STATS_ENABLE, None))
+    assert evt_stats.enabled
+    evt_stats.on_event(Tick)
+    with caplog.at_level(logging.INFO, logger="zolo.hub"):
+        hub.on_message(Message(HUB_STATS_DUMP, None))
+    assert "HUB STATS" in caplog.text
+    hub.on_message(Message(HUB_STATS_RESET, None))
+    assert hub.get_stats()["events"] == dict()
+    hub.on_message(Message(HUB_STATS_DISABLE, None))
+    assert not evt_stats.enabled
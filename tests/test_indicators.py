@@ -0,0 +1,368 @@
+import math
+import random
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+
+from zolo.dtypes import Bar
+from zolo.indicators import create_indicator
+
+
+def create_bars(cnt, seed=7):
+    rnd, price, res = random.Random(seed), 100.0, list()
+    for _ in range(cnt):
+        close = price + rnd.uniform(-1, 1)
+        res.append(Bar("huobi", "swap@coin", "BTC-USD", datetime(2021, 1, 1),
+                       price, close, max(price, close) + rnd.random(),
+                       min(price, close) - rnd.random(), 1, 1, 60))
+        price = close
+    return res
+
+
+def naive_ema(values, period):
+    res = sum(values[:period]) / period
+    for x in values[period:]:
+        res += 2 / (period + 1) * (x - res)
+    return res
+
+
+def test_sma():
+    bars, ind = create_bars(50), create_indicator("sma", 10, 60)
+    for bar in bars:
+        ind.on_bar(bar)
+    assert ind.value == pytest.approx(sum(b.close for b in bars[-10:]) / 10)
+
+
+def test_ema_and_macd():
+    bars = create_bars(100)
+    closes = [b.close for b in bars]
+    ema = create_indicator("ema", 10, 60)
+    macd = create_indicator("macd", granularity=60)
+    for bar in bars:
+        ema.on_bar(bar)
+        macd.on_bar(bar)
+    assert ema.value == pytest.approx(naive_ema(closes, 10))
+    assert macd.value == pytest.approx(
+        naive_ema(closes, 12) - naive_ema(closes, 26))
+    assert macd.histogram == pytest.approx(macd.value - macd.signal)
+
+
+def test_rsi_and_atr():
+    bars = create_bars(100)
+    rsi, atr = create_indicator("rsi", 14, 60), create_indicator("atr", 14, 60)
+    for bar in bars:
+        rsi.on_bar(bar)
+        atr.on_bar(bar)
+    assert rsi.ready and 0 < rsi.value < 100
+    trs = [bars[0].high - bars[0].low] + [
+        max(b.high - b.low, abs(b.high - p.close), abs(b.low - p.close))
+        for p, b in zip(bars, bars[1:])
+    ]
+    expected = sum(trs[:14]) / 14
+    for tr in trs[14:]:
+        expected = (expected * 13 + tr) / 14
+    assert atr.value == pytest.approx(expected)
+
+
+def test_bollinger():
+    bars, ind = create_bars(200), create_indicator("boll", 20, 60)
+    for bar in bars:
+        ind.on_bar(bar)
+    window = [b.close for b in bars[-20:]]
+    mean = sum(window) / 20
+    std = math.sqrt(sum((x - mean) ** 2 for x in window) / 20)
+    assert ind.middle == pytest.approx(mean)
+    assert ind.upper == pytest.approx(mean + 2 * std)
+
+
+@pytest.mark.parametrize("alias, kwargs", [
+    ("sma", dict(period=10, granularity=60)),
+    ("ema", dict(period=10, granularity=60)),
+    ("macd", dict(granularity=60)),
+    ("rsi", dict(granularity=60)),
+    ("atr", dict(granularity=60)),
+    ("boll", dict(granularity=60)),
+])
+def test_precompute_matches_streaming(alias, kwargs):
+    pytest.importorskip("numpy")
+    from zolo.indicators.vector import bar_columns
+    bars = create_bars(300)
+    columns = next(iter(bar_columns(bars).values()))
+    streaming = create_indicator(alias, **kwargs)
+    preloaded = create_indicator(alias, **kwargs)
+    preloaded.preload(columns)
+    for bar in bars:
+        streaming.on_bar(bar)
+        preloaded.on_bar(bar)
+        assert preloaded.value == pytest.approx(streaming.value)
+        assert preloaded.ready == streaming.ready
+
+
+def test_precompute_bollinger_high_price_low_variance():
+    pytest.importorskip("numpy")
+    from zolo.indicators.vector import bar_columns
+    # 高价位、极小波动的长序列, 累计和相减会把方差抵消为 0
+    rnd = random.Random(5)
+    bars = [
+        Bar("huobi", "swap@coin", "BTC-USD", datetime(2021, 1, 1), 0,
+            close, close, close, 1, 1, 60)
+        for close in (50000 + rnd.gauss(0, 0.005) for _ in range(50000))
+    ]
+    columns = next(iter(bar_columns(bars).values()))
+    streaming = create_indicator("boll", 20, 60)
+    preloaded = create_indicator("boll", 20, 60)
+    preloaded.preload(columns)
+    for bar in bars:
+        streaming.on_bar(bar)
+        preloaded.on_bar(bar)
+    assert streaming.stddev > 0.001
+    assert preloaded.stddev == pytest.approx(streaming.stddev, rel=1e-3)
+    assert preloaded.middle == pytest.approx(streaming.middle)
+
+
+@pytest.mark.parametrize("alias, kwargs", [
+    ("sma", dict(period=10, granularity=60)),
+    ("ema", dict(period=10, granularity=60)),
+    ("macd", dict(granularity=60)),
+    ("rsi", dict(granularity=60)),
+    ("atr", dict(granularity=60)),
+    ("boll", dict(granularity=60)),
+])
+def test_precompute_falls_back_to_streaming(alias, kwargs):
+    pytest.importorskip("numpy")
+    from zolo.indicators.vector import bar_columns
+    bars = [
+        replace(bar, timestamp=datetime(2021, 1, 1, i // 60, i % 60))
+        for i, bar in enumerate(create_bars(300))
+    ]
+    # 预计算数据缺一根 bar, 且只覆盖前 200 根
+    columns = next(iter(bar_columns(bars[:120] + bars[121:200]).values()))
+    streaming = create_indicator(alias, **kwargs)
+    preloaded = create_indicator(alias, **kwargs)
+    preloaded.preload(columns)
+    for bar in bars:
+        streaming.on_bar(bar)
+        preloaded.on_bar(bar)
+        assert preloaded.value == pytest.approx(streaming.value)
+        assert preloaded.ready == streaming.ready
+    assert not preloaded.preloaded
+
+
+def test_shared_indicators():
+    from zolo.indicators import IndicatorCache
+    cache, bars = IndicatorCache(), create_bars(100)
+    sma = cache.get("sma", "huobi.swap@coin.BTC-USD", period=10, granularity=60)
+    assert sma is cache.get(
+        "sma", "HUOBI.swap@coin.BTC-USD", granularity=60, period=10)
+    assert sma is not cache.get(
+        "sma", "huobi.swap@coin.ETH-USD", period=10, granularity=60)
+    ema = cache.get("ema", "huobi.swap@coin.BTC-USD", period=12,
+                    granularity=60)
+    macd = cache.get("macd", "huobi.swap@coin.BTC-USD", granularity=60)
+    assert cache.dependencies(macd)[0] is ema
+    assert cache.subscribe(macd) and not cache.subscribe(macd)
+    standalone = create_indicator("macd", granularity=60)
+    sinks = cache.dependencies(macd) + [macd]
+    for bar in bars:
+        for ind in sinks:
+            ind.on_bar(bar)
+        standalone.on_bar(bar)
+    assert macd.value == pytest.approx(standalone.value)
+    assert macd.signal == pytest.approx(standalone.signal)
+
+
+def test_bar_series_windows():
+    bars, series = create_bars(25), create_indicator("series", 10, 60)
+    for bar in bars[:3]:
+        series.on_bar(bar)
+    assert series.closes[:].tolist() == [b.close for b in bars[:3]]
+    for bar in bars[3:]:
+        series.on_bar(bar)
+    closes = [b.close for b in bars]
+    window = series.closes[-5:]
+    assert isinstance(window, memoryview) and window.contiguous
+    assert window.tolist() == closes[-5:]
+    assert series.closes[:].tolist() == closes[-10:]
+    assert series.closes[-1] == closes[-1] and series.closes[0] == closes[-10]
+    assert [b.close for b in series.bars] == closes[::-1][:10]
+    assert series.bars[0].timestamp == bars[-1].timestamp
+
+
+def test_warm_up_from_history():
+    from zolo.indicators import IndicatorCache
+    cache, calls = IndicatorCache(), list()
+    bars = [replace(bar, timestamp=datetime(2021, 1, 1, i // 60, i % 60))
+            for i, bar in enumerate(create_bars(100))]
+
+    def load(cnt, granularity, instrument_id):
+        calls.append((cnt, instrument_id))
+        return bars[-cnt:]
+
+    market_id = "huobi.swap@coin.btc-usd"
+    sma = cache.get("sma", market_id, period=10, granularity=60)
+    ema = cache.get("ema", market_id, period=10, granularity=60)
+    cache.warm_up(ema, market_id, load, "BTC-USD")
+    cache.warm_up(sma, market_id, load, "BTC-USD")
+    # 按原始大小写的品种拉取历史
+    assert calls == [(30, "BTC-USD")]
+    assert sma.ready
+    assert sma.value == pytest.approx(sum(b.close for b in bars[-10:]) / 10)
+    on_bar = cache.feeder(sma)
+    on_bar(bars[-1])
+    assert sma.value == pytest.approx(sum(b.close for b in bars[-10:]) / 10)
+
+
+def test_rolling_covariance():
+    rnd, period = random.Random(3), 20
+    ind = create_indicator("cov", period, 60,
+                           instruments=("BTC-USD", "ETH-USD"), returns=False)
+    xs, ys = list(), list()
+    for i in range(100):
+        ts = datetime(2021, 1, 1, i // 60, i % 60)
+        x = rnd.gauss(0, 1)
+        y = 2 * x + rnd.gauss(0, 0.1)
+        xs.append(x)
+        ys.append(y)
+        for instrument_id, close in (("ETH-USD", y), ("BTC-USD", x)):
+            ind.on_bar(Bar("huobi", "swap@coin", instrument_id, ts, close,
+                           close, close, close, 1, 1, 60))
+    xs, ys = xs[-period:], ys[-period:]
+    mx, my = sum(xs) / period, sum(ys) / period
+    cov = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / (period - 1)
+    var = sum((x - mx) ** 2 for x in xs) / (period - 1)
+    assert ind.ready
+    assert ind.cov("BTC-USD", "ETH-USD") == pytest.approx(cov)
+    assert ind.beta("ETH-USD", "BTC-USD") == pytest.approx(cov / var)
+    snapshot = ind.snapshot()
+    assert snapshot["corr"][0][1] == pytest.approx(snapshot["corr"][1][0])
+    assert snapshot["corr"][0][1] > 0.99
+    # ETH 停滞时未对齐的 BTC bar 不会无限堆积
+    for i in range(100, 300):
+        ts = datetime(2021, 1, 1, i // 60, i % 60)
+        ind.on_bar(Bar("huobi", "swap@coin", "BTC-USD", ts, 1, 1, 1, 1, 1, 1,
+                       60))
+    assert len(ind._pending) <= period + 1
+
+
+def test_vwap_and_volume_profile():
+    bars = [
+        Bar("huobi", "swap@coin", "BTC-USD", datetime(2021, 1, d, h), p, p,
+            p, p, v, 0, 60)
+        for d, h, p, v in ((1, 22, 10.0, 1), (1, 23, 20.0, 3),
+                           (2, 0, 30.0, 1), (2, 1, 40.0, 1))
+    ]
+    vwap = create_indicator("vwap", 60)
+    avwap = create_indicator("avwap", 60, anchor=datetime(2021, 1, 1, 23))
+    profile = create_indicator("vprofile", 3, 60, tick_size=1.0,
+                               buckets=64)
+    for bar in bars[:2]:
+        vwap.on_bar(bar)
+    assert vwap.value == pytest.approx((10 + 60) / 4)
+    for bar in bars[2:]:
+        vwap.on_bar(bar)
+    assert vwap.value == pytest.approx(35)
+    for bar in bars:
+        avwap.on_bar(bar)
+        profile.on_bar(bar)
+    assert avwap.value == pytest.approx((60 + 30 + 40) / 5)
+    assert profile.total == 5 and profile.poc == 20.0
+    assert profile.histogram() == [(20.0, 3), (30.0, 1), (40.0, 1)]
+    assert profile.value_area() == (20.0, 31.0)
+
+
+def test_vwap_warmup():
+    assert create_indicator("vwap", 60).warmup == 24
+    assert create_indicator("vwap", 15, session_hours=8).warmup == 32
+    # 未锚定时无法预热, 锚定后预热锚点至今的 bar
+    assert create_indicator("avwap", 60).warmup == 0
+    anchor = datetime.utcnow() - timedelta(hours=10, minutes=30)
+    assert create_indicator("avwap", 60, anchor=anchor).warmup == 11
+
+
+def test_volume_profile_evicts_float_residue():
+    profile = create_indicator("vprofile", 2, 60, tick_size=1.0, buckets=64)
+    # 0.1 + 0.2 - 0.1 - 0.2 在浮点下不为 0
+    for p, v in ((10.0, 0.1), (10.0, 0.2), (20.0, 1.0), (20.0, 1.0)):
+        profile.on_bar(Bar("huobi", "swap@coin", "BTC-USD",
+                           datetime(2021, 1, 1), p, p, p, p, v, 0, 60))
+    assert profile.histogram() == [(20.0, 2.0)]
+    assert profile.total == pytest.approx(2.0)
+
+
+def test_snapshot_and_restore(tmp_path):
+    from zolo.indicators import IndicatorCache, IndicatorStore, \
+        config_indicator_store
+    bars = [replace(bar, timestamp=datetime(2021, 1, 1, i // 60, i % 60))
+            for i, bar in enumerate(create_bars(120))]
+    market_id, params = "huobi.swap@coin.BTC-USD", [
+        ("sma", dict(period=10, granularity=60)),
+        ("rsi", dict(granularity=60)),
+    ]
+    config_indicator_store(str(tmp_path / "indicators.pkl"))
+    try:
+        cache = IndicatorCache()
+        for alias, kwargs in params:
+            on_bar = cache.feeder(cache.get(alias, market_id, **kwargs))
+            for bar in bars[:100]:
+                on_bar(bar)
+        IndicatorStore(cache).save()
+
+        cache, restored = IndicatorCache(), list()
+        store = IndicatorStore(cache)
+        store.load()
+        for alias, kwargs in params:
+            ind = cache.get(alias, market_id, **kwargs)
+            assert store.restore(ind)
+            cache.warm_up(ind, market_id, lambda *args: bars, "BTC-USD")
+            restored.append(ind)
+    finally:
+        config_indicator_store("")
+    for (alias, kwargs), ind in zip(params, restored):
+        expected = create_indicator(alias, **kwargs)
+        for bar in bars:
+            expected.on_bar(bar)
+        assert ind.value == pytest.approx(expected.value)
+
+
+def offload_results(ind, cnt, timeout=10):
+    from queue import Queue
+    msgs = Queue()
+    ind.start(msgs.put)
+    for _ in range(cnt):
+        ind.on_result(msgs.get(timeout=timeout))
+
+
+def test_offload_round_trip():
+    from zolo.indicators import OffloadedIndicator
+    from zolo.indicators.ema import ExponentialMovingAverage
+    bars = create_bars(50)
+    ind = OffloadedIndicator(ExponentialMovingAverage,
+                             dict(period=10, granularity=60))
+    # 预热长度取自真实指标
+    assert ind.warmup == 30
+    streaming = create_indicator("ema", 10, 60)
+    try:
+        for bar in bars:
+            ind.on_bar(bar)
+            streaming.on_bar(bar)
+        offload_results(ind, len(bars))
+    finally:
+        ind.stop()
+    assert ind.ready and ind.lost == 0
+    assert ind.value == pytest.approx(streaming.value)
+
+
+def test_offload_counts_overrun():
+    from zolo.indicators import OffloadedIndicator
+    from zolo.indicators.ema import ExponentialMovingAverage
+    ind = OffloadedIndicator(ExponentialMovingAverage,
+                             dict(period=3, granularity=60), capacity=4)
+    try:
+        # 子进程启动前写满 ring, 最早的 6 根被覆盖
+        for bar in create_bars(10):
+            ind.on_bar(bar)
+        offload_results(ind, 4)
+    finally:
+        ind.stop()
+    assert ind.lost == 6
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from zolo.adapters import InstrumentRegistry, config_instrument_cache
+from zolo.adapters import instruments
+from zolo.consts import INSTRUMENT_CACHE_TTL, INSTRUMENT_MISS_REFRESH
+
+
+class FakeAdapter:
+    fetched = 0
+
+    def __init__(self, exchange="huobi", market="spot", fail=False):
+        self.exchange, self.market, self.fail = exchange, market, fail
+
+    def fetch_instruments(self):
+        if self.fail:
+            raise ConnectionError
+        FakeAdapter.fetched += 1
+        return {"btcusdt": f"{self.market}-{FakeAdapter.fetched}"}
+
+
+class RollingAdapter(FakeAdapter):
+    # 每次请求都会出现新的合约代码, 模拟交割合约换代码
+    def fetch_instruments(self):
+        res = super().fetch_instruments()
+        res[f"btc-{FakeAdapter.fetched}"] = "rolled"
+        return res
+
+
+@pytest.fixture
+def registry(tmp_path):
+    FakeAdapter.fetched = 0
+    config_instrument_cache(str(tmp_path / "instruments.pkl"), 60)
+    yield InstrumentRegistry()
+    config_instrument_cache("", INSTRUMENT_CACHE_TTL)
+
+
+def test_shared_by_market(registry):
+    for _ in range(50):
+        assert registry.get(FakeAdapter(), "btcusdt") == "spot-1"
+    registry.feed(FakeAdapter(market="future@coin"))
+    assert FakeAdapter.fetched == 2
+
+
+def test_refresh_after_ttl(registry, monkeypatch):
+    registry.feed(FakeAdapter())
+    now = time.time() + 61
+    monkeypatch.setattr(instruments.time, "time", lambda: now)
+    # 刷新失败时沿用旧数据
+    assert registry.get(FakeAdapter(fail=True), "btcusdt") == "spot-1"
+    registry.invalidate("huobi", "spot")
+    assert registry.get(FakeAdapter(), "btcusdt") == "spot-2"
+
+
+def test_warm_start_from_file(registry):
+    registry.feed(FakeAdapter())
+    warm = InstrumentRegistry()
+    warm.load()
+    assert warm.get(FakeAdapter(fail=True), "btcusdt") == "spot-1"
+    assert FakeAdapter.fetched == 1
+
+
+def test_refresh_on_unknown_instrument(registry, monkeypatch):
+    registry.feed(RollingAdapter())
+    # 刚刷新过时不为未知代码再次请求交易所
+    with pytest.raises(KeyError):
+        registry.get(RollingAdapter(), "btc-2")
+    assert FakeAdapter.fetched == 1
+    now = time.time() + INSTRUMENT_MISS_REFRESH
+    monkeypatch.setattr(instruments.time, "time", lambda: now)
+    assert registry.get(RollingAdapter(), "btc-2") == "rolled"
+    assert registry.get(RollingAdapter(), "btcusdt") == "spot-2"
+    assert FakeAdapter.fetched == 2
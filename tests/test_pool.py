@@ -0,0 +1,91 @@
+import threading
+import time
+
+from zolo.adapters import AdapterPool
+from zolo.adapters import pool
+from zolo.dtypes import Credential
+
+
+def test_reuse_by_credential(monkeypatch):
+    created = list()
+
+    def create_adapter(*args):
+        # 模拟较慢的 adapter 构造, 让并发请求撞在一起
+        time.sleep(0.01)
+        created.append(args)
+        return object()
+
+    monkeypatch.setattr(pool, "create_adapter", create_adapter)
+    adapters, res = AdapterPool(), list()
+    cred = Credential("key", "secret", "")
+
+    def worker():
+        res.append(adapters.get("restful", "huobi", "spot", cred))
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1 and all(a is res[0] for a in res)
+    other = adapters.get("restful", "huobi", "spot", Credential("k2", "", ""))
+    assert other is not res[0] and len(adapters) == 2
+    adapters.discard(other)
+    assert len(adapters) == 1
+
+
+class FakeFutureClient:
+    def __init__(self):
+        self.orders = dict()
+
+    def get_contract_contract_info(self):
+        return dict(status="ok", data=[dict(
+            symbol=symbol, contract_type="quarter", contract_code=code,
+            contract_size=100, create_date="20210101",
+            delivery_time="1616745600000", price_tick=0.01,
+            contract_status=1,
+        ) for symbol, code in (("BTC", "BTC210326"), ("BTC", "BTC210402"),
+                               ("ETH", "ETH210326"))])
+
+    def post_contract_switch_lever_rate(self, symbol, lever_rate):
+        pass
+
+    def post_order(self, **kwargs):
+        self.orders[kwargs["client_order_id"]] = kwargs
+        return dict(status="ok")
+
+    def get_contract_order_info(self, symbol, client_order_id):
+        post = self.orders[client_order_id]
+        return dict(status="ok", ts=1609459200000, data=[dict(
+            volume=post["volume"], direction=post["direction"],
+            offset=post["offset"], order_price_type="limit", fee="0",
+            status=6, fee_asset=symbol, order_id="1",
+            lever_rate=post["lever_rate"],
+        )])
+
+
+def test_shared_adapter_keeps_leverage_per_currency():
+    from zolo.adapters import HuobiRestfulCoinMarginFuture, instrument_registry
+    from zolo.consts import BUY, LONG, RESTFUL
+    from zolo.dtypes import Lot
+    from zolo.posts import LimitOrder
+
+    adapter = HuobiRestfulCoinMarginFuture(
+        RESTFUL, "huobi", "future@coin", Credential("key", "secret", ""))
+    adapter._client = client = FakeFutureClient()
+    try:
+        adapter.set_leverage("BTC210326", 20)
+        adapter.set_leverage("ETH210326", 5)
+        # 同一币种的其他期合约共用 BTC 的杠杆
+        oids = {
+            inst: adapter.create_order(LimitOrder(
+                "huobi", "future@coin", inst, BUY, LONG, 100, Lot(1), 0))
+            for inst in ("BTC210326", "BTC210402", "ETH210326")
+        }
+        assert [client.orders[oid]["lever_rate"] for oid in oids.values()] \
+            == [20, 20, 5]
+        # 各币种的订单按自己的杠杆核对, 不会互相覆盖
+        assert [adapter.get_order_by_client_oid(inst, oid).leverage
+                for inst, oid in oids.items()] == [20, 20, 5]
+    finally:
+        instrument_registry.clear()
@@ -0,0 +1,103 @@
+import pickle
+import time
+from datetime import datetime
+from queue import Queue, Empty
+
+import zmq
+
+from zolo.consts import PUBSUB
+from zolo.dtypes import ChannelConfig, GatewayConfig, CREDENTIAL_EMPTY, \
+    Tick, Bar, OrderBook
+from zolo.gateways import Gateway, MarketDataHub, PubSubGateway
+from zolo.gateways.pubsub import decode_event, encode_event
+
+TS = datetime(2021, 1, 1, 8, 30, 15, 500)
+
+
+class FakeUpstream(Gateway, scheme="FakeUpstream"):
+    def __init__(self):
+        super().__init__()
+        self.calls = list()
+
+    def subscribe(self, cfg):
+        self.calls.append(("subscribe", cfg.instrument_id))
+
+    def unsubscribe(self, cfg):
+        self.calls.append(("unsubscribe", cfg.instrument_id))
+
+    def stop(self):
+        pass
+
+    def start(self, q):
+        pass
+
+    @property
+    def is_running(self):
+        return True
+
+    def reboot(self, q):
+        pass
+
+
+def tick_cfg():
+    return ChannelConfig(GatewayConfig(PUBSUB, "fake"), "swap@coin", "BTC-USD",
+                         CREDENTIAL_EMPTY, Tick, dict())
+
+
+def wait_until(cond, hub=None, timeout=2):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if hub:
+            hub._poll_ctrl()
+        if cond():
+            return True
+        time.sleep(0.001)
+    return False
+
+
+def test_encode_round_trip():
+    for evt in (
+        Tick("fake", "swap@coin", "BTC-USD", TS, 100.5),
+        Bar("fake", "spot", "btcusdt", TS, 1, 2, 3, 0.5, 10, 1000.0, 60),
+        OrderBook("fake", "spot", "btcusdt", TS, [(1.5, 2)], [(1.4, 3.0)]),
+    ):
+        assert decode_event(encode_event(evt)) == evt
+
+
+def test_hub_round_trip_and_refcount():
+    hub = MarketDataHub("inproc://pub-test", "inproc://ctrl-test",
+                        upstream="FakeUpstream")
+    first = PubSubGateway("inproc://pub-test", "inproc://ctrl-test")
+    second = PubSubGateway("inproc://pub-test", "inproc://ctrl-test")
+    q = Queue()
+    first.start(q)
+    try:
+        first.subscribe(tick_cfg())
+        second.subscribe(tick_cfg())
+        assert wait_until(lambda: sum(hub._channels.values()) == 2, hub)
+        upstream = hub._gateways.gateways["fakeupstream.fake"]
+        assert upstream.calls == [("subscribe", "BTC-USD")]
+        # 伪造的 pickle 控制帧被丢弃, 不会被反序列化
+        bad = zmq.Context.instance().socket(zmq.PUSH)
+        bad.connect("inproc://ctrl-test")
+        bad.send(pickle.dumps(tick_cfg()))
+        tick = Tick("fake", "swap@coin", "BTC-USD", TS, 100.0)
+
+        def received():
+            hub.publish(tick)
+            try:
+                return q.get(timeout=0.01) == tick
+            except Empty:
+                return False
+
+        assert wait_until(received, hub)
+        # 还有订阅者时不向交易所退订
+        first.unsubscribe(tick_cfg())
+        assert wait_until(lambda: sum(hub._channels.values()) == 1, hub)
+        assert len(upstream.calls) == 1
+        second.unsubscribe(tick_cfg())
+        assert wait_until(lambda: not hub._channels, hub)
+        assert upstream.calls[-1] == ("unsubscribe", "BTC-USD")
+        bad.close()
+    finally:
+        first.stop()
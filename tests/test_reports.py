@@ -0,0 +1,93 @@
+import pytest
+
+from zolo.consts import CLOSE, OPEN, LONG, SHORT
+
+np = pytest.importorskip("numpy")
+
+
+def hours(*values):
+    return np.array(
+        ["2021-01-01T00:00"] * len(values), dtype="datetime64[us]"
+    ) + np.array(values, dtype="timedelta64[h]")
+
+
+def account_columns():
+    # A 先上报, B 一小时后才有第一条记录
+    return dict(
+        timestamp=hours(0, 1, 2, 3),
+        instrument_id=np.array(["A", "B", "A", "B"], dtype=object),
+        margin_balance=np.array([100.0, 50.0, 110.0, 40.0]),
+        home_notional=np.array([200.0, 0.0, 0.0, 100.0]),
+        pos_qty=np.array([1.0, 0.0, 0.0, 1.0]),
+    )
+
+
+def trade_columns():
+    return dict(
+        instrument_id=np.array(["A", "A", "B", "B"], dtype=object),
+        status=np.array([CLOSE, CLOSE, CLOSE, OPEN], dtype=object),
+        pos_side=np.array([LONG, SHORT, LONG, LONG], dtype=object),
+        pnl=np.array([10.0, -4.0, 6.0, 0.0]),
+        commission=np.array([1.0, 1.0, 0.5, 0.5]),
+    )
+
+
+def test_equity_curve_starts_when_all_reported():
+    from zolo.reports import equity_curve
+    ts, equity = equity_curve(account_columns())
+    assert ts.tolist() == hours(1, 2, 3).tolist()
+    assert equity.tolist() == [150.0, 160.0, 150.0]
+
+
+def test_build_report():
+    from zolo.reports import build_report
+    report = build_report(account_columns(), trade_columns())
+    assert report["returns"]["total_return"] == pytest.approx(0.0)
+    assert report["drawdown"]["max_drawdown"] == pytest.approx(1 - 150 / 160)
+    assert report["drawdown"]["max_duration"] == 3600
+    # 敞口按品种持仓之和计: 1h-2h 只有 A 的 200, 2h-3h 空仓
+    exposure = report["exposure"]
+    assert exposure["exposure"] == pytest.approx(200 / 150 / 2)
+    assert exposure["time_in_market"] == pytest.approx(0.5)
+    assert exposure["turnover"] == pytest.approx(500 / (460 / 3))
+    trades = report["trades"]
+    assert (trades["trades"], trades["wins"], trades["losses"]) == (3, 2, 1)
+    assert trades["profit_factor"] == pytest.approx(16 / 4)
+    assert trades["long"] == 2
+    assert report["attribution"]["A"]["pnl"] == pytest.approx(6.0)
+    assert report["attribution"]["B"]["commission"] == pytest.approx(0.5)
+
+
+def test_equity_curve_matches_last_value_scan():
+    from zolo.reports import equity_curve
+    rnd = np.random.default_rng(1)
+    n, names = 500, ["A", "B", "C"]
+    instruments = rnd.choice(names, n).astype(object)
+    balance = rnd.uniform(50, 150, n)
+    ts = np.array(["2021-01-01"] * n, dtype="datetime64[us]") + \
+        np.sort(rnd.integers(0, n // 2, n)).astype("timedelta64[m]")
+    ts_out, equity = equity_curve(dict(
+        timestamp=ts, instrument_id=instruments, margin_balance=balance
+    ))
+    last, expected, expected_ts = dict(), list(), list()
+    for i in range(n):
+        last[instruments[i]] = balance[i]
+        if len(last) == len(names) and (i == n - 1 or ts[i + 1] != ts[i]):
+            expected.append(sum(last.values()))
+            expected_ts.append(ts[i])
+    assert ts_out.tolist() == expected_ts
+    assert equity == pytest.approx(expected)
+
+
+def test_split_currency():
+    from zolo.reports import build_report, split_currency
+    account = account_columns()
+    account["currency"] = np.array(["BTC", "ETH", "BTC", "ETH"], dtype=object)
+    # 币本位不同币种的余额不能相加
+    with pytest.raises(ValueError):
+        build_report(account, trade_columns())
+    parts = split_currency(account)
+    assert sorted(parts) == ["BTC", "ETH"]
+    assert parts["ETH"]["margin_balance"].tolist() == [50.0, 40.0]
+    report = build_report(parts["BTC"], trade_columns())
+    assert report["equity"].tolist() == [100.0, 110.0]
@@ -0,0 +1,88 @@
+import sys
+import uuid
+from datetime import datetime
+
+import pytest
+
+from zolo.gateways import shm
+from zolo.dtypes import Tick, Bar, OrderBook
+from zolo.gateways.shm import ShmRingWriter, ShmRingReader
+
+
+@pytest.fixture
+def ring():
+    writer = ShmRingWriter(f"zolo_test_{uuid.uuid4().hex[:8]}", capacity=8)
+    yield writer
+    writer.close()
+
+
+def create_tick(price):
+    return Tick("huobi", "swap@coin", "BTC-USD", datetime(2021, 1, 1), price)
+
+
+def test_round_trip(ring):
+    reader = ShmRingReader(ring.name)
+    ts = datetime(2021, 1, 1, 0, 0, 1, 500)
+    ring.write(create_tick(1.5))
+    ring.write(Bar("huobi", "swap@coin", "BTC-USD", ts, 1, 2, 3, 0.5, 10, 0.1,
+                   60))
+    ring.write(OrderBook("huobi", "swap@coin", "BTC-USD", ts, [(2.0, 3.0)],
+                         [(1.0, 4.0)]))
+    tick, bar, book = list(reader)
+    assert tick == create_tick(1.5)
+    assert bar.timestamp == ts and bar.granularity == 60 and bar.low == 0.5
+    assert book.asks == [(2.0, 3.0)] and book.bids == [(1.0, 4.0)]
+    assert reader.read() is None
+    reader.close()
+
+
+def test_independent_cursors(ring):
+    fast, slow = ShmRingReader(ring.name), ShmRingReader(ring.name)
+    ring.write(create_tick(1))
+    assert fast.read().price == 1
+    ring.write(create_tick(2))
+    assert [evt.price for evt in slow] == [1, 2]
+    assert [evt.price for evt in fast] == [2]
+
+
+def test_overrun(ring):
+    reader = ShmRingReader(ring.name)
+    for price in range(20):
+        ring.write(create_tick(price))
+    res = [evt.price for evt in reader]
+    assert res == list(range(12, 20))
+    assert reader.lost == 12
+
+
+def test_empty_book_side(ring):
+    reader = ShmRingReader(ring.name)
+    ring.write(OrderBook("huobi", "spot", "btcusdt", datetime(2021, 1, 1),
+                         [(2.0, 3.0)], []))
+    book = reader.read()
+    assert book.asks == [(2.0, 3.0)] and book.bids == []
+
+
+def test_string_overflow(ring):
+    ring.write(create_tick(1))
+    with pytest.raises(ValueError):
+        ring.write(Tick("huobi", "swap@coin", "X" * 33, datetime(2021, 1, 1),
+                        1))
+    # 失败的写入不推进序号
+    reader = ShmRingReader(ring.name, from_start=True)
+    assert [evt.price for evt in reader] == [1]
+
+
+def test_reader_not_tracked(ring, monkeypatch):
+    unregistered = list()
+    unregister = shm.resource_tracker.unregister
+
+    def record(name, rtype):
+        unregistered.append(name)
+        unregister(name, rtype)
+
+    monkeypatch.setattr(shm.resource_tracker, "unregister", record)
+    reader = ShmRingReader(ring.name)
+    reader.close()
+    # 没有 track 参数时, reader 挂载后从 resource_tracker 注销
+    expected = [] if sys.version_info >= (3, 13) else [f"/{ring.name}"]
+    assert unregistered == expected
@@ -0,0 +1,75 @@
+import pytest
+
+from zolo.consts import BUY, SELL, DUAL, FIFO, FILO, AIAO, CLOSE, OPEN, \
+    SHORT
+from zolo.dtypes import Order
+from zolo.brokers.trdreg import create_registry
+
+
+def pnl_calc(qty, entry, price):
+    return (price - entry) * qty
+
+
+def comm_calc(price, qty):
+    return 0.0
+
+
+def create_order(side, qty, price, oid):
+    return Order("huobi", "swap@coin", side, DUAL, qty, "BTC-USD", oid,
+                 "limit", 1, price=price)
+
+
+def closed(reg):
+    return [trd for trd in reg.get_trade() if trd.status == CLOSE]
+
+
+def test_fifo_partial_lots():
+    reg = create_registry(FIFO, pnl_calc, comm_calc, DUAL)
+    reg.on_order(create_order(BUY, 2, 100, "a"))
+    reg.on_order(create_order(BUY, 3, 110, "b"))
+    assert reg.avg_entry_price == pytest.approx(106)
+    assert not closed(reg)
+    reg.on_order(create_order(SELL, 3, 120, "c"))
+    trades = closed(reg)
+    assert [(trd.orders, trd.pnl) for trd in trades] == [(["a", "c"], 40)]
+    assert [(lot.qty, lot.price) for lot in reg.lots] == [(2, 110)]
+    assert reg.avg_entry_price == 110
+    reg.on_order(create_order(SELL, 2, 100, "d"))
+    trades = closed(reg)
+    assert [(trd.orders, trd.pnl) for trd in trades] == \
+        [(["b", "c", "d"], -10)]
+    assert reg.qty == 0 and not reg.lots
+    assert reg.realised_pnl == 30
+
+
+def test_filo_consumes_latest_lot():
+    reg = create_registry(FILO, pnl_calc, comm_calc, DUAL)
+    for oid, price in (("a", 100), ("b", 110), ("c", 120)):
+        reg.on_order(create_order(BUY, 1, price, oid))
+    assert not closed(reg)
+    reg.on_order(create_order(SELL, 2, 130, "d"))
+    trades = closed(reg)
+    assert [trd.orders[0] for trd in trades] == ["c", "b"]
+    assert [trd.pnl for trd in trades] == [10, 20]
+    assert [lot.price for lot in reg.lots] == [100]
+
+
+def test_fifo_short_lots():
+    reg = create_registry(FIFO, pnl_calc, comm_calc, DUAL)
+    reg.on_order(create_order(SELL, 1, 100, "a"))
+    reg.on_order(create_order(SELL, 1, 90, "b"))
+    trades = list(reg.get_trade())
+    assert [(trd.pos_side, trd.status) for trd in trades] == \
+        [(SHORT, OPEN), (SHORT, OPEN)]
+    reg.on_order(create_order(BUY, 2, 80, "c"))
+    assert [trd.pnl for trd in closed(reg)] == [20, 10]
+
+
+def test_aiao_closes_long():
+    reg = create_registry(AIAO, pnl_calc, comm_calc, DUAL)
+    reg.on_order(create_order(BUY, 2, 100, "a"))
+    assert not closed(reg)
+    reg.on_order(create_order(SELL, 2, 110, "b"))
+    trades = closed(reg)
+    assert [trd.pnl for trd in trades] == [20]
+    assert reg.direction == ""
@@ -0,0 +1,171 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+
+from zolo.brokers.virtual import VirtualBook, VirtualPosition
+from zolo.consts import BUY, SELL, LONG, SHORT
+from zolo.dtypes import Credential, Order, OrderStatus, Lot, Tick
+from zolo.orders import exe
+from zolo.posts import MarketOrder
+
+TS = datetime(2021, 1, 1)
+
+
+class FakeAdapter:
+    def __init__(self, fee=0.0, price=100.0):
+        self.posts = dict()
+        self.fee, self.price = fee, price
+
+    def estimate_lot(self, instrument_id, size, price=0):
+        return Lot(int(size))
+
+    def get_tick(self, instrument_id):
+        return Tick("huobi", "swap@coin", instrument_id, TS, 99.0)
+
+    def create_order(self, post):
+        oid = f"ex{len(self.posts)}"
+        self.posts[oid] = post
+        return oid
+
+    def get_order_by_client_oid(self, instrument_id, client_oid):
+        post = self.posts[client_oid]
+        return Order(post.exchange, post.market, post.side, post.pos_side,
+                     post.qty, instrument_id, client_oid, post.order_type, 1,
+                     price=self.price, fee=self.fee,
+                     state=OrderStatus.FULFILLED, filled=post.qty)
+
+
+class FakeContext:
+    leverage = 1
+    instrument_id = "BTC-USD"
+
+    def __init__(self, unique_id, adapter):
+        self.unique_id = unique_id
+        self.adapter = adapter
+        self.credential = Credential("key", "secret", "")
+        self.orders = list()
+
+    def on_order(self, order):
+        self.orders.append(order)
+
+
+def market(side, qty, pos_side=LONG):
+    return MarketOrder("huobi", "swap@coin", "BTC-USD", side, pos_side,
+                       Lot(qty))
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(exe.time, "sleep", lambda _: None)
+
+
+def submit(book, ctx, side, qty, pos_side=LONG):
+    return book.submit(ctx, market(side, qty, pos_side), TS).client_oid
+
+
+def test_cross_and_route_residual():
+    adapter, book = FakeAdapter(fee=0.2), VirtualBook(1)
+    a, b = FakeContext("a", adapter), FakeContext("b", adapter)
+    book.position("b", "BTC-USD").apply(BUY, 1, 90.0)
+    oid_a, oid_b = submit(book, a, BUY, 3), submit(book, b, SELL, 1)
+    book.refresh(TS)
+    assert not adapter.posts and book.pending == 2
+    book.refresh(TS + timedelta(seconds=1))
+    # 只有净额 2 张发往交易所
+    assert [(p.side, int(p.qty)) for p in adapter.posts.values()] == \
+        [(BUY, 2)]
+    assert [(o.client_oid, o.qty, o.price, o.fee) for o in a.orders] == \
+        [(oid_a, 3, 100.0, 0.2)]
+    assert [(o.client_oid, o.qty, o.fee) for o in b.orders] == \
+        [(oid_b, 1, 0)]
+    # 完成的订单移出未完成表, 仍可查询
+    assert book.pending == 0 and book.get_order(oid_a).qty == 3
+
+
+def test_pro_rata_fees_and_full_cross():
+    adapter, book = FakeAdapter(fee=4.0), VirtualBook(0)
+    ctx = [FakeContext(uid, adapter) for uid in "abc"]
+    book.position("c", "BTC-USD").apply(BUY, 2, 90.0)
+    submit(book, ctx[0], BUY, 2)
+    submit(book, ctx[1], BUY, 2)
+    submit(book, ctx[2], SELL, 2)
+    book.refresh(TS)
+    assert [int(p.qty) for p in adapter.posts.values()] == [2]
+    assert [(c.orders[0].qty, c.orders[0].fee) for c in ctx] == \
+        [(2, 2.0), (2, 2.0), (2, 0)]
+    # 完全对冲时不下单, 按最新价成交
+    submit(book, ctx[0], SELL, 1)
+    submit(book, ctx[1], BUY, 1)
+    book.refresh(TS)
+    assert len(adapter.posts) == 1
+    assert ctx[0].orders[-1].price == ctx[1].orders[-1].price == 99.0
+
+
+def test_no_cross_between_pos_sides():
+    adapter, book = FakeAdapter(), VirtualBook(0)
+    a, b = FakeContext("a", adapter), FakeContext("b", adapter)
+    # 开多与开空不能对冲
+    submit(book, a, BUY, 1, LONG)
+    submit(book, b, SELL, 1, SHORT)
+    book.refresh(TS)
+    assert sorted((p.pos_side, p.side) for p in adapter.posts.values()) == \
+        [(LONG, BUY), (SHORT, SELL)]
+
+
+def test_close_capped_by_own_position():
+    adapter, book = FakeAdapter(), VirtualBook(0)
+    a, b = FakeContext("a", adapter), FakeContext("b", adapter)
+    book.position("b", "BTC-USD").apply(BUY, 1, 90.0)
+    # a 没有多头仓位, 平多被拒绝, 不能与 b 的开仓对冲
+    rejected = book.submit(a, market(SELL, 2), TS)
+    assert rejected.state == OrderStatus.FAIL
+    assert book.get_order(rejected.client_oid) is rejected
+    submit(book, a, BUY, 2)
+    # b 只持有 1 张, 平 3 张被截为 1 张; 已提交未成交的平仓也计入
+    capped = book.submit(b, market(SELL, 3), TS)
+    assert capped.qty == 1
+    assert book.submit(b, market(SELL, 1), TS).state == OrderStatus.FAIL
+    book.refresh(TS)
+    assert [(p.side, int(p.qty)) for p in adapter.posts.values()] == \
+        [(BUY, 1)]
+    assert [o.qty for o in a.orders] == [2] and [o.qty for o in b.orders] == [1]
+    assert book.position("a", "BTC-USD").qty == 2
+    assert book.position("b", "BTC-USD").qty == 0
+
+
+class SlowAdapter(FakeAdapter):
+    # 净额订单第一次查询时尚未成交
+    def __init__(self):
+        super().__init__()
+        self.polls = 0
+
+    def get_order_by_client_oid(self, instrument_id, client_oid):
+        self.polls += 1
+        res = super().get_order_by_client_oid(instrument_id, client_oid)
+        if self.polls == 1:
+            return replace(res, state=OrderStatus.ONGOING, filled=0)
+        return res
+
+
+def test_route_residual_without_blocking():
+    adapter, book = SlowAdapter(), VirtualBook(0)
+    a = FakeContext("a", adapter)
+    oid = submit(book, a, BUY, 2)
+    book.refresh(TS)
+    # 净额订单已发出, 未成交前不等待也不分配
+    assert len(adapter.posts) == 1 and not a.orders and book.pending == 1
+    book.refresh(TS)
+    assert [(o.client_oid, o.qty) for o in a.orders] == [(oid, 2)]
+    assert book.pending == 0
+
+
+def test_virtual_position_pnl():
+    pos = VirtualPosition("a", "BTC-USD")
+    pos.apply(BUY, 2, 100, fee=0.1)
+    pos.apply(SELL, 1, 110, fee=0.1)
+    assert (pos.qty, pos.avg_price, pos.realised_pnl) == (1, 100, 10)
+    # 反手: 平掉剩余多头后以成交价开空
+    pos.apply(SELL, 2, 90)
+    assert (pos.qty, pos.avg_price, pos.realised_pnl) == (-1, 90, 0)
+    assert pos.fee == pytest.approx(0.2)
@@ -1,4 +1,7 @@
 from .base import Adapter, create_adapter
+from .instruments import InstrumentRegistry, instrument_registry, \
+    config_instrument_cache
+from .pool import AdapterPool, adapter_pool, get_adapter
 from .huobi_restful_adapters import HuobiRestfulAdapter, HuobiRestfulCoinMarginSwap, HuobiRestfulUsdtMarginSwap, \
     HuobiRestfulCoinMarginFuture, HuobiRestfulSpot
 from .hubi_backtest_adapters import HuobiBacktestCoinMarginSwap, HuobiBacktestCoinMarginFuture, \
@@ -1,3 +1,4 @@
+import logging
 from abc import abstractmethod, ABC
 from typing import Union, Tuple, List, Dict, Optional
 
@@ -15,11 +16,17 @@ from ..dtypes import (
     dot_concat,
     OrderBook)
 from datetime import datetime
+from .instruments import instrument_registry
+
+log = logging.getLogger(__name__)
 
 _adapter_registry = {}
 
 
 class Adapter(ABC):
+    # 合约信息由 instrument_registry 按交易所/市场共享, 见 fetch_instruments
+    shared_instruments = False
+    
     def __init__(self, mode: str, exchange: str, market: str, cred: Credential):
         self._client = None
         self._mode = mode
@@ -59,6 +66,10 @@ class Adapter(ABC):
     ) -> InstrumentInfo:
         pass
     
+    def fetch_instruments(self) -> Dict[str, InstrumentInfo]:
+        # 向交易所请求全部合约信息, 只由 instrument_registry 调用
+        raise NotImplementedError
+    
     @abstractmethod
     def estimate_lot(self, instrument_id: str, size: float,
                      price: float = 0) -> Lot:
@@ -68,6 +79,18 @@ class Adapter(ABC):
     def create_order(self, post: OrderPost) -> str:
         pass
     
+    def create_orders(self, posts: List[OrderPost]) -> List[Optional[str]]:
+        # 默认逐个下单, 有批量下单接口的交易所可覆盖为一次请求;
+        # 结果与 posts 一一对应, 下单失败的为 None, 不影响已提交的订单
+        res = list()
+        for post in posts:
+            try:
+                res.append(self.create_order(post))
+            except Exception as e:
+                log.exception(e)
+                res.append(None)
+        return res
+    
     @abstractmethod
     def transfer_margin_to_asset(self, symbol: str, amount: float) -> float:
         pass
@@ -182,6 +205,9 @@ class Adapter(ABC):
 def create_adapter(
     mode: str, exchange: str, market: str, credential: Credential
 ) -> "Adapter":
-    return _adapter_registry[(mode, exchange, market)](
+    res = _adapter_registry[(mode, exchange, market)](
         mode, exchange, market, credential
     )
+    if res.shared_instruments:
+        instrument_registry.feed(res)
+    return res
@@ -7,6 +7,7 @@ from ..dtypes import Order, Bar, Trade, Fill, Margin, Position, Tick, \
 from datetime import datetime, timedelta
 import time
 from . import Adapter
+from .huobi_klines import get_last_n_bars, kline_period
 from ..consts import DRYRUN
 from ..engine import vtx
 from ..posts import OrderPostType
@@ -112,7 +113,7 @@ class HuobiDryrunAdapter(Adapter, mode=DRYRUN, exchange="huobi"):
         pass
 
     def get_latest_bar(self, instrument_id: str, granularity: int) -> Bar:
-        granularity_sym = f"{granularity}min"
+        granularity_sym = kline_period(granularity)
         prev = datetime.utcnow() - timedelta(minutes=granularity)
         try:
             res = self.client.get_market_history_kline(
@@ -141,7 +142,10 @@ class HuobiDryrunAdapter(Adapter, mode=DRYRUN, exchange="huobi"):
         pass
 
     def get_last_n_bars(self, cnt: int, instrument_id: str, granularity: int):
-        pass
+        return get_last_n_bars(
+            self._client, self.exchange, self.market, cnt, instrument_id,
+            granularity
+        )
 
     def get_fill(
             self, instrument_id: str, before: datetime, after: datetime,
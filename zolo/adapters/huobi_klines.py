@@ -0,0 +1,57 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List
+
+from ..consts import HUOBI_KLINE_LIMIT
+from ..dtypes import Bar
+from ..exceptions import BarGetError
+
+log = logging.getLogger(__name__)
+
+# 火币 kline 的 period 参数, 4 小时以上不是 "{n}min" 形式
+_PERIODS = {
+    1: "1min", 5: "5min", 15: "15min", 30: "30min", 60: "60min",
+    240: "4hour", 1440: "1day", 7 * 1440: "1week",
+}
+
+
+def kline_period(granularity: int) -> str:
+    try:
+        return _PERIODS[granularity]
+    except KeyError:
+        raise ValueError(f"Huobi has no {granularity}min kline")
+
+
+# 火币各市场的 kline 接口参数与返回格式一致, restful/dryrun adapter 共用
+def get_last_n_bars(
+    client, exchange: str, market: str, cnt: int, instrument_id: str,
+    granularity: int
+) -> List[Bar]:
+    period = kline_period(granularity)
+    # 除未走完的 bar 外再多取一根, 避免 from_ts 未对齐时少一根;
+    # 单次请求最多 HUOBI_KLINE_LIMIT 根, 按 from_ts 分页
+    total = cnt + 2
+    start = datetime.utcnow() - timedelta(minutes=(cnt + 1) * granularity)
+    rows = dict()
+    for offset in range(0, total, HUOBI_KLINE_LIMIT):
+        size = min(HUOBI_KLINE_LIMIT, total - offset)
+        prev = start + timedelta(minutes=offset * granularity)
+        try:
+            res = client.get_market_history_kline(
+                instrument_id, period, size=f"{size}", from_ts=prev
+            )
+        except Exception as e:
+            log.exception(e)
+            raise BarGetError
+        rows.update((int(r["id"]), r) for r in res["data"])
+    # 最后一根 bar 尚未走完, 丢弃
+    res = [rows[k] for k in sorted(rows)][:-1]
+    res = res[max(len(res) - cnt, 0):]
+    return [Bar(
+        exchange, market, instrument_id,
+        datetime.utcfromtimestamp(int(r["id"])),
+        float(r["open"]), float(r["close"]), float(r["high"]),
+        float(r["low"]), volume=int(r["vol"]),
+        currency_volume=float(r["amount"]),
+        granularity=granularity
+    ) for r in res]
@@ -16,6 +16,8 @@ from zolo.consts import INVALID, MAX_INT
 from datetime import datetime, timedelta
 import time
 from . import Adapter
+from .instruments import instrument_registry
+from .huobi_klines import get_last_n_bars, kline_period
 from ..consts import RESTFUL, MAX_FLOAT, UNIX_EPOCH, BUY, SELL, LONG, SHORT, \
     OPEN, CLOSE, DEFAULT_LEVERAGE
 from huobi_restful.clients import HuobiCoinMarginSwap, HuobiUsdtMarginSwap, \
@@ -74,7 +76,7 @@ class HuobiRestfulAdapter(Adapter, mode=RESTFUL, exchange="huobi"):
         pass
     
     def get_latest_bar(self, instrument_id: str, granularity: int) -> Bar:
-        granularity_sym = f"{granularity}min"
+        granularity_sym = kline_period(granularity)
         prev = datetime.utcnow() - timedelta(minutes=granularity)
         try:
             res = self._client.get_market_history_kline(
@@ -103,7 +105,10 @@ class HuobiRestfulAdapter(Adapter, mode=RESTFUL, exchange="huobi"):
         pass
     
     def get_last_n_bars(self, cnt: int, instrument_id: str, granularity: int):
-        pass
+        return get_last_n_bars(
+            self._client, self.exchange, self.market, cnt, instrument_id,
+            granularity
+        )
     
     def get_fill(
         self, instrument_id: str, before: datetime, after: datetime, limit=100
@@ -145,22 +150,27 @@ class HuobiRestfulUsdtMarginSwap(HuobiRestfulAdapter, market="swap@usdt"):
 
 
 class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
+    shared_instruments = True
     
     def estimate_lot(
         self, instrument_id: str, size: float, price: float = 0
     ) -> Lot:
         instrument_id = instrument_id.upper()
         contract_value = float(
-            self._instrument_registry[instrument_id].contract_value)
+            instrument_registry.get(self, instrument_id).contract_value)
         return Lot(int(size * price / contract_value))
     
     def __init__(self, *args):
         super().__init__(*args)
         self._client = HuobiCoinMarginFuture(
             self.credential.api_key, self.credential.secret_key)
-        self._instrument_registry = self.get_all_instruments()
-        self._leverage = DEFAULT_LEVERAGE
-        assert self._instrument_registry
+        # adapter 按 key 在多个 context 间共享; 交割合约同一币种的各期合约
+        # 共用一个杠杆, 按 base_currency 记录
+        self._leverage: Dict[str, int] = dict()
+    
+    @property
+    def _instrument_registry(self) -> Dict[str, InstrumentInfo]:
+        return instrument_registry.feed(self)
     
     @property
     def max_optimal_depth(self) -> int:
@@ -252,7 +262,7 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
             return "NQ"
         raise ValueError
     
-    def get_all_instruments(self) -> Dict[str, InstrumentInfo]:
+    def fetch_instruments(self) -> Dict[str, InstrumentInfo]:
         ret = dict()
         res = self._client.get_contract_contract_info()
         assert res["status"] == "ok"
@@ -285,10 +295,13 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
             )
         return ret
     
+    def get_all_instruments(self) -> Dict[str, InstrumentInfo]:
+        return self._instrument_registry.copy()
+    
     def get_instrument_info(self, instrument_id: str) -> InstrumentInfo:
         assert instrument_id
         instrument_id = instrument_id.upper()
-        return self._instrument_registry[instrument_id]
+        return instrument_registry.get(self, instrument_id)
     
     def get_book(
         self, instrument_id: str, depth: int
@@ -425,24 +438,27 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
         log.warning(f"all the future@coin use one leverage")
         assert instrument_id
         instrument_id = instrument_id.upper()
+        base_sym = instrument_registry.get(self, instrument_id).base_currency
         mrg = self.get_margin(instrument_id)
         if mrg != MARGIN_EMPTY:
-            self._leverage = int(mrg.leverage)
-        return self._leverage
+            self._leverage[base_sym] = int(mrg.leverage)
+        return self._leverage.get(base_sym, DEFAULT_LEVERAGE)
 
     def set_leverage(self, instrument_id: str, lv: float):
         log.warning(f"all the future@coin use one leverage")
         assert instrument_id
         instrument_id = instrument_id.upper()
-        base_sym = self._instrument_registry[instrument_id].base_currency
-        self._leverage = int(lv)
-        self._client.post_contract_switch_lever_rate(base_sym, self._leverage)
+        base_sym = instrument_registry.get(self, instrument_id).base_currency
+        self._leverage[base_sym] = int(lv)
+        self._client.post_contract_switch_lever_rate(base_sym, int(lv))
     
     def create_order(self, post: OrderPostType) -> str:
-        assert self._leverage != DEFAULT_LEVERAGE
         assert self.exchange == post.exchange and self.market == post.market
         instrument_id = post.instrument_id.upper()
-        instrument = self._instrument_registry[instrument_id]
+        instrument = instrument_registry.get(self, instrument_id)
+        leverage = self._leverage.get(
+            instrument.base_currency, DEFAULT_LEVERAGE)
+        assert leverage != DEFAULT_LEVERAGE
         price = round_down(str(instrument.tick_size), getattr(post, "price", 0))
         qty = post.qty
         direction, offset = self._get_direction_and_offset(post)
@@ -456,7 +472,7 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
             res = self._client.post_order(
                 contract_code=instrument_id, price=str(price), volume=str(qty),
                 order_price_type=order_type, client_order_id=client_oid,
-                direction=direction, offset=offset, lever_rate=self._leverage
+                direction=direction, offset=offset, lever_rate=leverage
             )
             if res["status"] != "ok":
                 log.error(f"{res}")
@@ -470,7 +486,7 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
     def get_order_by_client_oid(self, instrument_id, client_order_id) -> Order:
         assert instrument_id
         instrument_id = instrument_id.upper()
-        symbol = self._instrument_registry[instrument_id].base_currency
+        symbol = instrument_registry.get(self, instrument_id).base_currency
         try:
             res = self._client.get_contract_order_info(
                 symbol=symbol, client_order_id=client_order_id)
@@ -495,7 +511,7 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
             else:
                 finished_at = UNIX_EPOCH
             
-            if res["lever_rate"] != self._leverage:
+            if res["lever_rate"] != self._leverage.get(symbol):
                 raise RuntimeError()
             
             return Order(
@@ -515,7 +531,7 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
     ) -> Union[List[Position], Position]:
         if instrument_id:
             instrument_id = instrument_id.upper()
-            base = self._instrument_registry[instrument_id].base_currency
+            base = instrument_registry.get(self, instrument_id).base_currency
         else:
             base = ""
         try:
@@ -535,8 +551,8 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
             realised_pnl = float(r["profit"]) - unrealised_pnl
             last_price = float(r["last_price"])
             contract_code = r["contract_code"].upper()
-            contract_value = \
-                float(self._instrument_registry[contract_code].contract_value)
+            contract_value = float(instrument_registry.get(
+                self, contract_code).contract_value)
             leverage = int(r["lever_rate"])
             home_notional = volume * contract_value / last_price
             if instrument_id:
@@ -572,7 +588,7 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
     def get_margin(self, instrument_id: str = "") -> Union[List[Margin], Margin]:
         if instrument_id:
             instrument_id = instrument_id.upper()
-            symbol = self._instrument_registry[instrument_id].base_currency
+            symbol = instrument_registry.get(self, instrument_id).base_currency
         else:
             symbol = ""
         try:
@@ -623,27 +639,41 @@ class HuobiRestfulCoinMarginFuture(HuobiRestfulAdapter, market="future@coin"):
     def cancel_order(self, instrument_id: str, client_oid: str):
         assert instrument_id
         instrument_id = instrument_id.upper()
-        symbol = self._instrument_registry[instrument_id].base_currency
+        symbol = instrument_registry.get(self, instrument_id).base_currency
         return self._client.cancel_order(symbol, client_oid)
     
     def cancel_all_orders(self, instrument_id: str):
-        symbol = self._instrument_registry[instrument_id].base_currency
+        symbol = instrument_registry.get(self, instrument_id).base_currency
         return self._client.cancel_all_orders(symbol)
 
 
 class HuobiRestfulSpot(HuobiRestfulAdapter, market="spot"):
+    shared_instruments = True
     
     def __init__(self, *args):
         super().__init__(*args)
         self._client = HuobiSpot(
             self.credential.api_key, self.credential.secret_key
         )
-        self._instrument_registry: Dict[str, InstrumentInfo] = dict()
-        self._account_id: str = ""
+        self._account_id = INVALID
+        if self.credential != CREDENTIAL_EMPTY:
+            res = self._client.get_accounts()
+            assert res["status"] == "ok"
+            for r in res["data"]:
+                if r["type"] == "spot" and r["state"] == "working":
+                    self._account_id = r["id"]
+            assert self._account_id
+    
+    @property
+    def _instrument_registry(self) -> Dict[str, InstrumentInfo]:
+        return instrument_registry.feed(self)
+    
+    def fetch_instruments(self) -> Dict[str, InstrumentInfo]:
+        ret = dict()
         res = self._client.get_symbols()
         assert res["status"] == "ok"
         for r in res["data"]:
-            self._instrument_registry[r["symbol"]] = InstrumentInfo(
+            ret[r["symbol"]] = InstrumentInfo(
                 instrument_type="spot",
                 instrument_id=r["symbol"],
                 underlying=INVALID,
@@ -664,15 +694,7 @@ class HuobiRestfulSpot(HuobiRestfulAdapter, market="spot"):
                 contract_type=INVALID,
                 alias=INVALID,
                 state=bool(r["state"] == "online"))
-        
-        self._account_id = INVALID
-        if self.credential != CREDENTIAL_EMPTY:
-            res = self._client.get_accounts()
-            assert res["status"] == "ok"
-            for r in res["data"]:
-                if r["type"] == "spot" and r["state"] == "working":
-                    self._account_id = r["id"]
-            assert self._account_id
+        return ret
     
     @property
     def max_optimal_depth(self) -> int:
@@ -682,7 +704,7 @@ class HuobiRestfulSpot(HuobiRestfulAdapter, market="spot"):
         return self._instrument_registry.copy()
     
     def get_instrument_info(self, instrument_id: str) -> InstrumentInfo:
-        return self._instrument_registry[instrument_id]
+        return instrument_registry.get(self, instrument_id)
     
     def estimate_lot(self, instrument_id: str, size: float, price: float = 0):
         raise NotImplementedError("Lot is for delivery or swap")
@@ -754,7 +776,7 @@ class HuobiRestfulSpot(HuobiRestfulAdapter, market="spot"):
     def create_order(self, post: OrderPostType) -> str:
         assert self.exchange == post.exchange and self.market == post.market
         instrument_id = post.instrument_id
-        instrument = self._instrument_registry[instrument_id]
+        instrument = instrument_registry.get(self, instrument_id)
         price = round_down(instrument.tick_size, getattr(post, "price", 0))
         qty = round_down(instrument.lot_size, float(post.qty))
         
@@ -0,0 +1,125 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Dict, Tuple
+
+from ..consts import INSTRUMENT_CACHE_TTL, INSTRUMENT_MISS_REFRESH
+from ..dtypes import InstrumentInfo
+
+log = logging.getLogger(__name__)
+
+_PATH = ""
+_TTL = INSTRUMENT_CACHE_TTL
+
+# (exchange, market)
+MarketKey = Tuple[str, str]
+
+
+def config_instrument_cache(path: str, ttl: float = INSTRUMENT_CACHE_TTL):
+    global _PATH, _TTL
+    _PATH, _TTL = path, ttl
+    instrument_registry.load()
+
+
+# 进程内共享的合约信息: 同一交易所/市场的全部 adapter 共用一份, 按 TTL 刷新,
+# 并写入本地文件, 重启时直接从文件载入, 不再逐个 adapter 请求交易所.
+class InstrumentRegistry:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._markets: Dict[MarketKey, Dict[str, InstrumentInfo]] = dict()
+        self._loaded_at: Dict[MarketKey, float] = dict()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(_PATH)
+
+    def load(self):
+        if not self.enabled or not os.path.exists(_PATH):
+            return
+        try:
+            with open(_PATH, "rb") as f:
+                res = pickle.load(f)
+        except Exception as e:
+            log.exception(e)
+            return
+        with self._lock:
+            # 过期的也先载入, 首次使用时刷新, 刷新失败时仍可沿用
+            for key, (loaded_at, instruments) in res.items():
+                if loaded_at > self._loaded_at.get(key, 0):
+                    self._markets[key] = instruments
+                    self._loaded_at[key] = loaded_at
+        log.info(f"[INSTRUMENT] load {len(res)} markets from {_PATH}")
+
+    def save(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            payload = pickle.dumps({
+                key: (self._loaded_at[key], instruments)
+                for key, instruments in self._markets.items()
+            }, pickle.HIGHEST_PROTOCOL)
+        # 先写临时文件再替换, 避免进程中断留下损坏的缓存
+        tmp = f"{_PATH}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, _PATH)
+
+    def expired(self, exchange: str, market: str) -> bool:
+        loaded_at = self._loaded_at.get((exchange, market))
+        return loaded_at is None or time.time() - loaded_at > _TTL
+
+    def feed(self, adapter: "Adapter") -> Dict[str, InstrumentInfo]:
+        key = adapter.exchange, adapter.market
+        if not self.expired(*key):
+            return self._markets[key]
+        with self._lock:
+            # 拿到锁后再检查一次, 并发时只有一个线程请求交易所
+            if not self.expired(*key):
+                return self._markets[key]
+            try:
+                instruments = adapter.fetch_instruments()
+                assert instruments
+            except Exception as e:
+                if key not in self._markets:
+                    raise
+                log.exception(e)
+                log.warning(f"[INSTRUMENT] refresh {key} failed, keep stale")
+                self._loaded_at[key] = time.time()
+                return self._markets[key]
+            self._markets[key] = instruments
+            self._loaded_at[key] = time.time()
+            try:
+                self.save()
+            except Exception as e:
+                log.exception(e)
+            return instruments
+
+    def get(self, adapter: "Adapter", instrument_id: str) -> InstrumentInfo:
+        instruments = self.feed(adapter)
+        if instrument_id not in instruments:
+            # 合约代码会随交割滚动(如 future@coin 每周换代码), 先强制刷新再查
+            instruments = self.refresh(adapter)
+        return instruments[instrument_id]
+
+    def refresh(self, adapter: "Adapter") -> Dict[str, InstrumentInfo]:
+        key = adapter.exchange, adapter.market
+        with self._lock:
+            loaded_at = self._loaded_at.get(key, 0)
+            if time.time() - loaded_at >= INSTRUMENT_MISS_REFRESH:
+                self._loaded_at.pop(key, None)
+            return self.feed(adapter)
+
+    def invalidate(self, exchange: str, market: str):
+        with self._lock:
+            self._loaded_at.pop((exchange, market), None)
+
+    def clear(self):
+        with self._lock:
+            self._markets.clear()
+            self._loaded_at.clear()
+
+
+instrument_registry: InstrumentRegistry = InstrumentRegistry()
@@ -0,0 +1,65 @@
+import threading
+from typing import Dict, Tuple
+
+from .base import Adapter, create_adapter
+from ..dtypes import Credential
+
+# (mode, exchange, market, api_key)
+PoolKey = Tuple[str, str, str, str]
+
+
+# 同一 key 的 adapter 进程内只创建一次: 各 context 和网关 channel 共用同一个
+# adapter 及其 http 长连接, 省去重复的 TLS 握手和客户端内存.
+class AdapterPool:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._adapters: Dict[PoolKey, Adapter] = dict()
+        # 每个 key 一把锁, 创建较慢的 adapter 时不阻塞其他 key
+        self._creating: Dict[PoolKey, threading.Lock] = dict()
+
+    @staticmethod
+    def pool_key(
+        mode: str, exchange: str, market: str, credential: Credential
+    ) -> PoolKey:
+        return mode, exchange, market, credential.api_key if credential else ""
+
+    def get(
+        self, mode: str, exchange: str, market: str, credential: Credential
+    ) -> Adapter:
+        key = self.pool_key(mode, exchange, market, credential)
+        res = self._adapters.get(key)
+        if res is not None:
+            return res
+        with self._lock:
+            lock = self._creating.setdefault(key, threading.Lock())
+        with lock:
+            res = self._adapters.get(key)
+            if res is None:
+                res = create_adapter(mode, exchange, market, credential)
+                with self._lock:
+                    self._adapters[key] = res
+        return res
+
+    def discard(self, adapter: Adapter):
+        with self._lock:
+            self._adapters = {
+                k: v for k, v in self._adapters.items() if v is not adapter
+            }
+
+    def clear(self):
+        with self._lock:
+            self._adapters.clear()
+            self._creating.clear()
+
+    def __len__(self) -> int:
+        return len(self._adapters)
+
+
+adapter_pool: AdapterPool = AdapterPool()
+
+
+def get_adapter(
+    mode: str, exchange: str, market: str, credential: Credential
+) -> Adapter:
+    return adapter_pool.get(mode, exchange, market, credential)
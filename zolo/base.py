@@ -118,7 +118,9 @@ class BrokerContext(ABC):
         pass
 
     @abstractmethod
-    def register_on_bar(self, granularity: int, on_bar: Callable):
+    def register_on_bar(
+        self, granularity: int, on_bar: Callable, instrument_id: str = ""
+    ):
         pass
 
     @abstractmethod
@@ -299,7 +301,9 @@ class Broker(ABC):
         pass
 
     @abstractmethod
-    def register_on_bar(self, granularity: int, on_bar: Callable):
+    def register_on_bar(
+        self, granularity: int, on_bar: Callable, instrument_id: str = ""
+    ):
         pass
 
     @abstractmethod
@@ -1,6 +1,6 @@
 from typing import TypeVar
 from .sharp import SharpRatio
-from .base import create_benchmark, Benchmark
+from .base import create_benchmark, Benchmark, merge_benchmarks
 from .profitfactor import ProfitFactor
 from .drawdown import Drawdown
 from .timeret import TimeReturn
@@ -1,5 +1,9 @@
 import abc
-from typing import Dict, Type
+from datetime import datetime
+from functools import reduce
+from typing import Dict, Type, Iterable
+
+from ..consts import UNIX_EPOCH, BENCHMARK_SAMPLE_INTERVAL
 
 
 class BenchmarkRegistry:
@@ -30,5 +34,76 @@ class Benchmark(abc.ABC):
     def api_key(self) -> str:
         return self._api_key
 
+    # state 只包含可序列化的基础类型, merge 满足结合律, 用于汇总分片回测结果
+    def state(self) -> dict:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support merging"
+        )
+
+    def merge(self, state: dict) -> "Benchmark":
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support merging"
+        )
+
+
+class EquitySampler:
+    # 按固定时间网格对账户权益采样, due 为 O(1), 调用方只在到期时查询权益
+    
+    # 为 True 时平仓成交后立即额外采样一次
+    mark_on_trade: bool = False
+    # 为 True 时权益取账户下所有合约保证金余额之和
+    portfolio: bool = False
+    
+    def __init__(self, interval: int = BENCHMARK_SAMPLE_INTERVAL):
+        assert interval > 0
+        self._interval = int(interval)
+        self._next_ts = 0
+        self._last_equity = 0.0
+        self._last_ts: datetime = UNIX_EPOCH
+    
+    @property
+    def interval(self) -> int:
+        return self._interval
+    
+    @property
+    def last_equity(self) -> float:
+        return self._last_equity
+    
+    @property
+    def last_ts(self) -> datetime:
+        return self._last_ts
+    
+    def due(self, ts: datetime) -> bool:
+        return (ts - UNIX_EPOCH).total_seconds() >= self._next_ts
+    
+    def advance(self, ts: datetime) -> float:
+        seconds = (ts - UNIX_EPOCH).total_seconds()
+        self._next_ts = (seconds // self._interval + 1) * self._interval
+        return seconds
+    
+    def mark(self, ts: datetime, equity: float):
+        if not self.due(ts):
+            return
+        self.advance(ts)
+        prev, self._last_equity, self._last_ts = \
+            self._last_equity, equity, ts
+        if prev > 0:
+            self.on_return(ts, equity / prev - 1)
+    
+    def on_return(self, ts: datetime, ret: float):
+        pass
+
 
 create_benchmark = BenchmarkRegistry.create_benchmark
+
+
+def merge_benchmarks(
+    alias: str, api_key: str, states: Iterable[dict], **kwargs
+) -> Benchmark:
+    benchmark_class = BenchmarkRegistry.registry[alias]
+    if benchmark_class.merge is Benchmark.merge:
+        raise TypeError(f"Benchmark {alias} does not support merging")
+    return reduce(
+        lambda bch, state: bch.merge(state), states,
+        create_benchmark(alias, api_key, **kwargs)
+    )
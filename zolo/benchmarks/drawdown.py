@@ -1,5 +1,228 @@
-from .base import Benchmark
+from array import array
+from datetime import datetime, timedelta
+from typing import List, Tuple
 
+from ..consts import UNIX_EPOCH, MAX_FLOAT
+from .base import Benchmark, EquitySampler
 
-class Drawdown(Benchmark, alias="drawdown"):
-    pass
+# 回撤按时间采样的默认间隔(秒)
+DRAWDOWN_SAMPLE_INTERVAL = 60
+
+
+def _seconds(ts: datetime) -> float:
+    return (ts - UNIX_EPOCH).total_seconds()
+
+
+def _datetime(seconds: float) -> datetime:
+    return UNIX_EPOCH + timedelta(seconds=seconds)
+
+
+def _combine(a: dict, b: dict) -> dict:
+    # a 在时间上早于 b.
+    # 回撤深度是精确的: b 未创新高时, b 全程以 a 的峰值为基准, 取 b 的最低点;
+    # b 创新高时, 越过 a 峰值之前的最低点不低于 b 到达峰值前的最低点, 之后与 b
+    # 自身的回撤一致.
+    # 时长无法用 O(1) 状态精确还原, b 创新高时以 b 的峰值时间作为越过 a 峰值
+    # 的时间(最长回撤时长取上界), 水下时长不计 b 越过 a 峰值之前的部分(下界).
+    new_high = b["peak"] > a["peak"]
+    floor = "low" if new_high else "trough"
+    cross = max(1 - b[floor] / a["peak"], 0)
+    res = dict(a)
+    res.update(last_ts=b["last_ts"], last_equity=b["last_equity"])
+    if b["trough"] < a["trough"]:
+        res.update(trough=b["trough"], trough_ts=b["trough_ts"])
+    if new_high:
+        res.update(
+            peak=b["peak"], peak_ts=b["peak_ts"],
+            dd=b["dd"], duration=b["duration"],
+        )
+        if b["low"] < a["trough"]:
+            res.update(low=b["low"], low_ts=b["low_ts"])
+        else:
+            res.update(low=a["trough"], low_ts=a["trough_ts"])
+        cross_duration = b["peak_ts"] - a["peak_ts"]
+    else:
+        res.update(
+            dd=max(1 - b["last_equity"] / a["peak"], 0),
+            duration=b["last_ts"] - a["peak_ts"],
+        )
+        cross_duration = res["duration"]
+    if b["max_dd"] > res["max_dd"]:
+        res.update(max_dd=b["max_dd"], max_dd_ts=b["max_dd_ts"])
+    if cross > res["max_dd"]:
+        res.update(max_dd=cross, max_dd_ts=b[f"{floor}_ts"])
+    res["max_duration"] = max(
+        a["max_duration"], b["max_duration"], cross_duration
+    )
+    # a 结束时处于水下, 分片间隔也计入水下时长
+    gap = b["first_ts"] - a["last_ts"] if a["dd"] > 0 else 0
+    if new_high:
+        res["under_water"] = a["under_water"] + gap + b["under_water"]
+    else:
+        res["under_water"] = a["under_water"] + gap + \
+            b["last_ts"] - b["first_ts"]
+    return res
+
+
+class Drawdown(Benchmark, EquitySampler, alias="drawdown"):
+    # 每次权益标记 O(1) 更新峰值/回撤/水下时长, 不回放历史
+    
+    mark_on_trade = True
+    
+    def __init__(
+        self, api_key: str, interval: int = DRAWDOWN_SAMPLE_INTERVAL,
+        curve: int = 0, portfolio: bool = False
+    ):
+        Benchmark.__init__(self, api_key)
+        EquitySampler.__init__(self, interval)
+        self.portfolio = portfolio
+        self._peak = 0.0
+        self._peak_ts: datetime = UNIX_EPOCH
+        self._dd = 0.0
+        self._max_dd = 0.0
+        self._max_dd_ts: datetime = UNIX_EPOCH
+        self._duration = timedelta()
+        self._max_duration = timedelta()
+        self._under_water = timedelta()
+        # 最低权益与到达峰值之前的最低权益, 用于跨分片合并回撤
+        self._first_ts: datetime = UNIX_EPOCH
+        self._trough, self._trough_ts = MAX_FLOAT, UNIX_EPOCH
+        self._low, self._low_ts = MAX_FLOAT, UNIX_EPOCH
+        # 水下曲线: 定长数组, 填满后相邻两格取较大回撤合并, 步长翻倍
+        self._capacity = curve
+        self._curve = array("d")
+        self._curve_start = 0.0
+        self._stride = float(interval)
+    
+    def mark(self, ts: datetime, equity: float):
+        # 早于上一次标记的权益直接丢弃: 峰值/时长/水下曲线都只能向前推进
+        if equity <= 0 or ts < self._last_ts:
+            return
+        self.advance(ts)
+        if self._last_ts != UNIX_EPOCH and self._dd > 0:
+            self._under_water += ts - self._last_ts
+        if self._first_ts == UNIX_EPOCH:
+            self._first_ts = ts
+        self._last_equity, self._last_ts = equity, ts
+        if equity < self._trough:
+            self._trough, self._trough_ts = equity, ts
+        if equity >= self._peak:
+            self._peak, self._peak_ts = equity, ts
+            self._low, self._low_ts = self._trough, self._trough_ts
+            self._dd = 0.0
+            self._duration = timedelta()
+        else:
+            self._dd = 1 - equity / self._peak
+            self._duration = ts - self._peak_ts
+            if self._dd > self._max_dd:
+                self._max_dd, self._max_dd_ts = self._dd, ts
+            if self._duration > self._max_duration:
+                self._max_duration = self._duration
+        if self._capacity:
+            self._record(ts)
+    
+    def _record(self, ts: datetime):
+        seconds = (ts - UNIX_EPOCH).total_seconds()
+        if not self._curve:
+            self._curve_start = seconds
+        idx = int((seconds - self._curve_start) // self._stride)
+        while idx >= self._capacity:
+            self._compact()
+            idx = int((seconds - self._curve_start) // self._stride)
+        if idx < len(self._curve):
+            self._curve[-1] = max(self._curve[-1], self._dd)
+            return
+        # 中间没有标记的格子沿用上一次的回撤
+        fill = self._curve[-1] if self._curve else self._dd
+        while len(self._curve) < idx:
+            self._curve.append(fill)
+        self._curve.append(self._dd)
+    
+    def _compact(self):
+        curve = self._curve
+        self._curve = array("d", (
+            max(curve[i:i + 2]) for i in range(0, len(curve), 2)
+        ))
+        self._stride *= 2
+    
+    def state(self) -> dict:
+        return dict(
+            peak=self._peak, peak_ts=_seconds(self._peak_ts),
+            dd=self._dd, max_dd=self._max_dd,
+            max_dd_ts=_seconds(self._max_dd_ts),
+            duration=self._duration.total_seconds(),
+            max_duration=self._max_duration.total_seconds(),
+            under_water=self._under_water.total_seconds(),
+            first_ts=_seconds(self._first_ts),
+            last_ts=_seconds(self._last_ts), last_equity=self._last_equity,
+            trough=self._trough, trough_ts=_seconds(self._trough_ts),
+            low=self._low, low_ts=_seconds(self._low_ts),
+        )
+    
+    def merge(self, state: dict) -> "Drawdown":
+        # 分片按时间先后合并, 与合并调用顺序无关
+        a, b = self.state(), state
+        if a["first_ts"] > b["first_ts"] and b["peak"]:
+            a, b = b, a
+        self._load(_combine(a, b) if a["peak"] and b["peak"] else
+                   (a if a["peak"] else b))
+        return self
+    
+    def _load(self, state: dict):
+        self._peak, self._dd, self._max_dd = \
+            state["peak"], state["dd"], state["max_dd"]
+        self._peak_ts, self._max_dd_ts = \
+            _datetime(state["peak_ts"]), _datetime(state["max_dd_ts"])
+        self._duration = timedelta(seconds=state["duration"])
+        self._max_duration = timedelta(seconds=state["max_duration"])
+        self._under_water = timedelta(seconds=state["under_water"])
+        self._first_ts, self._last_ts = \
+            _datetime(state["first_ts"]), _datetime(state["last_ts"])
+        self._last_equity = state["last_equity"]
+        self._trough, self._trough_ts = \
+            state["trough"], _datetime(state["trough_ts"])
+        self._low, self._low_ts = state["low"], _datetime(state["low_ts"])
+    
+    @property
+    def peak(self) -> float:
+        return self._peak
+    
+    @property
+    def drawdown(self) -> float:
+        return self._dd
+    
+    @property
+    def max_drawdown(self) -> float:
+        return self._max_dd
+    
+    @property
+    def max_drawdown_ts(self) -> datetime:
+        return self._max_dd_ts
+    
+    @property
+    def duration(self) -> timedelta:
+        return self._duration
+    
+    @property
+    def max_duration(self) -> timedelta:
+        return self._max_duration
+    
+    @property
+    def under_water(self) -> timedelta:
+        return self._under_water
+    
+    @property
+    def stride(self) -> float:
+        return self._stride
+    
+    def underwater_curve(self) -> List[Tuple[datetime, float]]:
+        start = UNIX_EPOCH + timedelta(seconds=self._curve_start)
+        return [
+            (start + timedelta(seconds=i * self._stride), dd)
+            for i, dd in enumerate(self._curve)
+        ]
+    
+    def __repr__(self):
+        return f"Drawdown(current:{self._dd:.4f}, max:{self._max_dd:.4f}, " \
+               f"max_duration:{self._max_duration}, " \
+               f"under_water:{self._under_water})"
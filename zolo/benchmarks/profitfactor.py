@@ -8,8 +8,8 @@ log = logging.getLogger(__name__)
 
 class ProfitFactor(Benchmark, alias="profitfactor"):
     
-    def __init__(self):
-        pass
+    def __init__(self, api_key: str):
+        super().__init__(api_key)
     
     def on_trade(self, trade: Trade):
         log.info(f"profitfactor on trade: {trade}")
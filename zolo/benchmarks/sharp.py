@@ -1,5 +1,87 @@
-from .base import Benchmark
+import math
+from datetime import datetime
 
+from ..consts import BENCHMARK_SAMPLE_INTERVAL, BENCHMARK_PERIODS_PER_YEAR
+from .base import Benchmark, EquitySampler
 
-class SharpRatio(Benchmark, alias="sharp"):
-    pass
+
+class SharpRatio(Benchmark, EquitySampler, alias="sharp"):
+    # 收益序列不落地, 只维护 Welford 均值/二阶矩与下行平方和
+    
+    def __init__(
+        self, api_key: str, interval: int = BENCHMARK_SAMPLE_INTERVAL,
+        periods: int = BENCHMARK_PERIODS_PER_YEAR, risk_free: float = 0.0
+    ):
+        Benchmark.__init__(self, api_key)
+        EquitySampler.__init__(self, interval)
+        # risk_free 为年化无风险收益率, 折算到每个采样周期
+        self._periods = periods
+        self._rf = risk_free / periods
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._down = 0.0
+    
+    def on_return(self, ts: datetime, ret: float):
+        ret -= self._rf
+        self._n += 1
+        delta = ret - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (ret - self._mean)
+        if ret < 0:
+            self._down += ret * ret
+    
+    def state(self) -> dict:
+        return dict(
+            interval=self._interval, periods=self._periods, rf=self._rf,
+            n=self._n, mean=self._mean, m2=self._m2, down=self._down,
+        )
+    
+    def merge(self, state: dict) -> "SharpRatio":
+        assert (state["interval"], state["periods"], state["rf"]) == (
+            self._interval, self._periods, self._rf
+        ), "Can not merge sharp ratio sampled differently"
+        # Chan 并行合并: 均值按样本数加权, 二阶矩补上均值差项
+        n = self._n + state["n"]
+        if not state["n"]:
+            return self
+        delta = state["mean"] - self._mean
+        self._mean += delta * state["n"] / n
+        self._m2 += state["m2"] + delta * delta * self._n * state["n"] / n
+        self._down += state["down"]
+        self._n = n
+        return self
+    
+    @property
+    def count(self) -> int:
+        return self._n
+    
+    @property
+    def mean(self) -> float:
+        return self._mean
+    
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self._n - 1) if self._n > 1 else 0.0
+    
+    @property
+    def downside_variance(self) -> float:
+        return self._down / self._n if self._n else 0.0
+    
+    @property
+    def ratio(self) -> float:
+        std = math.sqrt(self.variance)
+        if not std:
+            return 0.0
+        return self._mean / std * math.sqrt(self._periods)
+    
+    @property
+    def sortino(self) -> float:
+        std = math.sqrt(self.downside_variance)
+        if not std:
+            return 0.0
+        return self._mean / std * math.sqrt(self._periods)
+    
+    def __repr__(self):
+        return f"SharpRatio(sharp:{self.ratio:.4f}, " \
+               f"sortino:{self.sortino:.4f}, samples:{self._n})"
@@ -1,5 +1,182 @@
-from .base import Benchmark
+from array import array
+from datetime import datetime, timedelta, date
+from typing import List, Tuple, Optional, Iterable
 
+from ..consts import UNIX_EPOCH, TIME_RETURN_TIERS
+from .base import Benchmark, EquitySampler
 
-class TimeReturn(Benchmark, alias="timeret"):
-    pass
+
+class _Tier:
+    # 预分配的环形数组, 每个桶保存桶起始时间与桶内最后一次权益
+    
+    def __init__(self, interval: int, capacity: int):
+        assert interval > 0 and capacity > 0
+        self.interval = interval
+        self.capacity = capacity
+        self.ts = array("d", bytes(8 * capacity))
+        self.val = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.size = 0
+    
+    def _slot(self, i: int) -> int:
+        return (self.head + i) % self.capacity
+    
+    @property
+    def last_ts(self) -> float:
+        return self.ts[self._slot(self.size - 1)] if self.size else -1
+    
+    def put(self, seconds: float, equity: float) -> Optional[Tuple[float, float]]:
+        bucket = seconds // self.interval * self.interval
+        if self.size and bucket <= self.last_ts:
+            self.val[self._slot(self.size - 1)] = equity
+            return None
+        evicted = None
+        if self.size == self.capacity:
+            evicted = self.ts[self.head], self.val[self.head]
+            self.head = self._slot(1)
+            self.size -= 1
+        slot = self._slot(self.size)
+        self.ts[slot], self.val[slot] = bucket, equity
+        self.size += 1
+        return evicted
+    
+    def __iter__(self) -> Iterable[Tuple[float, float]]:
+        for i in range(self.size):
+            slot = self._slot(i)
+            yield self.ts[slot], self.val[slot]
+
+
+class TimeReturn(Benchmark, EquitySampler, alias="timeret"):
+    # 内存有界的权益曲线: 最细一级按 interval 采样, 溢出的桶逐级降采样
+    
+    def __init__(
+        self, api_key: str, tiers: Tuple[Tuple[int, int], ...] =
+        TIME_RETURN_TIERS, portfolio: bool = False
+    ):
+        assert tiers and all(
+            a[0] < b[0] for a, b in zip(tiers, tiers[1:])
+        ), "tiers must be ordered from fine to coarse"
+        Benchmark.__init__(self, api_key)
+        EquitySampler.__init__(self, tiers[0][0])
+        self.portfolio = portfolio
+        self._tiers = [_Tier(interval, cap) for interval, cap in tiers]
+        self._first_equity = 0.0
+        self._last_ret = 0.0
+    
+    def mark(self, ts: datetime, equity: float):
+        if not self._first_equity and equity > 0:
+            self._first_equity = equity
+        if self.due(ts):
+            self._record((ts - UNIX_EPOCH).total_seconds(), equity)
+        super().mark(ts, equity)
+    
+    def _record(self, seconds: float, equity: float):
+        evicted = (seconds, equity)
+        for tier in self._tiers:
+            evicted = tier.put(*evicted)
+            if evicted is None:
+                return
+    
+    def on_return(self, ts: datetime, ret: float):
+        self._last_ret = ret
+    
+    @property
+    def last_return(self) -> float:
+        return self._last_ret
+    
+    @property
+    def total_return(self) -> float:
+        if not self._first_equity:
+            return 0.0
+        return self.last_equity / self._first_equity - 1
+    
+    def _points(self) -> Iterable[Tuple[float, float]]:
+        # 粗粒度级别保存的是更早的数据, 从粗到细拼接即为时间顺序
+        last = float("-inf")
+        for tier in reversed(self._tiers):
+            for seconds, equity in tier:
+                if seconds <= last:
+                    continue
+                last = seconds
+                yield seconds, equity
+    
+    def curve(
+        self, start: datetime = None, end: datetime = None
+    ) -> List[Tuple[datetime, float]]:
+        lo = (start - UNIX_EPOCH).total_seconds() if start else float("-inf")
+        hi = (end - UNIX_EPOCH).total_seconds() if end else float("inf")
+        return [
+            (UNIX_EPOCH + timedelta(seconds=seconds), equity)
+            for seconds, equity in self._points() if lo <= seconds <= hi
+        ]
+    
+    def state(self) -> dict:
+        return dict(
+            tiers=[[tier.interval, tier.capacity] for tier in self._tiers],
+            points=[[seconds, equity] for seconds, equity in self._points()],
+            first_equity=self._first_equity, last_equity=self._last_equity,
+            last_ts=(self._last_ts - UNIX_EPOCH).total_seconds(),
+            last_ret=self._last_ret,
+        )
+    
+    def merge(self, state: dict) -> "TimeReturn":
+        assert [list(t) for t in state["tiers"]] == [
+            [tier.interval, tier.capacity] for tier in self._tiers
+        ], "Can not merge time returns with different tiers"
+        # 分片按时间先后合并, 与合并调用顺序无关
+        a, b = self.state(), state
+        # 首个点可能是粗粒度桶的起点, 用最后标记时间判断先后
+        if b["points"] and (
+            not a["points"] or b["last_ts"] < a["last_ts"]
+        ):
+            a, b = b, a
+        self._tiers = [_Tier(tier.interval, tier.capacity)
+                       for tier in self._tiers]
+        # 按时间顺序重放, 溢出的桶照常逐级降采样; b 的粗粒度桶与 a 的末尾
+        # 落在同一桶时, 保存的是更晚的权益, 覆盖即可
+        for seconds, equity in a["points"] + b["points"]:
+            self._record(seconds, equity)
+        self._first_equity = a["first_equity"] or b["first_equity"]
+        end = b if b["points"] else a
+        self._last_equity, self._last_ret = \
+            end["last_equity"], end["last_ret"]
+        self._last_ts = UNIX_EPOCH + timedelta(seconds=end["last_ts"])
+        if self._last_ts != UNIX_EPOCH:
+            self.advance(self._last_ts)
+        return self
+    
+    def resample(
+        self, interval: int, start: datetime = None, end: datetime = None
+    ) -> List[Tuple[datetime, float]]:
+        res: List[Tuple[datetime, float]] = []
+        for ts, equity in self.curve(start, end):
+            seconds = (ts - UNIX_EPOCH).total_seconds()
+            bucket = UNIX_EPOCH + timedelta(
+                seconds=seconds // interval * interval
+            )
+            if res and res[-1][0] == bucket:
+                res[-1] = (bucket, equity)
+            else:
+                res.append((bucket, equity))
+        return res
+    
+    def returns(
+        self, interval: int, start: datetime = None, end: datetime = None
+    ) -> List[Tuple[datetime, float]]:
+        closes = self.resample(interval, start, end)
+        return [
+            (ts, equity / prev - 1)
+            for (_, prev), (ts, equity) in zip(closes, closes[1:]) if prev
+        ]
+    
+    def daily_returns(
+        self, start: datetime = None, end: datetime = None
+    ) -> List[Tuple[date, float]]:
+        return [
+            (ts.date(), ret)
+            for ts, ret in self.returns(24 * 60 * 60, start, end)
+        ]
+    
+    def __repr__(self):
+        return f"TimeReturn(last:{self.last_return:.6f}, " \
+               f"total:{self.total_return:.6f})"
@@ -2,65 +2,11 @@ from ..consts import CLOSE, MAX_FLOAT, LONG
 from ..dtypes import Trade
 from .base import Benchmark
 from typing import Set, Optional
-from collections import namedtuple
-
-PnlMarker = namedtuple("Marker", ("trd_id", "max_val", "min_val"))
-PnlAccumulator = namedtuple("Accumulator", (
-    "profit", "loss", "wins", "losses", "long", "short"
-))
-
-
-def max_pnl_statistics():
-    loss_mark = PnlMarker("", 0, MAX_FLOAT)
-    profit_mark = PnlMarker("", 0, MAX_FLOAT)
-
-    def _flt(trd: Trade = None):
-        nonlocal loss_mark, profit_mark
-        if trd:
-            if trd.pnl < 0:
-                if abs(trd.pnl) > loss_mark.max_val:
-                    loss_mark = PnlMarker(
-                        trd.trade_id, trd.pnl, loss_mark.min_val)
-                if abs(trd.pnl) < loss_mark.min_val:
-                    loss_mark = PnlMarker(
-                        trd.trade_id, loss_mark.max_val, trd.pnl)
-            else:
-                if abs(trd.pnl) > profit_mark.max_val:
-                    profit_mark = PnlMarker(
-                        trd.trade_id, trd.pnl, profit_mark.min_val)
-                if abs(trd.pnl) < loss_mark.min_val:
-                    profit_mark = PnlMarker(
-                        trd.trade_id, profit_mark.max_val, trd.pnl)
-
-        return loss_mark, profit_mark
-
-    return _flt
-
-
-def accumulate_pnl_statistics():
-    acc = PnlAccumulator(0, 0, 0, 0, 0, 0)
-
-    def _flt(trd: Trade = None):
-        nonlocal acc
-        if trd:
-            profit, loss, wins, losses, long, short = \
-                acc.profit, acc.loss, acc.wins, acc.losses, acc.long, acc.short
-
-            if trd.pnl < 0:
-                loss += trd.pnl
-                losses += 1
-            else:
-                profit += trd.pnl
-                wins += 1
-
-            if trd.pos_side == LONG:
-                long += 1
-            else:
-                short += 1
-            acc = PnlAccumulator(profit, loss, wins, losses, long, short)
-        return acc
-
-    return _flt
+
+# 可合并的统计量: 求和类直接相加, 极值类取 max/min
+_SUMS = ("profit", "loss", "wins", "losses", "long", "short")
+_MAXIMA = ("max_profit", "max_loss")
+_MINIMA = ("min_profit", "min_loss")
 
 
 class TradeCounter(Benchmark, alias="trades"):
@@ -69,8 +15,12 @@ class TradeCounter(Benchmark, alias="trades"):
         super().__init__(api_key)
         self._trades: Set[str] = set()
         self._ongoing: Optional[Trade] = None
-        self.marker = max_pnl_statistics()
-        self.accumulator = accumulate_pnl_statistics()
+        # loss 为负数累加, max_loss/min_loss 按亏损绝对值比较
+        self._stats = dict(
+            profit=0.0, loss=0.0, wins=0, losses=0, long=0, short=0,
+            max_profit=0.0, min_profit=MAX_FLOAT,
+            max_loss=0.0, min_loss=MAX_FLOAT,
+        )
 
     def on_trade(self, trade: Trade):
         if trade.status is CLOSE:
@@ -86,76 +36,98 @@ class TradeCounter(Benchmark, alias="trades"):
             self._ongoing = trd
 
     def process_on_close(self, trd: Trade):
-        self.marker(trd)
-        self.accumulator(trd)
+        stats, pnl = self._stats, trd.pnl
+        if pnl < 0:
+            stats["loss"] += pnl
+            stats["losses"] += 1
+            stats["max_loss"] = max(stats["max_loss"], -pnl)
+            stats["min_loss"] = min(stats["min_loss"], -pnl)
+        else:
+            stats["profit"] += pnl
+            stats["wins"] += 1
+            stats["max_profit"] = max(stats["max_profit"], pnl)
+            stats["min_profit"] = min(stats["min_profit"], pnl)
+        if trd.pos_side == LONG:
+            stats["long"] += 1
+        else:
+            stats["short"] += 1
         self._ongoing = None
 
+    def state(self) -> dict:
+        return dict(self._stats)
+
+    def merge(self, state: dict) -> "TradeCounter":
+        stats = self._stats
+        for key in _SUMS:
+            stats[key] += state[key]
+        for key in _MAXIMA:
+            stats[key] = max(stats[key], state[key])
+        for key in _MINIMA:
+            stats[key] = min(stats[key], state[key])
+        return self
+
     @property
     def max_profit(self) -> float:
-        _, profit = self.marker()
-        return profit.max_val
+        return self._stats["max_profit"]
 
     @property
     def min_profit(self) -> float:
-        _, profit = self.marker()
-        return profit.min_val
+        return self._stats["min_profit"] if self.wins else 0
 
     @property
     def max_loss(self) -> float:
-        loss, _ = self.marker()
-        return loss.min_val
+        return -self._stats["max_loss"]
 
     @property
     def min_loss(self) -> float:
-        _, loss = self.marker()
-        return loss.max_val
+        return -self._stats["min_loss"] if self.losses else 0
 
     @property
     def pnl_ratio(self) -> float:
         try:
-            return self.accumulator().profit / self.accumulator().loss
+            return self.profit / self.loss
         except ZeroDivisionError:
             return 0
 
     @property
     def profit(self) -> float:
-        return self.accumulator().profit
+        return self._stats["profit"]
 
     @property
     def loss(self) -> float:
-        return self.accumulator().loss
+        return self._stats["loss"]
 
     @property
     def net(self) -> float:
-        return self.profit - self.loss
+        return self.profit + self.loss
 
     @property
     def wins(self) -> int:
-        return self.accumulator().wins
+        return self._stats["wins"]
 
     @property
     def losses(self) -> int:
-        return self.accumulator().loss
+        return self._stats["losses"]
 
     @property
     def long_count(self) -> int:
-        return self.accumulator().long
+        return self._stats["long"]
 
     @property
     def short_count(self) -> int:
-        return self.accumulator().short
+        return self._stats["short"]
 
     @property
     def profit_average(self) -> float:
         try:
-            return self.accumulator().profit / self.accumulator().wins
+            return self.profit / self.wins
         except ZeroDivisionError:
             return 0
 
     @property
     def loss_average(self):
         try:
-            return self.accumulator().loss / self.accumulator().losses
+            return self.loss / self.losses
         except ZeroDivisionError:
             return 0
 
@@ -3,3 +3,4 @@ from .context import TradingContext
 from .broker import CryptoBroker
 from .backtest import BacktestBroker
 from .dryrun import DryrunBroker
+from .virtual import virtual_book, VirtualPosition
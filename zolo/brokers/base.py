@@ -3,20 +3,24 @@ import logging
 from datetime import datetime
 from itertools import count
 from typing import Iterable, List, Union, Type, ItemsView, Callable, Optional, \
-    Dict
+    Dict, Tuple
 
-from zolo.indicators import IndicatorType
+from zolo.indicators import IndicatorType, ind_cache, OffloadedIndicator
 from ..base import Broker, Sink
 from ..dtypes import Bar, Tick, Lot, Size, Fill, Qty, OrderBook, \
-    CREDENTIAL_EMPTY, InstrumentInfo
+    CREDENTIAL_EMPTY, InstrumentInfo, Message, Timer
 from ..hub import evt_hub
-from ..utils import create_filter
+from ..db import load_last_n_bars
+from ..utils import create_filter, BYPASS_FILTER
 from ..dtypes import Trade
 from ..consts import BUY, SELL, RESTFUL, AIAO, ON_TICK, ON_BAR, ON_TRADE, \
-    ON_BOOK, LONG, DEFAULT_LEVERAGE, BLOCKING_ORDER_TIMEOUT
+    ON_BOOK, LONG, DEFAULT_LEVERAGE, BLOCKING_ORDER_TIMEOUT, CLOSE
 from .context import TradingContext
+from .virtual import virtual_book
+from ..orders import order_aggregator
 from ..benchmarks import TradeCounter, TimeReturn, ProfitFactor, SharpRatio, \
     Benchmark, BenchmarkType
+from ..benchmarks.base import EquitySampler
 from ..indicators.base import Indicator
 from ..posts import MarketOrder, OpponentIocOrder, \
     OpponentFokOrder, \
@@ -28,6 +32,10 @@ log = logging.getLogger(__name__)
 
 
 class BrokerBase(Broker):
+    # 实盘注册指标时用历史 bar 预热
+    warm_up_indicators: bool = False
+    # 实盘时 offload=True 的指标在独立进程中计算
+    offload_indicators: bool = False
     
     def __init__(
         self, exchange: str, market: str, adapter_type: str,
@@ -66,6 +74,8 @@ class BrokerBase(Broker):
             pos_side,
             credential,
             trade_registry_scheme,
+            self.context.netting,
+            self.context.aggregate,
         )
         return brk
     
@@ -111,6 +121,8 @@ class BrokerBase(Broker):
         pos_side: str,
         credential: Credential,
         trade_registry: str = AIAO,
+        netting: bool = False,
+        aggregate: bool = False,
     ) -> TradingContext:
         if self._context and unique_id == "default":
             raise RuntimeError(f"default name is reserved!")
@@ -124,15 +136,21 @@ class BrokerBase(Broker):
             self._adapter_type,
             trade_registry,
             credential,
+            netting,
+            aggregate,
         )
+        if aggregate:
+            order_aggregator.attach(evt_hub)
         return self._context
     
-    def register_on_bar(self, granularity: int, on_bar: Callable):
+    def register_on_bar(
+        self, granularity: int, on_bar: Callable, instrument_id: str = ""
+    ):
         assert granularity
         flt = create_filter(
             exchange=self.exchange,
             market=self.market,
-            instrument_id=self.context.instrument_id,
+            instrument_id=instrument_id or self.context.instrument_id,
             granularity=int(granularity),
         )
         evt_hub.attach_sink(Bar, flt, on_bar)
@@ -181,30 +199,106 @@ class BrokerBase(Broker):
         evt_hub.attach_sink(Trade, flt, on_trade)
     
     def register_indicator(self, ind: IndicatorType):
+        # 共享指标只挂载一次 bar sink, 依赖的子指标先挂载以保证先更新
+        for dep in ind_cache.dependencies(ind):
+            self.register_indicator(dep)
+        if not ind_cache.subscribe(ind):
+            return
         granularity: int = getattr(ind, "granularity")
         assert granularity
-        self.register_on_bar(granularity, getattr(ind, ON_BAR))
+        if isinstance(ind, OffloadedIndicator):
+            evt_hub.attach_sink(Message, ind.is_result, ind.on_result)
+            ind.start(evt_hub.post_event)
+        if self.warm_up_indicators:
+            ind_cache.warm_up(ind, self.context.market_id, self.load_history,
+                              self.context.instrument_id)
+        # 多品种指标(如 cov)订阅同一市场下的每个品种
+        on_bar = ind_cache.feeder(ind)
+        for instrument_id in self.indicator_instruments(ind):
+            self.register_on_bar(granularity, on_bar, instrument_id)
+    
+    def indicator_instruments(self, ind: IndicatorType) -> Tuple[str, ...]:
+        return getattr(ind, "instruments", ()) or (self.context.instrument_id,)
+    
+    def load_history(
+        self, cnt: int, granularity: int, instrument_id: str = ""
+    ) -> List[Bar]:
+        # 优先从交易所拉取, 失败时读取本地 history_bar
+        instrument_id = instrument_id or self.context.instrument_id
+        try:
+            res = self.adapter.get_last_n_bars(cnt, instrument_id, granularity)
+            if res:
+                return res
+        except Exception as e:
+            log.exception(e)
+        try:
+            return load_last_n_bars(
+                self.exchange, self.market, instrument_id, granularity, cnt
+            )
+        except Exception as e:
+            log.warning(
+                f"load {cnt} {granularity}min bars of {instrument_id} from "
+                f"history_bar failed, indicators start cold: {e!r}"
+            )
+            return []
     
     def register_benchmark(self, bch: BenchmarkType):
         api_key: str = getattr(bch, "api_key", "")
         if not api_key:
             api_key: str = getattr(bch, "credential", CREDENTIAL_EMPTY).api_key
         assert api_key
-        self.register_on_trade(api_key, getattr(bch, ON_TRADE))
+        if callable(getattr(bch, ON_TRADE, None)):
+            self.register_on_trade(api_key, getattr(bch, ON_TRADE))
         if callable(getattr(bch, ON_TICK, None)):
-            self.register_on_trade(api_key, getattr(bch, ON_TICK))
+            self.register_on_tick(getattr(bch, ON_TICK))
+        if isinstance(bch, EquitySampler):
+            self.register_equity_mark(bch)
+    
+    def get_equity(self, portfolio: bool = False) -> float:
+        if portfolio:
+            return sum(m.margin_balance for m in self.get_all_margin())
+        return self.get_margin().margin_balance
+    
+    def register_equity_mark(self, bch: EquitySampler):
+        # tick 驱动回测时间, Timer 驱动实盘时间, 到达采样点才查询权益
+        def _mark(ts: datetime):
+            try:
+                equity = self.get_equity(bch.portfolio)
+            except Exception as e:
+                log.exception(e)
+                return
+            bch.mark(ts, equity)
+        
+        # TimerPipeline 把 Timer 拆成 datetime 再交给 sink
+        def _on_timer(ts: datetime):
+            if bch.due(ts):
+                _mark(ts)
+        
+        def _on_tick(tick: Tick):
+            _on_timer(tick.timestamp)
+        
+        def _on_trade(trd: Trade):
+            if trd.status == CLOSE and trd.close_ts:
+                _mark(trd.close_ts)
+        
+        self.register_on_tick(_on_tick)
+        evt_hub.attach_sink(Timer, BYPASS_FILTER, _on_timer)
+        if bch.mark_on_trade:
+            self.register_on_trade(bch.api_key, _on_trade)
     
     def indicator(
         self, ind: Union[str, IndicatorType], **kwargs
     ) -> IndicatorType:
-        res = self.context.indicator(ind, **kwargs)
-        self.register_indicator(ind)
+        res = self.context.indicator(
+            ind, offload=self.offload_indicators, **kwargs)
+        self.register_indicator(res)
         return res
     
     def benchmark(
         self, bch: Union[str, BenchmarkType], api_key: str, **kwargs
     ) -> BenchmarkType:
         res = self.context.benchmark(bch, api_key, **kwargs)
+        self.register_benchmark(res)
         return res
     
     def list_active_indicators(self) -> ItemsView[int, Indicator]:
@@ -573,6 +667,11 @@ class BrokerBase(Broker):
         return self.context.get_order(client_oid, instrument_id)
     
     def cancel_order(self, client_oid: str):
+        # 虚拟/聚合订单都是立即成交类, 交易所上没有对应的 client_oid
+        if virtual_book.is_virtual(client_oid) or \
+                order_aggregator.is_aggregated(client_oid):
+            log.warning(f"{client_oid} is netted or aggregated, can't cancel")
+            return None
         return self.context.adapter.cancel_order(self.instrument_id, client_oid)
     
     def cancel_all_orders(self):
@@ -14,12 +14,17 @@ log = logging.getLogger(__name__)
 
 
 class CryptoBroker(BrokerBase):
+    warm_up_indicators = True
+    offload_indicators = True
     
     def __init__(
         self, exchange: str, market: str,
-        credential: Credential = CREDENTIAL_EMPTY, gateway: str = RESTFUL
+        credential: Credential = CREDENTIAL_EMPTY, gateway: str = RESTFUL,
+        feed: str = RESTFUL
     ):
         super().__init__(exchange, market, gateway)
+        # 行情订阅方式, PUBSUB 时从 MarketDataHub 进程共享行情
+        self._feed = feed
         
         self._context = TradingContext(
             "default", exchange, market, INVALID,
@@ -36,22 +41,22 @@ class CryptoBroker(BrokerBase):
     
     def indicator(self, ind: str, **kwargs) -> Indicator:
         ind = super().indicator(ind, **kwargs)
-        # TODO 暂时默认restful
         if callable(getattr(ind, ON_BAR, None)):
-            evt_hub.post_event(
-                Message(
-                    GATEWAY_SUBSCRIBE,
-                    ChannelConfig(
-                        GatewayConfig(RESTFUL, self.exchange), self.market,
-                        self.instrument_id, self.context.credential, Bar,
-                        parameters=kwargs
-                    )))
+            for instrument_id in self.indicator_instruments(ind):
+                evt_hub.post_event(
+                    Message(
+                        GATEWAY_SUBSCRIBE,
+                        ChannelConfig(
+                            GatewayConfig(self._feed, self.exchange),
+                            self.market, instrument_id,
+                            self.context.credential, Bar, parameters=kwargs
+                        )))
         if callable(getattr(ind, ON_TICK, None)):
             evt_hub.post_event(
                 Message(
                     GATEWAY_SUBSCRIBE,
                     ChannelConfig(
-                        GatewayConfig(RESTFUL, self.exchange), self.market,
+                        GatewayConfig(self._feed, self.exchange), self.market,
                         self.instrument_id, self.context.credential, Tick,
                         parameters=dict()
                     )))
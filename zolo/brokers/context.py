@@ -20,16 +20,17 @@ from ..consts import (
     DEFAULT_LEVERAGE
 )
 from .trdreg import create_registry
-from ..orders import OrderPool, create_executor
-from ..posts import OrderPost, is_blocking
+from .virtual import virtual_book
+from ..orders import OrderPool, create_executor, order_aggregator
+from ..posts import OrderPost, MarketOrder, is_blocking
 from ..dtypes import CREDENTIAL_EMPTY, POSITION_EMPTY, INSTRUMENT_INVALID, \
     Qty, \
     MARGIN_EMPTY
 
-from ..adapters import Adapter, create_adapter
+from ..adapters import Adapter, get_adapter
 from ..benchmarks.base import Benchmark, create_benchmark
-from ..dtypes import Credential, InstrumentInfo, Order, Trade
-from ..indicators import create_indicator, Indicator, IndicatorType
+from ..dtypes import Credential, InstrumentInfo, Order, Trade, dot_concat
+from ..indicators import ind_cache, ind_store, Indicator, IndicatorType
 
 log = logging.getLogger(__name__)
 
@@ -47,6 +48,8 @@ class TradingContext:
         adapter_type: str,
         registry_scheme: str,
         cred: Credential,
+        netting: bool = False,
+        aggregate: bool = False,
     ):
         if unique_id != "default" and unique_id in self.trading_id_registry:
             raise RuntimeError("Duplicated unique_id is not allow for trading")
@@ -74,7 +77,8 @@ class TradingContext:
         self._benchmarks: Dict[int, Benchmark] = dict()
         self._pos_side = pos_side
         self._cred: Credential = cred
-        self._adapter = create_adapter(
+        # 同一 key 的 context 共用 adapter 及其 http 会话
+        self._adapter = get_adapter(
             adapter_type, self.exchange, self.market, self._cred
         )
         
@@ -85,6 +89,10 @@ class TradingContext:
         
         self._ts: datetime = UNIX_EPOCH
         self._leverage = DEFAULT_LEVERAGE
+        # 共享 key 的策略通过虚拟仓位层下市价单, 由 virtual_book 内部撮合
+        self._netting = netting
+        # 多个 context 的同向订单合并后批量提交, 成交按比例分配
+        self._aggregate = aggregate
         if unique_id != "default":  # No trading for default context!
             self._leverage = self._adapter.get_leverage(instrument_id)
             self._registry = create_registry(
@@ -100,14 +108,34 @@ class TradingContext:
     def registry_scheme(self) -> str:
         return getattr(self._registry, "scheme")
     
+    @property
+    def netting(self) -> bool:
+        return self._netting
+    
+    @property
+    def aggregate(self) -> bool:
+        return self._aggregate
+    
+    @property
+    def leverage(self) -> float:
+        return self._leverage
+    
     def refresh(self, ts: datetime):
         self._pool.refresh(ts)
+        if self._netting:
+            virtual_book.refresh(ts)
     
     def post_order(
         self, order: OrderPost, timeout: float, step: Qty, period: float
     ) -> Order:
         ts = self._pool.get_ts()
         assert self.credential != CREDENTIAL_EMPTY, "No valid credential!"
+        if self._netting and step == 0 and isinstance(order, MarketOrder):
+            return virtual_book.submit(self, order, ts)
+        if self._aggregate and step == 0 and order_aggregator.accepts(order):
+            return order_aggregator.submit(
+                self.adapter, order, ts, self.on_order
+            )
         if step != 0:
             mode = PERIODIC
             exe = create_executor(
@@ -125,14 +153,19 @@ class TradingContext:
         return self._pool.get_pending()
     
     def get_order(self, client_oid: str, instrument_id: str) -> Order:
+        if self._netting and virtual_book.is_virtual(client_oid):
+            return virtual_book.get_order(client_oid)
+        if self._aggregate and order_aggregator.is_aggregated(client_oid):
+            return order_aggregator.get_order(client_oid)
         res = self._pool.get_order(client_oid, instrument_id)
         return res
     
     def indicator(
-        self, ind: Union[str, Type[Indicator]],
+        self, ind: Union[str, Type[Indicator]], offload: bool = False,
         **kwargs
     ) -> IndicatorType:
-        res = create_indicator(ind, **kwargs)
+        res = ind_cache.get(ind, self.market_id, offload, **kwargs)
+        ind_store.restore(res)
         self._indicators[next(self._ind_cnt)] = res
         return res
     
@@ -180,11 +213,20 @@ class TradingContext:
     def market(self):
         return self._market
     
+    @property
+    def market_id(self) -> str:
+        return dot_concat(self._exchange, self._market, self._instrument_id)
+    
     @property
     def pos_side(self) -> str:
         return self._pos_side
     
     def on_order(self, order: Order):
+        # 虚拟仓位模式下交易所回报的是净额订单, 只记录内部撮合后的虚拟订单
+        if self._netting and not virtual_book.is_virtual(order.client_oid):
+            return None
+        if self._aggregate and order_aggregator.is_routed(order.client_oid):
+            return None
         return self._registry.on_order(order)
     
     def get_trade(self) -> Iterable[Trade]:
@@ -11,6 +11,8 @@ log = logging.getLogger(__name__)
 
 
 class DryrunBroker(BrokerBase):
+    warm_up_indicators = True
+    offload_indicators = True
 
     def __init__(self, exchange: str, market: str):
         super().__init__(exchange, market, DRYRUN)
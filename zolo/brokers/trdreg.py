@@ -1,7 +1,9 @@
 import logging
+from collections import deque
 from abc import ABC, abstractmethod
 from itertools import count
-from typing import List, Optional, Dict, Type, Iterable, Callable, Tuple
+from typing import List, Optional, Dict, Type, Iterable, Callable, Tuple, \
+    Deque
 from dataclasses import replace
 from ..consts import LONG, SHORT, DUAL, BUY, SELL, AIAO, FIFO, FILO, CLOSE
 from ..utils import calc_entry_price
@@ -28,25 +30,33 @@ class SchemeRegistry:
 
 
 class Amounts:
+    # 只保留累计值与笔数, 每笔 O(1), 不随历史增长
     def __init__(self, name: str = ""):
         self._name = name
-        self._amounts = tuple()
+        self._total = 0.0
+        self._count = 0
     
     def add(self, qty: float):
         if qty > 0:
-            self._amounts += (qty,)
+            self._total += qty
+            self._count += 1
     
     def __repr__(self):
-        _str = "|".join([str(a) for a in self._amounts])
-        return f"{self._name} => {_str}  ({self.get_total()})"
+        return f"{self._name} => {self._count} orders  ({self._total})"
     
     def get_total(self) -> float:
-        return sum(self._amounts)
+        return self._total
+    
+    @property
+    def count(self) -> int:
+        return self._count
 
 
 class TradeRegistry(ABC):
     def __init_subclass__(cls, scheme: str = "", **kwargs):
-        SchemeRegistry.register(scheme, cls)
+        # 没有 scheme 的子类为公共基类, 不注册
+        if scheme:
+            SchemeRegistry.register(scheme, cls)
     
     def __init__(
         self,
@@ -60,7 +70,7 @@ class TradeRegistry(ABC):
         self._avg_entry_price: float = 0
         self._trd: Optional[Trade] = None
         self._pos_side = pos_side
-        self._trades = []
+        self._trades = deque()
         self.buy = Amounts("Buys")
         self.sell = Amounts("Sells")
     
@@ -81,7 +91,7 @@ class TradeRegistry(ABC):
     
     def get_trade(self) -> Iterable[Trade]:
         while self._trades:
-            yield self._trades.pop(0)
+            yield self._trades.popleft()
     
     def on_order_with_long_pos(self, order: Order, direction: str):
         if order.side == BUY:
@@ -142,11 +152,11 @@ class TradeRegistry(ABC):
     
     def on_order(self, order: Order):
         buy, sell = (order.qty, 0) if order.side == BUY else (0, order.qty)
+        qty = self.qty
         
-        if self.qty * ((self.buy.get_total() + buy) - (
-            self.sell.get_total() + sell)) < 0:
+        if qty * (qty + buy - sell) < 0:
             log.error(
-                f"仓位方向反转: qty: {self.qty}, ({self.buy} + {buy}) - ("
+                f"仓位方向反转: qty: {qty}, ({self.buy} + {buy}) - ("
                 f"{self.sell} + {sell}) ")
             raise RuntimeError
         
@@ -158,12 +168,14 @@ class TradeRegistry(ABC):
             res = self.on_order_with_dual_pos(order, self.direction)
         else:
             raise ValueError
-        if res:
+        if isinstance(res, list):
+            self._trades.extend(res)
+        elif res:
             self._trades.append(res)
         
         self.buy.add(buy), self.sell.add(sell)
-        log.info(f"{self.buy}")
-        log.info(f"{self.sell}")
+        log.debug(f"{self.buy}")
+        log.debug(f"{self.sell}")
         return res
 
 
@@ -185,13 +197,13 @@ class AllInAllOut(TradeRegistry, scheme=AIAO):
                 self.comm_calc(order.price, order.qty),
                 account=order.account
             )
-            self._trd.orders += tuple([order.client_oid])
+            self._trd.orders.append(order.client_oid)
             return self._trd
         
         self._avg_entry_price = calc_entry_price(
             self._avg_entry_price, abs(self.qty), order.price, order.qty
         )
-        self._trd.orders += tuple([order.client_oid])
+        self._trd.orders.append(order.client_oid)
     
     def pos_decrease(self, order: Order, direction: str) -> Optional[Trade]:
         res = None
@@ -201,31 +213,111 @@ class AllInAllOut(TradeRegistry, scheme=AIAO):
             pnl = -pnl
         self._trd.pnl += pnl
         self._trd.commission += self.comm_calc(order.price, order.qty)
-        self._trd.orders += tuple([order.client_oid])
-        if self.buy.get_total() + buy - self.sell.get_total() + sell == 0:
+        self._trd.orders.append(order.client_oid)
+        if self.qty + buy - sell == 0:
             self._trd.status = CLOSE
             res = self._trd
             self._trd = None
         return res
 
 
-class FirstInLastOut(TradeRegistry, scheme=FILO):
+class OpenLot:
+    __slots__ = ("qty", "price", "trade")
+    
+    def __init__(self, qty: float, price: float, trade: Trade):
+        self.qty = qty
+        self.price = price
+        self.trade = trade
+    
+    def __repr__(self):
+        return f"OpenLot({self.trade.trade_id}: {self.qty}@{self.price})"
+
+
+class LotMatching(TradeRegistry):
+    # 每笔开仓为一个 lot(对应一个 Trade), 平仓按 scheme 规定的顺序逐个消耗,
+    # 部分消耗时 lot 剩余数量保留, 每笔平仓的代价为 O(消耗的 lot 数)
+    
     def __init__(self, pnl_calc, comm_calc, pos_side: str = DUAL):
         super().__init__(pnl_calc, comm_calc, pos_side)
+        self._lots: Deque[OpenLot] = deque()
+        self._cost = 0.0
+        self._open_qty = 0.0
+        self.realised_pnl = 0.0
     
-    def pos_increase(self, order: Order, direction: str):
+    @abstractmethod
+    def next_lot(self) -> OpenLot:
         raise NotImplementedError
     
-    def pos_decrease(self, order: Order, direction: str):
+    @abstractmethod
+    def drop_lot(self):
         raise NotImplementedError
+    
+    @property
+    def lots(self) -> Tuple[OpenLot, ...]:
+        return tuple(self._lots)
+    
+    def pos_increase(self, order: Order, direction: str) -> Trade:
+        direction = direction or (LONG if order.side == BUY else SHORT)
+        trd = Trade(
+            self.gen_new_id(),
+            order.exchange,
+            order.market,
+            order.instrument_id,
+            direction,
+            order.qty,
+            0,
+            self.comm_calc(order.price, order.qty),
+            account=order.account
+        )
+        trd.orders.append(order.client_oid)
+        self._lots.append(OpenLot(order.qty, order.price, trd))
+        self._cost += order.qty * order.price
+        self._open_qty += order.qty
+        self._avg_entry_price = self._cost / self._open_qty
+        return trd
+    
+    def pos_decrease(self, order: Order, direction: str) -> List[Trade]:
+        res, remain = [], order.qty
+        while remain > 0 and self._lots:
+            lot = self.next_lot()
+            qty = min(lot.qty, remain)
+            pnl = self.pnl_calc(qty, lot.price, order.price)
+            if direction is SHORT:
+                pnl = -pnl
+            trd = lot.trade
+            trd.pnl += pnl
+            trd.commission += self.comm_calc(order.price, qty)
+            trd.orders.append(order.client_oid)
+            self.realised_pnl += pnl
+            lot.qty -= qty
+            remain -= qty
+            self._cost -= qty * lot.price
+            self._open_qty -= qty
+            if lot.qty <= 0:
+                self.drop_lot()
+                trd.status = CLOSE
+                res.append(trd)
+        if self._lots:
+            self._avg_entry_price = self._cost / self._open_qty
+        else:
+            self._cost = self._open_qty = self._avg_entry_price = 0
+        return res
 
 
-class FirstInFirstOut(TradeRegistry, scheme=FIFO):
-    def pos_increase(self, order: Order, direction: str):
-        raise NotImplementedError
+class FirstInLastOut(LotMatching, scheme=FILO):
+    def next_lot(self) -> OpenLot:
+        return self._lots[-1]
     
-    def pos_decrease(self, order: Order, direction: str):
-        raise NotImplementedError
+    def drop_lot(self):
+        self._lots.pop()
+
+
+class FirstInFirstOut(LotMatching, scheme=FIFO):
+    def next_lot(self) -> OpenLot:
+        return self._lots[0]
+    
+    def drop_lot(self):
+        self._lots.popleft()
 
 
 create_registry = SchemeRegistry.create_registry
@@ -0,0 +1,292 @@
+import logging
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, List, Tuple, Optional
+from uuid import uuid4
+
+from ..consts import BUY, SELL, LONG, SHORT, UNIX_EPOCH, \
+    VIRTUAL_NETTING_WINDOW, VIRTUAL_ORDER_HISTORY
+from ..dtypes import Order, OrderStatus, Lot, by_size, by_lot
+from ..posts import MarketOrder
+from ..utils import pro_rata
+
+log = logging.getLogger(__name__)
+
+
+class VirtualPosition:
+    # 策略在共享 key 上的虚拟子仓位, qty 带方向(多为正, 空为负)
+    
+    def __init__(self, unique_id: str, instrument_id: str):
+        self.unique_id = unique_id
+        self.instrument_id = instrument_id
+        self.qty = 0.0
+        self.avg_price = 0.0
+        self.realised_pnl = 0.0
+        self.fee = 0.0
+    
+    def apply(self, side: str, qty: float, price: float, fee: float = 0):
+        delta = qty if side == BUY else -qty
+        new = self.qty + delta
+        if self.qty * delta >= 0:
+            self.avg_price = (
+                abs(self.qty) * self.avg_price + qty * price
+            ) / abs(new) if new else 0.0
+        else:
+            closed = min(abs(delta), abs(self.qty))
+            sign = 1 if self.qty > 0 else -1
+            self.realised_pnl += (price - self.avg_price) * closed * sign
+            if not new:
+                self.avg_price = 0.0
+            elif new * self.qty < 0:
+                self.avg_price = price
+        self.qty = new
+        self.fee += fee
+    
+    def __repr__(self):
+        return f"VirtualPosition({self.unique_id}@{self.instrument_id}: " \
+               f"{self.qty}@{self.avg_price}, pnl: {self.realised_pnl})"
+
+
+class _Pending:
+    __slots__ = ("ctx", "client_oid", "post", "qty", "ts")
+    
+    def __init__(self, ctx, client_oid: str, post: MarketOrder, qty: float,
+                 ts: datetime):
+        self.ctx = ctx
+        self.client_oid = client_oid
+        self.post = post
+        self.qty = qty
+        self.ts = ts
+
+
+class _Round:
+    # 一次 flush 的对冲结果, 净额订单成交后再统一分配
+    __slots__ = ("pending", "side", "crossed", "takers", "makers")
+    
+    def __init__(self, pending: List[_Pending]):
+        self.pending = pending
+        buys = [p for p in pending if p.post.side == BUY]
+        sells = [p for p in pending if p.post.side == SELL]
+        buy, sell = sum(p.qty for p in buys), sum(p.qty for p in sells)
+        self.crossed = min(buy, sell)
+        if buy >= sell:
+            self.side, self.takers, self.makers = BUY, buys, sells
+        else:
+            self.side, self.takers, self.makers = SELL, sells, buys
+    
+    @property
+    def net(self) -> float:
+        return sum(p.qty for p in self.takers) - self.crossed
+
+
+class NettingBook:
+    # 同一 key/品种/持仓方向的市价单在窗口内先内部对冲, 只向交易所发送净额,
+    # 内部成交与净额成交统一按净额成交价(全部对冲时按最新价)分配.
+    # 开平由 (pos_side, side) 决定, 只有同一持仓方向的买卖才能互相抵消,
+    # 否则多头开仓与空头开仓对冲后交易所上没有对应的仓位可平.
+    # 净额订单与 OrderAggregator 一样只下单不等待, 由 poll 查询成交后分配,
+    # 不阻塞分派线程.
+    
+    def __init__(self, adapter, instrument_id: str, window: float):
+        self._adapter = adapter
+        self._instrument_id = instrument_id
+        self._window = window
+        self._pending: List[_Pending] = list()
+        self._opened_at: datetime = UNIX_EPOCH
+        # 已向交易所发出净额订单, 等待成交的对冲批次
+        self._routing: Dict[str, _Round] = dict()
+        self.crossed = 0.0
+        self.routed = 0.0
+    
+    def lots(self, post: MarketOrder) -> float:
+        if by_size(post.qty):
+            return self._adapter.estimate_lot(self._instrument_id, post.qty)
+        return post.qty
+    
+    def submit(self, ctx, post: MarketOrder, qty: float, ts: datetime) -> str:
+        if not self._pending:
+            self._opened_at = ts
+        client_oid = uuid4().hex
+        self._pending.append(_Pending(ctx, client_oid, post, qty, ts))
+        return client_oid
+    
+    def reserved(self, ctx, side: str) -> float:
+        # ctx 已提交但尚未分配成交的 side 方向数量
+        pending = self._pending + [
+            p for r in self._routing.values() for p in r.pending
+        ]
+        return sum(p.qty for p in pending if p.ctx is ctx and
+                   p.post.side == side)
+    
+    def due(self, ts: datetime) -> bool:
+        return bool(self._pending) and \
+            (ts - self._opened_at).total_seconds() >= self._window
+    
+    def _route(self, post: MarketOrder, side: str, qty: float
+               ) -> Optional[str]:
+        try:
+            return self._adapter.create_order(
+                replace(post, side=side, qty=Lot(qty))
+            )
+        except Exception as e:
+            log.exception(e)
+            return None
+    
+    def flush(self, ts: datetime) -> List[Tuple[object, Order]]:
+        rnd, self._pending = _Round(self._pending), list()
+        if rnd.net:
+            oid = self._route(rnd.takers[0].post, rnd.side, rnd.net)
+            if oid:
+                self._routing[oid] = rnd
+                return list()
+        return self._allocate(rnd, None)
+    
+    def poll(self, ts: datetime) -> List[Tuple[object, Order]]:
+        res = list()
+        for oid in list(self._routing):
+            try:
+                order = self._adapter.get_order_by_client_oid(
+                    self._instrument_id, oid
+                )
+            except Exception as e:
+                log.exception(e)
+                continue
+            if order.done:
+                res.extend(self._allocate(self._routing.pop(oid), order))
+        return res
+    
+    def _allocate(self, rnd: _Round, res: Optional[Order]
+                  ) -> List[Tuple[object, Order]]:
+        side, takers, crossed = rnd.side, rnd.takers, rnd.crossed
+        filled, fee, price = 0.0, 0.0, 0.0
+        if res and res.filled:
+            filled, fee, price = res.filled, res.fee, res.price
+        if not price:
+            price = self._adapter.get_tick(self._instrument_id).price
+        self.crossed += crossed
+        self.routed += filled
+        # 净额一侧: 每笔按数量比例获得内部对冲量与交易所成交量,
+        # 手续费按各自分得的交易所成交量分摊
+        integral = all(by_lot(p.post.qty) for p in takers)
+        weights = [p.qty for p in takers]
+        internal = pro_rata(crossed, weights, integral)
+        external = pro_rata(filled, weights, integral)
+        fees = pro_rata(fee, external)
+        res = [(p.ctx, self._order(p, p.qty, price, 0)) for p in rnd.makers]
+        for p, a, b, f in zip(takers, internal, external, fees):
+            res.append((p.ctx, self._order(p, a + b, price, f)))
+        return res
+    
+    def _order(self, p: _Pending, qty: float, price: float, fee: float
+               ) -> Order:
+        post, qty = p.post, float(qty)
+        state = OrderStatus.FULFILLED if qty >= p.qty else \
+            OrderStatus.PARTIAL_FILED_OTHER_CANCELED
+        return Order(
+            exchange=post.exchange, market=post.market, side=post.side,
+            pos_side=post.pos_side, qty=qty, instrument_id=post.instrument_id,
+            client_oid=p.client_oid, order_type=post.order_type,
+            leverage=p.ctx.leverage, price=price, fee=fee, created_at=p.ts,
+            finished_at=datetime.utcnow(), state=state, filled=qty,
+            slippage=0, account=p.ctx.credential.api_key,
+        )
+
+
+class VirtualBook:
+    
+    def __init__(self, window: float = VIRTUAL_NETTING_WINDOW):
+        self._window = window
+        # (api_key, instrument_id, pos_side)
+        self._books: Dict[Tuple[str, str, str], NettingBook] = dict()
+        self._positions: Dict[Tuple[str, str], VirtualPosition] = dict()
+        # 未完成的虚拟订单, 完成后移入定长的 _finished
+        self._orders: Dict[str, Order] = dict()
+        self._finished: Dict[str, Order] = OrderedDict()
+    
+    def config(self, window: float):
+        self._window = window
+    
+    def book(self, ctx, post: MarketOrder) -> NettingBook:
+        key = (ctx.credential.api_key, ctx.instrument_id, post.pos_side)
+        if key not in self._books:
+            self._books[key] = NettingBook(
+                ctx.adapter, ctx.instrument_id, self._window
+            )
+        return self._books[key]
+    
+    def position(self, unique_id: str, instrument_id: str) -> VirtualPosition:
+        key = (unique_id, instrument_id)
+        if key not in self._positions:
+            self._positions[key] = VirtualPosition(unique_id, instrument_id)
+        return self._positions[key]
+    
+    def _cover(self, ctx, book: NettingBook, post: MarketOrder
+               ) -> Optional[float]:
+        # 平仓单最多只能平掉 ctx 自己的虚拟仓位(扣除已提交未成交的平仓),
+        # 否则会与其他 ctx 的开仓对冲, 交易所仓位与虚拟仓位之和不再一致
+        qty = self.position(ctx.unique_id, ctx.instrument_id).qty
+        if post.pos_side == LONG and post.side == SELL:
+            held = max(qty, 0.0)
+        elif post.pos_side == SHORT and post.side == BUY:
+            held = max(-qty, 0.0)
+        else:
+            return None
+        return max(held - book.reserved(ctx, post.side), 0.0)
+    
+    def submit(self, ctx, post: MarketOrder, ts: datetime) -> Order:
+        book, ordered = self.book(ctx, post), post.qty
+        qty, cover = book.lots(post), self._cover(ctx, book, post)
+        if cover is not None and qty > cover:
+            log.warning(
+                f"{ctx.unique_id} closes {qty} of {post.instrument_id} "
+                f"{post.pos_side} but only holds {cover}, capped"
+            )
+            qty = ordered = Lot(cover)
+        # 没有可平的仓位时直接拒绝, 不进入对冲
+        client_oid = book.submit(ctx, post, qty, ts) if qty else uuid4().hex
+        res = self._orders[client_oid] = Order(
+            exchange=post.exchange, market=post.market, side=post.side,
+            pos_side=post.pos_side, qty=ordered,
+            instrument_id=post.instrument_id, client_oid=client_oid,
+            order_type=post.order_type, leverage=ctx.leverage, created_at=ts,
+            state=OrderStatus.PREPARING if qty else OrderStatus.FAIL,
+            account=ctx.credential.api_key,
+        )
+        if not qty:
+            self._finish(res)
+        return res
+    
+    def refresh(self, ts: datetime):
+        for book in self._books.values():
+            done = book.flush(ts) if book.due(ts) else list()
+            for ctx, order in done + book.poll(ts):
+                self._orders[order.client_oid] = order
+                self.position(ctx.unique_id, order.instrument_id).apply(
+                    order.side, order.qty, order.price, order.fee
+                )
+                if order.qty:
+                    ctx.on_order(order)
+                self._finish(order)
+    
+    def _finish(self, order: Order):
+        del self._orders[order.client_oid]
+        self._finished[order.client_oid] = order
+        while len(self._finished) > VIRTUAL_ORDER_HISTORY:
+            self._finished.popitem(last=False)
+    
+    def is_virtual(self, client_oid: str) -> bool:
+        return client_oid in self._orders or client_oid in self._finished
+    
+    def get_order(self, client_oid: str) -> Optional[Order]:
+        return self._orders.get(client_oid) or self._finished.get(client_oid)
+    
+    @property
+    def pending(self) -> int:
+        return len(self._orders)
+    
+    def positions(self) -> List[VirtualPosition]:
+        return list(self._positions.values())
+
+
+virtual_book = VirtualBook()
@@ -31,6 +31,7 @@ SELL = "Sell"
 WEB_SOCKET = "WebSocket"
 RESTFUL = "Restful"
 ZMQ = "Zmq"
+PUBSUB = "PubSub"
 BACKTEST = "Backtest"
 DRYRUN = "Dryrun"
 
@@ -76,6 +77,18 @@ GATEWAY_REBOOT = "GATEWAY_REBOOT"
 GATEWAY_SUBSCRIBE = "GATEWAY_SUBSCRIBE"
 GATEWAY_UNSUBSCRIBE = "GATEWAY_UNSUBSCRIBE"
 
+# hub stats control command
+HUB_STATS_ENABLE = "HUB_STATS_ENABLE"
+HUB_STATS_DISABLE = "HUB_STATS_DISABLE"
+HUB_STATS_RESET = "HUB_STATS_RESET"
+HUB_STATS_DUMP = "HUB_STATS_DUMP"
+INDICATOR_RESULT = "INDICATOR_RESULT"
+
+# event queue overflow policies
+BLOCK_PRODUCER = "BLOCK_PRODUCER"
+DROP_OLDEST = "DROP_OLDEST"
+NEVER_DROP = "NEVER_DROP"
+
 # limit constant
 MAX_INT = sys.maxsize
 MIN_INT = -sys.maxsize - 1
@@ -90,5 +103,40 @@ INVALID = "INVALID"
 
 
 USER_MSG_GATEWAY = "tcp://127.0.0.1:5555"
+MARKET_DATA_PUB = "tcp://127.0.0.1:5556"
+MARKET_DATA_CTRL = "tcp://127.0.0.1:5557"
+MARKET_DATA_SHM = "zolo_market_data"
+SHM_RING_CAPACITY = 65536
+# 指标预热时, 同一品种同一周期的历史 bar 在该时间(秒)内复用
+WARM_UP_CACHE_EXPIRY = 30
+# 指标状态快照的写入间隔与有效期(秒)
+INDICATOR_SNAPSHOT_INTERVAL = 60
+INDICATOR_SNAPSHOT_MAX_AGE = 24 * 60 * 60
+OFFLOAD_RING_CAPACITY = 4096
+# 向量化预计算滑动窗口时每块展开的最多元素数, 限制临时数组的内存
+VECTOR_WINDOW_CHUNK = 1 << 20
+# 成交量分布移除旧 bar 后低于该值的桶视为 0, 避免浮点残差成为幽灵价位
+VOLUME_EPSILON = 1e-9
+# 收益类 benchmark 的权益采样间隔(秒)与年化周期数
+BENCHMARK_SAMPLE_INTERVAL = 24 * 60 * 60
+BENCHMARK_PERIODS_PER_YEAR = 365
+# 权益曲线分级存储: (桶间隔秒数, 桶数量), 细粒度桶溢出后并入下一级
+TIME_RETURN_TIERS = (
+    (60, 7 * 24 * 60), (60 * 60, 90 * 24), (24 * 60 * 60, 10 * 365)
+)
 
 BLOCKING_ORDER_TIMEOUT = 3
+# 虚拟仓位: 同一 key/品种的市价单在该窗口(秒)内内部撮合, 只把净额发往交易所
+VIRTUAL_NETTING_WINDOW = 1
+# 已完成的虚拟订单只保留最近的这么多笔供查询
+VIRTUAL_ORDER_HISTORY = 1000
+# 多个 context 的同向订单在该窗口(秒)内合并为一笔/一批订单
+ORDER_AGGREGATE_WINDOW = 0.5
+# 已完成的聚合原始订单只保留最近的这么多笔供查询
+ORDER_AGGREGATE_HISTORY = 1000
+# 共享合约信息的刷新间隔(秒), 本地缓存文件中的数据超过该时长后重新请求交易所
+INSTRUMENT_CACHE_TTL = 6 * 60 * 60
+# 查不到合约代码时强制刷新合约信息的最小间隔(秒), 避免无效代码反复请求交易所
+INSTRUMENT_MISS_REFRESH = 10
+# 火币 kline 接口单次请求最多返回的 bar 数
+HUOBI_KLINE_LIMIT = 2000
@@ -1,7 +1,9 @@
 import logging
 from dataclasses import asdict
+from typing import List, Optional
 
-from sqlalchemy import create_engine, insert, update
+from sqlalchemy import create_engine, insert, update, select, desc, \
+    inspect, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
 
@@ -16,26 +18,28 @@ _URL = ""
 _ECHO = False
 _POOL_PRE_PING = True
 _POOL_RECYCLE = 600
+_ENGINE: Optional[Engine] = None
 
 
 def config_db_engine(url, echo=False) -> Engine:
-    global _URL, _ECHO
-    _URL, _ECHO = url, echo
+    global _URL, _ECHO, _ENGINE
+    _URL, _ECHO, _ENGINE = url, echo, None
 
 
 def db_engine() -> Engine:
-    eng = None
-    if not eng:
+    global _ENGINE
+    if not _ENGINE:
         eng = create_engine(
-            url=_URL,
+            _URL,
             echo=_ECHO,
             pool_pre_ping=_POOL_PRE_PING,
             pool_recycle=_POOL_RECYCLE,
         )
         if eng.name == "sqlite":
             register_sql_decimal()
-        create_table_if_not_exists()
-    return eng
+        create_table_if_not_exists(eng)
+        _ENGINE = eng
+    return _ENGINE
 
 
 def log_order_to_db(exchange_name, uid, order: Order, slippage):
@@ -105,6 +109,29 @@ def log_bar_to_db(bar: Bar):
         raise
 
 
+def load_last_n_bars(
+    exchange: str, market: str, instrument_id: str, granularity: int, cnt: int
+) -> List[Bar]:
+    with db_engine().connect() as c:
+        rows = c.execute(
+            select([HistoryBar])
+            .where(HistoryBar.c.exchange == exchange)
+            .where(HistoryBar.c.market == market)
+            .where(HistoryBar.c.instrument_id == instrument_id)
+            .where(HistoryBar.c.granularity == granularity)
+            .order_by(desc(HistoryBar.c.timestamp))
+            .limit(cnt)
+        ).fetchall()
+    return [
+        Bar(
+            exchange, market, instrument_id, r["timestamp"], float(r["open"]),
+            float(r["close"]), float(r["high"]), float(r["low"]), r["volume"],
+            float(r["currency_volume"]), r["granularity"]
+        )
+        for r in reversed(rows)
+    ]
+
+
 def log_trade_to_db(
     uid: str, exchange: str, market: str, instrument_id: str, trade: Trade
 ):
@@ -131,5 +158,28 @@ def log_trade_to_db(
         raise e
 
 
-def create_table_if_not_exists():
-    metadata.create_all(db_engine(), checkfirst=True)
+# 旧版本建表后新增的列: 表名 -> [(列名, 列定义)], 启动时补齐
+_ADDED_COLUMNS = {
+    HistoryBar.name: [("market", "VARCHAR(32)")],
+}
+
+
+def migrate(eng: Engine):
+    # create_all 不会修改已存在的表, 缺少的列用 ALTER TABLE 补上;
+    # 补列前写入的行该列为 NULL, 按该列过滤的查询不会返回这些行
+    insp = inspect(eng)
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {col["name"] for col in insp.get_columns(table)}
+        for name, ddl in columns:
+            if name in existing:
+                continue
+            log.warning(f"add missing column {table}.{name}, rows written "
+                        f"before this version are ignored by {name} filters")
+            with eng.begin() as c:
+                c.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def create_table_if_not_exists(eng: Engine = None):
+    eng = eng or db_engine()
+    metadata.create_all(eng, checkfirst=True)
+    migrate(eng)
@@ -0,0 +1,88 @@
+import logging
+import zlib
+from queue import Queue
+from threading import Thread
+from typing import List, Dict
+
+from .consts import INIT, RUNNING, STOPPED
+from .dtypes import Evt, Tick, Bar, OrderBook
+from .pipelines import PipelineRegistry, Pipeline
+
+log = logging.getLogger(__name__)
+
+# 按 market_id 分派到固定 worker 的公共行情消息, 其余消息作为汇合点同步分派.
+# 运行期间同一实例的 sink 串行执行: 策略的 on_tick/on_bar 通常以
+# BYPASS_FILTER 订阅全部品种, 共享策略/broker/registry 状态, 只有不同实例
+# (不同策略、各品种的指标)之间才并发.
+KEYED_EVENTS = (Tick, Bar, OrderBook)
+
+
+class KeyedDispatcher:
+
+    def __init__(self, pipelines: PipelineRegistry, workers: int):
+        assert workers > 0
+        self._state = INIT
+        self._pipelines = pipelines
+        self._queues: List[Queue] = [Queue() for _ in range(workers)]
+        self._threads: List[Thread] = list()
+        self._routes: Dict[str, Queue] = dict()
+
+    @property
+    def is_running(self):
+        return self._state == RUNNING
+
+    @property
+    def workers(self) -> int:
+        return len(self._queues)
+
+    def route(self, market_id: str) -> Queue:
+        q = self._routes.get(market_id)
+        if q is None:
+            idx = zlib.crc32(market_id.encode("utf8")) % len(self._queues)
+            q = self._routes[market_id] = self._queues[idx]
+        return q
+
+    def dispatch(self, evt: Evt):
+        if type(evt) in KEYED_EVENTS:
+            return self.route(evt.market_id).put(evt)
+        # 账户级消息: 等待所有 worker 处理完已分派的行情, 再在当前线程分派
+        self.join()
+        return self._pipelines.dispatch(evt)
+
+    def join(self):
+        for q in self._queues:
+            q.join()
+
+    def _poll(self, q: Queue):
+        while True:
+            evt = q.get()
+            try:
+                if evt is None:
+                    return
+                self._pipelines.dispatch(evt)
+            except Exception as e:
+                log.exception(e)
+            finally:
+                q.task_done()
+
+    def start(self):
+        if not self.is_running:
+            self._threads = [
+                Thread(target=self._poll, args=(q,), daemon=True)
+                for q in self._queues
+            ]
+            Pipeline.serialize = True
+            for t in self._threads:
+                t.start()
+            self._state = RUNNING
+
+    def stop(self):
+        if self.is_running:
+            for q in self._queues:
+                q.put(None)
+            for t in self._threads:
+                t.join(5)
+                if t.is_alive():
+                    log.error("Try to stop failed!")
+            Pipeline.serialize = False
+            self._state = STOPPED
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, Tuple, Callable, Union, TypeVar, List, Any
 
@@ -280,7 +280,7 @@ class Trade:
     pnl: float
     commission: float
     close_ts: datetime = None
-    orders: Tuple[str] = tuple()
+    orders: List[str] = field(default_factory=list)
     status: str = OPEN
     account: str = ""
     
@@ -428,6 +428,9 @@ class Lot(int):
         a, b = int.__divmod__(int(self), other)
         return Lot(a), Lot(b)
     
+    def __str__(self):
+        return str(int(self))
+    
     def __repr__(self):
         return f"Lot({self})"
 
@@ -446,6 +449,9 @@ class Size(float):
         a, b = float.__divmod__(float(self), other)
         return Size(a), Size(b)
     
+    def __str__(self):
+        return str(float(self))
+    
     def __repr__(self):
         return f"Size({self})"
 
@@ -1 +1,4 @@
 from .base import GatewayManager, Gateway
+from .restful import RestfulGateway
+from .pubsub import PubSubGateway, MarketDataHub
+from .shm import ShmGateway, ShmRingWriter, ShmRingReader
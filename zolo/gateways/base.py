@@ -63,6 +63,7 @@ class GatewayManager:
     def on_message(self, evt: Message):
         if evt.cmd == GATEWAY_SUBSCRIBE:
             cfg: ChannelConfig = evt.payload
+            self.subscribe(cfg)
             self.gateways[cfg.gateway.gateway_id].subscribe(cfg)
         elif evt.cmd == GATEWAY_UNSUBSCRIBE:
             cfg: ChannelConfig = evt.payload
@@ -35,6 +35,7 @@ class ZmqGateway:
         self._poller = zmq.Poller()
         self._poller.register(self._sock, zmq.POLLIN)
         self._sock.bind(f"{host}")
+        self._outbox = Queue()
         super().__init__()
     
     @property
@@ -44,6 +45,7 @@ class ZmqGateway:
     def _poll(self, q: Queue):
         self._state = RUNNING
         while self.is_running:
+            self._flush_outbox()
             try:
                 msg = self._poll_once()
             except TimeoutError:
@@ -51,6 +53,18 @@ class ZmqGateway:
             q.put(msg)
         self._state = STOPPED
     
+    def send(self, msg: Message):
+        # zmq socket 非线程安全, 统一由 poll 线程发送
+        self._outbox.put(msg)
+    
+    def _flush_outbox(self):
+        while True:
+            try:
+                msg = self._outbox.get_nowait()
+            except Empty:
+                return
+            self._sock.send(json.dumps(asdict(msg)).encode("utf8"))
+    
     def _poll_once(self):
         res = self._poller.poll(timeout=1)
         if not res:
@@ -0,0 +1,262 @@
+import json
+import logging
+from dataclasses import replace, fields
+from datetime import datetime
+from queue import Queue, Empty
+from threading import Thread
+from typing import Dict, Tuple
+
+import zmq
+
+from ..consts import INIT, RUNNING, STOPPED, PUBSUB, RESTFUL, \
+    MARKET_DATA_PUB, MARKET_DATA_CTRL
+from ..dtypes import ChannelConfig, GatewayConfig, Message, Bar, Tick, \
+    OrderBook, dot_concat, CREDENTIAL_EMPTY, MarketEvt
+from .base import Gateway, GatewayManager
+from .shm import ShmRingWriter
+
+log = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 1  # ms
+SUBSCRIBE = "subscribe"
+UNSUBSCRIBE = "unsubscribe"
+# 跨进程只传这几类行情, 按类名还原
+MARKET_EVENTS = {cls.__name__: cls for cls in (Tick, Bar, OrderBook)}
+
+
+def event_topic(evt: MarketEvt) -> bytes:
+    parts = [type(evt).__name__, evt.market_id]
+    if isinstance(evt, Bar):
+        parts.append(int(evt.granularity))
+    # 结尾加分隔符, 避免 zmq 前缀匹配时 btc-usd 匹配到 btc-usdt
+    return f"{dot_concat(*parts)}|".encode("utf8")
+
+
+def channel_topic(cfg: ChannelConfig) -> bytes:
+    parts = [
+        cfg.evt_type.__name__, cfg.gateway.name, cfg.market, cfg.instrument_id
+    ]
+    if cfg.evt_type is Bar:
+        parts.append(int(cfg.parameters["granularity"]))
+    return f"{dot_concat(*parts)}|".encode("utf8")
+
+
+# 帧内容一律用 JSON 编解码, 不反序列化任意对象: 连上端口的进程不能借此执行代码
+def encode_event(evt: MarketEvt) -> bytes:
+    res = {f.name: getattr(evt, f.name) for f in fields(evt)}
+    res["timestamp"] = evt.timestamp.isoformat()
+    return json.dumps([type(evt).__name__, res]).encode("utf8")
+
+
+def decode_event(payload: bytes) -> MarketEvt:
+    name, res = json.loads(payload)
+    cls = MARKET_EVENTS[name]
+    res["timestamp"] = datetime.fromisoformat(res["timestamp"])
+    if cls is OrderBook:
+        res["asks"] = [tuple(depth) for depth in res["asks"]]
+        res["bids"] = [tuple(depth) for depth in res["bids"]]
+    return cls(**res)
+
+
+def encode_ctrl(op: str, cfg: ChannelConfig) -> bytes:
+    return json.dumps(dict(
+        op=op, name=cfg.gateway.name, market=cfg.market,
+        instrument_id=cfg.instrument_id, evt_type=cfg.evt_type.__name__,
+        parameters=cfg.parameters or dict(),
+    )).encode("utf8")
+
+
+def decode_ctrl(payload: bytes) -> Tuple[str, ChannelConfig]:
+    res = json.loads(payload)
+    if res["op"] not in (SUBSCRIBE, UNSUBSCRIBE):
+        raise ValueError(f"unknown op: {res['op']}")
+    if not isinstance(res["parameters"], dict):
+        raise ValueError(f"invalid parameters: {res['parameters']}")
+    return res["op"], ChannelConfig(
+        GatewayConfig(PUBSUB, str(res["name"])), str(res["market"]),
+        str(res["instrument_id"]), CREDENTIAL_EMPTY,
+        MARKET_EVENTS[res["evt_type"]], res["parameters"],
+    )
+
+
+# 行情中心进程: 独占交易所 gateway, 将 Tick/Bar/OrderBook 发布给订阅的策略进程,
+# 同一 channel 无论多少策略订阅, 只向交易所请求一次.
+class MarketDataHub:
+
+    def __init__(
+        self, pub: str = MARKET_DATA_PUB, ctrl: str = MARKET_DATA_CTRL,
+        upstream: str = RESTFUL, ring: str = "",
+    ):
+        self._state = INIT
+        # 可选: 同时写入共享内存 ring, 供同机策略进程低延迟读取
+        self._ring = ShmRingWriter(ring) if ring else None
+        self._upstream = upstream
+        self._q = Queue()
+        self._gateways = GatewayManager(self._q)
+        # channel topic -> 订阅的策略数, 归零时才向交易所退订
+        self._channels: Dict[bytes, int] = dict()
+        self._ctx = zmq.Context.instance()
+        self._pub = self._ctx.socket(zmq.PUB)
+        self._pub.bind(pub)
+        self._ctrl = self._ctx.socket(zmq.PULL)
+        self._ctrl.bind(ctrl)
+        self._poller = zmq.Poller()
+        self._poller.register(self._ctrl, zmq.POLLIN)
+
+    @property
+    def is_running(self):
+        return self._state == RUNNING
+
+    def _upstream_cfg(self, cfg: ChannelConfig) -> ChannelConfig:
+        # 行情为公共数据, 去掉 credential 后按 channel 去重
+        return replace(
+            cfg, gateway=GatewayConfig(self._upstream, cfg.gateway.name),
+            credential=CREDENTIAL_EMPTY
+        )
+
+    def subscribe(self, cfg: ChannelConfig):
+        cfg, topic = self._upstream_cfg(cfg), channel_topic(cfg)
+        self._channels[topic] = self._channels.get(topic, 0) + 1
+        if self._channels[topic] > 1:
+            return
+        log.info(f"[HUB] subscribe: {cfg}")
+        self._gateways.subscribe(cfg)
+        self._gateways.gateways[cfg.gateway.gateway_id].subscribe(cfg)
+
+    def unsubscribe(self, cfg: ChannelConfig):
+        cfg, topic = self._upstream_cfg(cfg), channel_topic(cfg)
+        if topic not in self._channels:
+            log.warning(f"[HUB] {cfg} is not subscribed")
+            return
+        self._channels[topic] -= 1
+        if self._channels[topic] > 0:
+            return
+        log.info(f"[HUB] unsubscribe: {cfg}")
+        del self._channels[topic]
+        gateway = self._gateways.gateways.get(cfg.gateway.gateway_id)
+        if gateway:
+            gateway.unsubscribe(cfg)
+
+    def publish(self, evt: MarketEvt):
+        self._pub.send_multipart([event_topic(evt), encode_event(evt)])
+        if self._ring:
+            self._ring.write(evt)
+
+    def _poll_ctrl(self):
+        for _ in self._poller.poll(timeout=POLL_TIMEOUT):
+            payload = self._ctrl.recv()
+            try:
+                op, cfg = decode_ctrl(payload)
+            except (ValueError, KeyError, TypeError):
+                log.warning(f"invalid subscription request: {payload[:64]}")
+                continue
+            if op == SUBSCRIBE:
+                self.subscribe(cfg)
+            else:
+                self.unsubscribe(cfg)
+
+    def _poll_events(self):
+        while True:
+            try:
+                evt = self._q.get_nowait()
+            except Empty:
+                return
+            if isinstance(evt, (Tick, Bar, OrderBook)):
+                self.publish(evt)
+            elif isinstance(evt, Message):
+                self._gateways.on_message(evt)
+
+    def start(self):
+        self._state = RUNNING
+        while self.is_running:
+            try:
+                self._poll_ctrl()
+                self._poll_events()
+            except KeyboardInterrupt:
+                break
+        self._gateways.stop()
+        if self._ring:
+            self._ring.close()
+        self._state = STOPPED
+
+    def stop(self):
+        self._state = STOPPED
+
+
+# 策略进程侧: 向 MarketDataHub 订阅 channel 并接收行情
+class PubSubGateway(Gateway, scheme=PUBSUB):
+
+    def __init__(
+        self, pub: str = MARKET_DATA_PUB, ctrl: str = MARKET_DATA_CTRL
+    ):
+        super().__init__()
+        self._state = INIT
+        self._thread: Thread = None
+        self._ctx = zmq.Context.instance()
+        self._sub = self._ctx.socket(zmq.SUB)
+        self._sub.connect(pub)
+        self._ctrl = self._ctx.socket(zmq.PUSH)
+        self._ctrl.connect(ctrl)
+        # zmq socket 非线程安全, topic 变更交给 poll 线程处理
+        self._topics = Queue()
+
+    @property
+    def is_running(self):
+        return self._state == RUNNING
+
+    def subscribe(self, cfg: ChannelConfig):
+        self._ctrl.send(encode_ctrl(SUBSCRIBE, cfg))
+        self._topics.put((zmq.SUBSCRIBE, channel_topic(cfg)))
+
+    def unsubscribe(self, cfg: ChannelConfig):
+        self._ctrl.send(encode_ctrl(UNSUBSCRIBE, cfg))
+        self._topics.put((zmq.UNSUBSCRIBE, channel_topic(cfg)))
+
+    def _apply_topics(self):
+        while True:
+            try:
+                opt, topic = self._topics.get_nowait()
+            except Empty:
+                return
+            self._sub.setsockopt(opt, topic)
+
+    def _poll(self, q: Queue):
+        self._state = RUNNING
+        poller = zmq.Poller()
+        poller.register(self._sub, zmq.POLLIN)
+        while self.is_running:
+            self._apply_topics()
+            if not poller.poll(timeout=100):
+                continue
+            _, payload = self._sub.recv_multipart()
+            try:
+                q.put(decode_event(payload))
+            except (ValueError, KeyError, TypeError):
+                log.warning(f"invalid market data: {payload[:64]}")
+        poller.unregister(self._sub)
+        self._state = STOPPED
+
+    def reboot(self, q: Queue):
+        self.stop()
+        self.start(q)
+
+    def stop(self):
+        if self.is_running:
+            self._state = STOPPED
+            self._thread.join(5)
+            if self._state != STOPPED:
+                log.error("Try to stop failed!")
+
+    def start(self, q: Queue):
+        if not self.is_running:
+            self._thread = Thread(target=self._poll, args=(q,))
+            self._thread.start()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    MarketDataHub().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,7 @@ from contextlib import contextmanager
 from typing import Type, Dict, Callable, Optional
 from .base import Gateway
 from queue import Queue
-from ..adapters import create_adapter
+from ..adapters import get_adapter
 
 log = logging.getLogger(__name__)
 
@@ -45,7 +45,7 @@ class Executor:
         return self.SimpleJob(job)
 
 
-class RestfulGateway(Gateway, gateway_scheme=RESTFUL):
+class RestfulGateway(Gateway, scheme=RESTFUL):
     channel_registry: Dict[Type[ExchangeEvt], Type["RestfulChannel"]] = dict()
 
     @classmethod
@@ -74,15 +74,15 @@ class RestfulGateway(Gateway, gateway_scheme=RESTFUL):
             log.warning(f"{cfg} is already exist!")
             return
         if cfg.channel_id not in self._adapters:
-            res = create_adapter(cfg.gateway.gateway_scheme, cfg.gateway.name, cfg.market, cfg.credential)
+            res = get_adapter(cfg.gateway.gateway_scheme, cfg.gateway.name, cfg.market, cfg.credential)
             self._adapters[cfg.channel_id] = res
         self._channels[cfg.channel_id] = self.create_channel(self._adapters[cfg.channel_id], cfg)
 
     def unsubscribe(self, cfg: ChannelConfig):
-        if cfg not in self._channels:
+        if cfg.channel_id not in self._channels:
             log.warning(f"{cfg} is not exist")
             return
-        self._channels = {k: v for k, v in self._channels if k.cfg.channel_id != cfg.channel_id}
+        self._channels = {k: v for k, v in self._channels.items() if k != cfg.channel_id}
 
     @property
     def is_running(self):
@@ -0,0 +1,224 @@
+import logging
+import multiprocessing as mp
+import struct
+import time
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory, resource_tracker
+from queue import Queue
+from threading import Thread
+from typing import Optional, Iterable, Dict
+
+from ..consts import INIT, RUNNING, STOPPED, UNIX_EPOCH, SHM_RING_CAPACITY
+from ..dtypes import Tick, Bar, OrderBook, MarketEvt
+
+log = logging.getLogger(__name__)
+
+# header: 最新写入序号, 容量, 单条记录长度
+_HEADER = struct.Struct("<QQQ")
+_SEQ = struct.Struct("<Q")
+# record: 序号, 类型, exchange, market, instrument_id, timestamp, 6个数值字段,
+# granularity
+_RECORD = struct.Struct("<QB7x16s16s32sddddddd q")
+
+KIND_TICK = 1
+KIND_BAR = 2
+KIND_BOOK = 3
+# exchange, market, instrument_id 的定长字节数, 与 _RECORD 一致
+_STR_SIZES = (16, 16, 32)
+
+
+def _to_seconds(ts: datetime) -> float:
+    return (ts - UNIX_EPOCH).total_seconds()
+
+
+def _encode_str(value: str, size: int) -> bytes:
+    # struct 会静默截断超长字符串, 截断后的合约代码可能指向别的合约
+    res = value.encode("utf8")
+    if len(res) > size:
+        raise ValueError(f"{value!r} exceeds {size} bytes")
+    return res
+
+
+def _depth(side: list) -> tuple:
+    # 空的一侧记为数量 0, 解码时还原为空列表
+    return (float(side[0][0]), float(side[0][1])) if side else (0.0, 0.0)
+
+
+def _encode(evt: MarketEvt) -> tuple:
+    ids = tuple(
+        _encode_str(value, size) for value, size in zip(
+            (evt.exchange, evt.market, evt.instrument_id), _STR_SIZES)
+    ) + (_to_seconds(evt.timestamp),)
+    if isinstance(evt, Tick):
+        return (KIND_TICK,) + ids + (float(evt.price), 0, 0, 0, 0, 0, 0)
+    if isinstance(evt, Bar):
+        return (KIND_BAR,) + ids + (
+            float(evt.open), float(evt.close), float(evt.high),
+            float(evt.low), float(evt.volume), float(evt.currency_volume),
+            int(evt.granularity),
+        )
+    if isinstance(evt, OrderBook):
+        return (KIND_BOOK,) + ids + _depth(evt.bids) + _depth(evt.asks) + \
+            (0, 0, 0)
+    raise TypeError(f"Unsupported event: {evt}")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # reader 不负责释放共享内存, 避免进程退出时被 resource_tracker unlink
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # python < 3.13 没有 track 参数, 挂载后注销. multiprocessing 子进程与父进程
+    # 共用 tracker, 重复注册不生效, 注销会删掉写者的注册, 所以不注销
+    res = shared_memory.SharedMemory(name=name)
+    if mp.parent_process() is None:
+        resource_tracker.unregister(res._name, "shared_memory")
+    return res
+
+
+class ShmRingWriter:
+    # 单生产者: 写 slot 前先作废序号, 写完数据再写入序号(seqlock)
+
+    def __init__(self, name: str, capacity: int = SHM_RING_CAPACITY):
+        assert capacity > 0
+        self._capacity = capacity
+        self._seq = 0
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True,
+            size=_HEADER.size + capacity * _RECORD.size
+        )
+        _HEADER.pack_into(self._shm.buf, 0, 0, capacity, _RECORD.size)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, evt: MarketEvt):
+        # 先编码, 编码失败时不破坏 slot 中的旧记录
+        rec = _encode(evt)
+        seq = self._seq + 1
+        buf = self._shm.buf
+        offset = _HEADER.size + (seq % self._capacity) * _RECORD.size
+        _SEQ.pack_into(buf, offset, 0)
+        _RECORD.pack_into(buf, offset, 0, *rec)
+        _SEQ.pack_into(buf, offset, seq)
+        _SEQ.pack_into(buf, 0, seq)
+        self._seq = seq
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+class ShmRingReader:
+    # 多消费者: 每个 reader 持有自己的读游标, 被写者追上时记录丢失条数
+
+    def __init__(self, name: str, from_start: bool = False):
+        self._shm = _attach(name)
+        head, self._capacity, size = _HEADER.unpack_from(self._shm.buf, 0)
+        assert size == _RECORD.size, "Ring record layout mismatch"
+        self._cursor = max(head - self._capacity + 1, 1) if from_start \
+            else head + 1
+        # from_start 时, 接入前已被覆盖的记录也计入丢失
+        self.lost = self._cursor - 1 if from_start else 0
+        self._strings: Dict[bytes, str] = dict()
+
+    def _decode_str(self, raw: bytes) -> str:
+        res = self._strings.get(raw)
+        if res is None:
+            res = self._strings[raw] = raw.rstrip(b"\0").decode("utf8")
+        return res
+
+    def _decode(self, rec: tuple) -> MarketEvt:
+        _, kind, exchange, market, instrument_id, ts, \
+            a, b, c, d, e, f, granularity = rec
+        exchange, market, instrument_id = self._decode_str(exchange), \
+            self._decode_str(market), self._decode_str(instrument_id)
+        ts = UNIX_EPOCH + timedelta(seconds=ts)
+        if kind == KIND_TICK:
+            return Tick(exchange, market, instrument_id, ts, a)
+        if kind == KIND_BAR:
+            return Bar(exchange, market, instrument_id, ts, a, b, c, d, e, f,
+                       granularity)
+        return OrderBook(exchange, market, instrument_id, ts,
+                         [(c, d)] if d else [], [(a, b)] if b else [])
+
+    def _skip_to(self, head: int):
+        oldest = head - self._capacity + 1
+        if self._cursor < oldest:
+            self.lost += oldest - self._cursor
+            self._cursor = oldest
+
+    def read(self) -> Optional[MarketEvt]:
+        buf = self._shm.buf
+        head = _SEQ.unpack_from(buf, 0)[0]
+        if self._cursor > head:
+            return None
+        self._skip_to(head)
+        offset = _HEADER.size + (self._cursor % self._capacity) * _RECORD.size
+        rec = _RECORD.unpack_from(buf, offset)
+        if rec[0] != self._cursor or \
+                _SEQ.unpack_from(buf, offset)[0] != self._cursor:
+            # 读取期间 slot 被覆盖
+            self._skip_to(_SEQ.unpack_from(buf, 0)[0] + 1)
+            return None
+        self._cursor += 1
+        return self._decode(rec)
+
+    def __iter__(self) -> Iterable[MarketEvt]:
+        while True:
+            evt = self.read()
+            if evt is None:
+                return
+            yield evt
+
+    def close(self):
+        self._shm.close()
+
+
+class ShmGateway:
+    # 作为 EventHub 的另一个消息源, 将共享内存中的行情投递到 hub 队列
+
+    def __init__(self, name: str, idle: float = 0.0001):
+        self._state = INIT
+        self._thread: Thread = None
+        self._name = name
+        self._idle = idle
+        self._reader: Optional[ShmRingReader] = None
+
+    @property
+    def is_running(self):
+        return self._state == RUNNING
+
+    @property
+    def lost(self) -> int:
+        return self._reader.lost if self._reader else 0
+
+    def _poll(self, q: Queue):
+        self._state = RUNNING
+        while self.is_running:
+            evt = self._reader.read()
+            if evt is None:
+                time.sleep(self._idle)
+                continue
+            q.put(evt)
+        self._state = STOPPED
+
+    def reboot(self, q: Queue):
+        self.stop()
+        self.start(q)
+
+    def stop(self):
+        if self.is_running:
+            self._state = STOPPED
+            self._thread.join(5)
+            if self._state != STOPPED:
+                log.error("Try to stop failed!")
+
+    def start(self, q: Queue):
+        if not self.is_running:
+            if not self._reader:
+                self._reader = ShmRingReader(self._name)
+            self._thread = Thread(target=self._poll, args=(q,))
+            self._thread.start()
@@ -1,24 +1,111 @@
 import logging
-from typing import Dict, Type, List, Callable, Optional
+from collections import defaultdict, deque
+from itertools import count
+from time import perf_counter, monotonic
+from typing import Dict, Type, List, Callable, Optional, Tuple
 
+from .consts import HUB_STATS_ENABLE, HUB_STATS_DISABLE, HUB_STATS_RESET, \
+    HUB_STATS_DUMP, BLOCK_PRODUCER, DROP_OLDEST, NEVER_DROP, MARKET_DATA_SHM
+from .dispatch import KeyedDispatcher
 from .gateways import GatewayManager
-from .dtypes import Evt
+from .dtypes import Evt, Message, Tick, OrderBook
 from .gateways.mq import ZmqGateway
-from queue import Queue
+from .gateways.shm import ShmGateway
+from .metrics import evt_stats
+from queue import Queue, Full
 
 from .pipelines import PipelineRegistry
 
 log = logging.getLogger(__name__)
 
+# 只有 tick/盘口快照可丢弃旧数据(新快照覆盖旧快照); bar 和 timer 丢失后
+# 不会重发, 会破坏流式指标和策略的 on_bar, 与私有消息(order, fill, trade...)
+# 一样默认不丢弃不限长
+DEFAULT_QUEUE_POLICIES = {
+    Tick: (DROP_OLDEST, 4096),
+    OrderBook: (DROP_OLDEST, 1024),
+}
+
+
+class EventQueue(Queue):
+    # 按消息类型分队列, 全局序号保证出队顺序与入队一致
+    def __init__(self, policies: Dict[Type[Evt], Tuple[str, int]] = None):
+        self._policies: Dict[Type[Evt], Tuple[str, int]] = dict(
+            DEFAULT_QUEUE_POLICIES)
+        self._policies.update(policies or {})
+        self.dropped: Dict[str, int] = defaultdict(int)
+        self.blocked: Dict[str, int] = defaultdict(int)
+        super().__init__()
+    
+    def set_policy(self, evt_type: Type[Evt], policy: str, bound: int = 0):
+        assert policy in (BLOCK_PRODUCER, DROP_OLDEST, NEVER_DROP)
+        assert policy == NEVER_DROP or bound > 0
+        with self.mutex:
+            self._policies[evt_type] = (policy, bound)
+    
+    def put(self, evt: Evt, block: bool = True, timeout: float = None):
+        policy, bound = self._policies.get(type(evt), (NEVER_DROP, 0))
+        with self.not_full:
+            q = self.queue[type(evt)]
+            if policy == DROP_OLDEST and len(q) >= bound:
+                q.popleft()
+                self._size -= 1
+                self.dropped[type(evt).__name__] += 1
+            elif policy == BLOCK_PRODUCER and len(q) >= bound:
+                self.blocked[type(evt).__name__] += 1
+                if not block:
+                    raise Full
+                end = monotonic() + timeout if timeout is not None else None
+                while len(q) >= bound:
+                    if end is None:
+                        self.not_full.wait()
+                        continue
+                    remaining = end - monotonic()
+                    if remaining <= 0:
+                        raise Full
+                    self.not_full.wait(remaining)
+            self._put(evt)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+    
+    def _init(self, maxsize: int):
+        self.queue: Dict[Type[Evt], deque] = defaultdict(deque)
+        self._size = 0
+        self._seq = count()
+    
+    def _qsize(self) -> int:
+        return self._size
+    
+    def _put(self, evt: Evt):
+        self.queue[type(evt)].append((
+            next(self._seq), perf_counter() if evt_stats.enabled else 0, evt
+        ))
+        self._size += 1
+    
+    def _get(self) -> Evt:
+        head = None
+        for q in self.queue.values():
+            if q and (head is None or q[0][0] < head[0][0]):
+                head = q
+        _, ts, evt = head.popleft()
+        self._size -= 1
+        # 不同类型的生产者可能同时阻塞, 全部唤醒后各自检查
+        self.not_full.notify_all()
+        if ts:
+            evt_stats.on_dequeue(evt, perf_counter() - ts, self._size)
+        return evt
+
 
 class EventHub:
     
     def __init__(self):
         self._use_gateway: bool = False
-        self._evt_q = Queue()
+        self._evt_q = EventQueue()
         self._pipelines: PipelineRegistry = PipelineRegistry()
         self._gateways: GatewayManager = GatewayManager(self._evt_q)
         self.zmq: ZmqGateway = None
+        self.shm: ShmGateway = None
+        self._keyed: Optional[KeyedDispatcher] = None
     
     def attach_sink(self, evt_type: Type[Evt], flt: Callable, on_evt: Callable):
         return self._pipelines.attach_sink(evt_type, flt, on_evt)
@@ -33,9 +120,29 @@ class EventHub:
         return self._evt_q.put(evt)
     
     def dispatch(self, evt: Evt):
+        if self._keyed:
+            return self._keyed.dispatch(evt)
         return self._pipelines.dispatch(evt)
     
+    def enable_keyed_dispatch(self, workers: int):
+        # 同一 market_id 的行情由固定线程顺序处理, 不同品种并发
+        if not self._keyed:
+            self._keyed = KeyedDispatcher(self._pipelines, workers)
+            self._keyed.start()
+    
+    def disable_keyed_dispatch(self):
+        if self._keyed:
+            self._keyed.stop()
+            self._keyed = None
+    
+    def join(self):
+        if self._keyed:
+            self._keyed.join()
+    
     def stop(self):
+        self.disable_keyed_dispatch()
+        if self.shm:
+            self.shm.stop()
         self.zmq.stop()
         self.gateways.stop()
     
@@ -50,6 +157,53 @@ class EventHub:
         if not self.zmq:
             self.zmq = ZmqGateway(host)
             self.zmq.start(self._evt_q)
+            self.attach_sink(
+                Message, lambda msg: msg.cmd in (
+                    HUB_STATS_ENABLE, HUB_STATS_DISABLE, HUB_STATS_RESET,
+                    HUB_STATS_DUMP
+                ), self.on_message
+            )
+    
+    def start_shm(self, name: str = MARKET_DATA_SHM):
+        # 同机行情进程通过共享内存 ring 投递, 绕过 zmq 序列化
+        if not self.shm:
+            self.shm = ShmGateway(name)
+            self.shm.start(self._evt_q)
+    
+    @staticmethod
+    def enable_stats():
+        evt_stats.enable()
+    
+    @staticmethod
+    def disable_stats():
+        evt_stats.disable()
+    
+    def set_queue_policy(self, evt_type: Type[Evt], policy: str, bound: int = 0):
+        return self._evt_q.set_policy(evt_type, policy, bound)
+    
+    def get_stats(self) -> dict:
+        res = evt_stats.snapshot()
+        res["queue"].update(
+            size=self._evt_q.qsize(),
+            dropped=dict(self._evt_q.dropped),
+            blocked=dict(self._evt_q.blocked),
+        )
+        return res
+    
+    def on_message(self, evt: Message):
+        if evt.cmd == HUB_STATS_ENABLE:
+            self.enable_stats()
+        elif evt.cmd == HUB_STATS_DISABLE:
+            self.disable_stats()
+        elif evt.cmd == HUB_STATS_RESET:
+            evt_stats.reset()
+        elif evt.cmd == HUB_STATS_DUMP:
+            res = self.get_stats()
+            log.info(f"[HUB STATS]: {res}")
+            if self.zmq:
+                self.zmq.send(Message(HUB_STATS_DUMP, res))
+        else:
+            log.error(f"Unknown msg: {evt}")
 
 
 evt_hub: EventHub = EventHub()
@@ -1,8 +1,20 @@
 from typing import TypeVar
 from .series import BarSeries
 from .sma import SimpleMovingAverage
+from .ema import ExponentialMovingAverage
+from .macd import MACD
+from .rsi import RelativeStrengthIndex
+from .atr import AverageTrueRange
+from .bollinger import BollingerBands
+from .cov import RollingCovariance
+from .vwap import SessionVWAP, AnchoredVWAP, VolumeProfile
 from .base import Indicator, create_indicator
+from .offload import OffloadedIndicator, stop_workers
+from .cache import IndicatorCache, ind_cache
+from .store import IndicatorStore, ind_store, config_indicator_store
 
-IndicatorType = TypeVar("IndicatorType", BarSeries, SimpleMovingAverage)
-
-
+IndicatorType = TypeVar(
+    "IndicatorType", BarSeries, SimpleMovingAverage, ExponentialMovingAverage,
+    MACD, RelativeStrengthIndex, AverageTrueRange, BollingerBands,
+    RollingCovariance, SessionVWAP, AnchoredVWAP, VolumeProfile
+)
@@ -0,0 +1,51 @@
+from .base import Indicator, IndicatorValue, WilderAverage, \
+    Precomputable
+from . import vector
+
+
+class AverageTrueRange(
+    Indicator, IndicatorValue, Precomputable, alias="atr"
+):
+
+    def __init__(self, period: int = 14, granularity: int = 0):
+        self._period, self._granularity = period, granularity
+        self._avg = WilderAverage(period)
+        self._prev: float = None
+        self._val: float = 0.0
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def warmup(self) -> int:
+        return 3 * self._period + 1
+
+    @property
+    def ready(self) -> bool:
+        if self.preloaded:
+            return self._cursor + 1 >= self._period
+        return self._avg.ready
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if self._prev is not None:
+            tr = max(tr, abs(high - self._prev), abs(low - self._prev))
+        self._prev = close
+        self._val = self._avg.update(tr)
+        return self._val
+
+    def precompute(self, columns):
+        tr = vector.true_range(
+            columns["high"], columns["low"], columns["close"])
+        return dict(value=vector.wilder(tr, self._period))
+
+    def on_bar(self, bar):
+        if self.preloaded and self._advance(bar):
+            self._val = self._output("value")
+            return
+        self.update(float(bar.high), float(bar.low), float(bar.close))
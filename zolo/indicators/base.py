@@ -1,5 +1,7 @@
 import abc
-from typing import Dict, Type, Union
+from bisect import bisect_left
+from dataclasses import replace
+from typing import Dict, Type, Union, Optional, List, Tuple, Iterable
 
 
 class IndicatorRegistry:
@@ -11,7 +13,7 @@ class IndicatorRegistry:
         if alias in cls.registry:
             raise ValueError
         cls.registry[alias] = indicator_class
-        setattr(cls, "alias", alias)
+        setattr(indicator_class, "alias", alias)
 
     @classmethod
     def create_indicator(
@@ -24,10 +26,148 @@ class IndicatorRegistry:
 
 
 class Indicator(abc.ABC):
+    offload: bool = False
 
     @classmethod
-    def __init_subclass__(cls, alias: str = "", **kwargs):
+    def __init_subclass__(
+        cls, alias: str = "", offload: bool = None, **kwargs
+    ):
         IndicatorRegistry.register(alias, cls)
+        # offload=True: 实盘时 on_bar 在独立进程中执行
+        if offload is not None:
+            setattr(cls, "offload", offload)
+
+    @classmethod
+    def dependencies(cls, **kwargs) -> Dict[str, Tuple[str, dict]]:
+        # 构造参数名 -> (alias, 参数), 由 IndicatorCache 注入共享的子指标
+        return dict()
+
+    @property
+    def warmup(self) -> int:
+        # 预热所需的历史 bar 数
+        return getattr(self, "period", 0)
+
+    def warm_up(self, bars: Iterable):
+        on_bar = getattr(self, "on_bar")
+        for bar in bars:
+            on_bar(bar)
+
+    def get_state(self) -> dict:
+        # 持久化用的内部状态, 回测预计算的结果不保存
+        return {
+            k: v for k, v in self.__dict__.items() if k not in PRELOADED
+        }
+
+    def set_state(self, state: dict):
+        self.__dict__.update(state)
+
+
+# 单值指标的公共接口, 子类维护 self._val
+class IndicatorValue:
+    _val: float = 0.0
+
+    @property
+    def value(self):
+        return self._val
+
+    def __float__(self):
+        return self._val
+
+    def __repr__(self):
+        return str(self._val)
+
+    def __eq__(self, other):
+        return self._val == float(other)
+
+    def __gt__(self, other):
+        return self._val > float(other)
+
+    def __lt__(self, other):
+        return self._val < float(other)
+
+    def __ge__(self, other):
+        return self._val >= float(other)
+
+    def __le__(self, other):
+        return self._val <= float(other)
+
+    def __format__(self, format_spec):
+        return self._val.__format__(format_spec)
+
+
+# 预计算载入的属性, 不属于流式状态
+PRELOADED = ("_outputs", "_columns", "_timestamps")
+
+
+# 回测预计算: preload 一次性算出全部输出, 之后 on_bar 只移动游标取值
+class Precomputable:
+    _outputs: Optional[Dict[str, List[float]]] = None
+
+    def precompute(self, columns: Dict[str, object]) -> Dict[str, object]:
+        raise NotImplementedError
+
+    @property
+    def preloaded(self) -> bool:
+        return self._outputs is not None
+
+    def preload(self, columns: Dict[str, object]):
+        # 回放时按下标取值, python list 比 numpy 标量访问快
+        self._outputs = {
+            k: v.tolist() for k, v in self.precompute(columns).items()
+        }
+        self._columns = columns
+        self._timestamps = columns["timestamp"]
+        self._cursor = -1
+
+    def _advance(self, bar) -> bool:
+        # 返回 False 表示 bar 不在预计算结果中, 已退回流式计算
+        ts, cursor = self._timestamps, self._cursor + 1
+        if cursor >= len(ts) or ts[cursor] != bar.timestamp:
+            cursor = bisect_left(ts, bar.timestamp)
+            if cursor >= len(ts) or ts[cursor] != bar.timestamp:
+                self._resume(bar, cursor)
+                return False
+        self._cursor = cursor
+        return True
+
+    def _unload(self):
+        self._outputs = self._columns = self._timestamps = None
+
+    def _resume(self, bar, end: int):
+        # 超出预计算范围或缺失的 bar: 用之前的 bar 重放出流式状态, 此后不再查表
+        columns = self._columns
+        self._unload()
+        self.warm_up(
+            replace(bar, timestamp=columns["timestamp"][i], **{
+                col: float(columns[col][i])
+                for col in ("open", "close", "high", "low", "volume")
+            }) for i in range(end)
+        )
+
+    def _output(self, name: str) -> float:
+        return self._outputs[name][self._cursor]
+
+
+# Wilder 平滑: 前 period 个样本取算术平均, 之后 avg = avg + (x - avg) / period
+class WilderAverage:
+
+    def __init__(self, period: int):
+        assert period > 0
+        self._period = period
+        self._cnt = 0
+        self.value = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._cnt >= self._period
+
+    def update(self, x: float) -> float:
+        if self._cnt < self._period:
+            self._cnt += 1
+            self.value += (x - self.value) / self._cnt
+        else:
+            self.value += (x - self.value) / self._period
+        return self.value
 
 
 create_indicator = IndicatorRegistry.create_indicator
@@ -0,0 +1,83 @@
+import math
+from collections import deque
+
+from .base import Indicator, IndicatorValue, Precomputable
+from . import vector
+
+
+class BollingerBands(
+    Indicator, IndicatorValue, Precomputable, alias="boll"
+):
+    # 滑动窗口 Welford: 新值加入, 挤出的旧值移除, 均值/方差 O(1) 更新
+
+    def __init__(self, period: int = 20, granularity: int = 0, k: float = 2.0):
+        assert period > 1
+        self._period, self._granularity, self._k = period, granularity, k
+        self._window = deque(maxlen=period)
+        self._m2: float = 0.0
+        self._std: float = 0.0
+        self._val: float = 0.0
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def ready(self) -> bool:
+        if self.preloaded:
+            return self._cursor + 1 >= self._period
+        return len(self._window) == self._period
+
+    @property
+    def stddev(self) -> float:
+        return self._std
+
+    @property
+    def middle(self) -> float:
+        return self._val
+
+    @property
+    def upper(self) -> float:
+        return self._val + self._k * self.stddev
+
+    @property
+    def lower(self) -> float:
+        return self._val - self._k * self.stddev
+
+    @property
+    def width(self) -> float:
+        return 2 * self._k * self.stddev
+
+    def _remove(self, x: float):
+        # 此时 x 已出队, 移除前样本数为 len + 1
+        n = len(self._window) + 1
+        if n == 1:
+            self._val, self._m2 = 0.0, 0.0
+            return
+        mean = (n * self._val - x) / (n - 1)
+        self._m2 -= (x - self._val) * (x - mean)
+        self._val = mean
+
+    def update(self, x: float) -> float:
+        if len(self._window) == self._period:
+            self._remove(self._window.popleft())
+        self._window.append(x)
+        delta = x - self._val
+        self._val += delta / len(self._window)
+        self._m2 += delta * (x - self._val)
+        self._std = math.sqrt(max(self._m2, 0.0) / len(self._window))
+        return self._val
+
+    def precompute(self, columns):
+        mean, std = vector.rolling_std(columns["close"], self._period)
+        return dict(value=mean, std=std)
+
+    def on_bar(self, bar):
+        if self.preloaded and self._advance(bar):
+            self._val, self._std = self._output("value"), self._output("std")
+            return
+        self.update(float(bar.close))
@@ -0,0 +1,187 @@
+import inspect
+import logging
+from datetime import datetime
+from functools import wraps
+from time import monotonic
+from typing import Dict, Tuple, Union, List, Set, Type, Callable, Optional, \
+    ItemsView
+
+from .base import Indicator, IndicatorRegistry
+from .offload import OffloadedIndicator
+from ..consts import WARM_UP_CACHE_EXPIRY, UNIX_EPOCH
+from ..dtypes import Bar
+
+log = logging.getLogger(__name__)
+
+
+def indicator_alias(ind: Union[str, Type[Indicator], Indicator]) -> str:
+    return ind if isinstance(ind, str) else getattr(ind, "alias")
+
+
+# 同一品种同一参数的指标全局只计算一次, 各 context 共享只读实例;
+# 依赖的子指标(如 MACD 的 EMA)同样从缓存获取, 并先于父指标订阅 bar.
+class IndicatorCache:
+
+    def __init__(self):
+        self._entries: Dict[Tuple, Indicator] = dict()
+        self._keys: Dict[int, Tuple] = dict()
+        self._deps: Dict[int, List[Indicator]] = dict()
+        self._subscribed: Set[int] = set()
+        self._warmed: Set[int] = set()
+        self._last_ts: Dict[Tuple[int, str], datetime] = dict()
+        self._history: Dict[Tuple[str, int], Tuple[float, List[Bar]]] = dict()
+
+    @staticmethod
+    def normalize(alias: str, **kwargs) -> Dict[str, object]:
+        # 补齐默认参数, sma(period=10) 与 sma(10, granularity=...) 视为同一指标
+        cls = IndicatorRegistry.registry[alias]
+        params = inspect.signature(cls).bind(**kwargs)
+        params.apply_defaults()
+        return dict(params.arguments)
+
+    @staticmethod
+    def key(
+        alias: str, market_id: str, params: Dict[str, object]
+    ) -> Tuple:
+        params = {
+            k: tuple(v) if isinstance(v, list) else v
+            for k, v in params.items()
+        }
+        return (
+            alias, tuple(sorted(params.items())), market_id.lower(),
+            int(params.get("granularity") or 0)
+        )
+
+    def get(
+        self, ind: Union[str, Type[Indicator]], market_id: str,
+        offload: bool = False, **kwargs
+    ) -> Indicator:
+        alias = indicator_alias(ind)
+        cls = IndicatorRegistry.registry[alias]
+        deps = cls.dependencies(**kwargs)
+        params = self.normalize(alias, **kwargs)
+        for name in deps:
+            params.pop(name, None)
+        key = self.key(alias, market_id, params)
+        res = self._entries.get(key)
+        if res is not None:
+            return res
+        instances = {
+            name: self.get(dep_alias, market_id, offload, **dep_kwargs)
+            for name, (dep_alias, dep_kwargs) in deps.items()
+        }
+        if offload and cls.offload and not instances:
+            res = self._entries[key] = OffloadedIndicator(cls, params)
+        else:
+            res = self._entries[key] = cls(**params, **instances)
+        self._keys[id(res)] = key
+        self._deps[id(res)] = list(instances.values())
+        log.info(f"[INDICATOR] create {alias} {market_id} {params}")
+        return res
+
+    def dependencies(self, ind: Indicator) -> List[Indicator]:
+        return self._deps.get(id(ind), [])
+
+    def key_of(self, ind: Indicator) -> Optional[Tuple]:
+        return self._keys.get(id(ind))
+
+    def items(self) -> ItemsView[Tuple, Indicator]:
+        return self._entries.items()
+
+    def last_ts(self, ind: Indicator) -> Dict[str, datetime]:
+        return {
+            market_id: ts for (i, market_id), ts in self._last_ts.items()
+            if i == id(ind)
+        }
+
+    def set_last_ts(self, ind: Indicator, last_ts: Dict[str, datetime]):
+        for market_id, ts in last_ts.items():
+            self._last_ts[(id(ind), market_id)] = ts
+
+    def subscribe(self, ind: Indicator) -> bool:
+        # 返回 True 表示首次订阅, 调用方需挂载 bar sink
+        if id(ind) in self._subscribed:
+            return False
+        self._subscribed.add(id(ind))
+        return True
+
+    def feeder(self, ind: Indicator) -> Callable[[Bar], None]:
+        # bar sink: 丢弃时间戳不晚于已处理(含预热)的 bar, 避免重复计算;
+        # 多品种指标按品种分别记录
+        on_bar = getattr(ind, "on_bar")
+
+        @wraps(on_bar)
+        def _on_bar(bar: Bar):
+            key = (id(ind), bar.market_id.lower())
+            last = self._last_ts.get(key)
+            if last is not None and bar.timestamp <= last:
+                return
+            self._last_ts[key] = bar.timestamp
+            on_bar(bar)
+
+        return _on_bar
+
+    def history(
+        self, market_id: str, instrument_id: str, granularity: int, cnt: int,
+        load: Callable[[int, int, str], List[Bar]]
+    ) -> List[Bar]:
+        # 同品种同周期的指标共用一次拉取的历史 bar;
+        # market_id 已转小写, 拉取时使用原始大小写的 instrument_id
+        key = (market_id.lower(), granularity)
+        ts, bars = self._history.get(key, (0.0, []))
+        if monotonic() - ts > WARM_UP_CACHE_EXPIRY or len(bars) < cnt:
+            bars = load(cnt, granularity, instrument_id) or []
+            self._history[key] = (monotonic(), bars)
+        return bars[-cnt:]
+
+    def warm_up(
+        self, ind: Indicator, market_id: str,
+        load: Callable[[int, int, str], List[Bar]], instrument_id: str
+    ):
+        if id(ind) in self._warmed:
+            return
+        self._warmed.add(id(ind))
+        granularity = int(getattr(ind, "granularity") or 0)
+        if ind.warmup <= 0 or not granularity:
+            return
+        prefix = market_id.rsplit(".", 1)[0]
+        instruments = getattr(ind, "instruments", ()) or (instrument_id,)
+        bars = sorted(
+            (bar for i in instruments for bar in self.history(
+                f"{prefix}.{i}", i, granularity, ind.warmup, load)),
+            key=lambda b: b.timestamp
+        )
+        if not bars:
+            log.warning(f"[INDICATOR] no history to warm up {ind.alias}")
+            return
+        # 从快照恢复的指标只重放快照之后的 bar
+        last_ts = self.last_ts(ind)
+        if last_ts:
+            if bars[0].timestamp > min(last_ts.values()):
+                log.warning(f"[INDICATOR] history does not reach back to "
+                            f"the snapshot of {ind.alias}")
+            bars = [
+                bar for bar in bars
+                if bar.timestamp > last_ts.get(bar.market_id.lower(),
+                                               UNIX_EPOCH)
+            ]
+        ind.warm_up(bars)
+        for bar in bars:
+            self._last_ts[(id(ind), bar.market_id.lower())] = bar.timestamp
+        log.info(f"[INDICATOR] warm up {ind.alias} {market_id} with "
+                 f"{len(bars)} bars")
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+        self._deps.clear()
+        self._subscribed.clear()
+        self._warmed.clear()
+        self._last_ts.clear()
+        self._history.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+ind_cache: IndicatorCache = IndicatorCache()
@@ -0,0 +1,137 @@
+import math
+from collections import deque
+from datetime import datetime
+from typing import Tuple, Dict, List, Optional
+
+from .base import Indicator
+
+
+class RollingCovariance(Indicator, alias="cov"):
+    # 多品种滑动窗口协方差: 各品种同一时间戳的 bar 对齐后, 以 Welford 方式
+    # 加入新样本/移除旧样本, 每次更新只遍历上三角 O(pairs)
+
+    def __init__(
+        self, period: int, granularity: int, instruments: Tuple[str, ...],
+        returns: bool = True
+    ):
+        assert len(instruments) > 1 and period > 1
+        self._granularity, self._period = granularity, period
+        self._instruments = tuple(instruments)
+        self._index = {
+            instrument_id.lower(): i
+            for i, instrument_id in enumerate(self._instruments)
+        }
+        self._returns = returns
+        n = len(self._instruments)
+        self._window = deque(maxlen=period)
+        self._mean: List[float] = [0.0] * n
+        self._comoment: List[List[float]] = [[0.0] * n for _ in range(n)]
+        self._pending: Dict[datetime, List[Optional[float]]] = dict()
+        self._prev: Optional[List[float]] = None
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def instruments(self) -> Tuple[str, ...]:
+        return self._instruments
+
+    @property
+    def warmup(self) -> int:
+        return self._period + 1
+
+    @property
+    def ready(self) -> bool:
+        return len(self._window) == self._period
+
+    def on_bar(self, bar):
+        i = self._index.get(bar.instrument_id.lower())
+        if i is None:
+            return
+        row = self._pending.setdefault(
+            bar.timestamp, [None] * len(self._instruments))
+        row[i] = float(bar.close)
+        if None in row:
+            # 某个品种停滞时丢弃最早的未对齐时间戳, 不让 _pending 无限增长
+            if len(self._pending) > self._period:
+                del self._pending[min(self._pending)]
+            return
+        # 对齐完成, 更早的未对齐时间戳不会再补齐
+        for ts in [ts for ts in self._pending if ts <= bar.timestamp]:
+            del self._pending[ts]
+        self.update(row)
+
+    def update(self, closes: List[float]):
+        if self._returns:
+            prev, self._prev = self._prev, closes
+            if prev is None:
+                return
+            closes = [c / p - 1.0 if p else 0.0 for c, p in zip(closes, prev)]
+        if len(self._window) == self._period:
+            self._remove(self._window.popleft())
+        self._add(closes)
+        self._window.append(closes)
+
+    def _add(self, x: List[float]):
+        n, mean, com = len(self._window) + 1, self._mean, self._comoment
+        delta = [xi - mi for xi, mi in zip(x, mean)]
+        for i in range(len(x)):
+            mean[i] += delta[i] / n
+        for i in range(len(x)):
+            for j in range(i, len(x)):
+                com[i][j] += delta[i] * (x[j] - mean[j])
+
+    def _remove(self, x: List[float]):
+        # 此时 x 已出队, 移除前样本数为 len + 1
+        n, mean, com = len(self._window), self._mean, self._comoment
+        if n == 0:
+            self._mean = [0.0] * len(x)
+            self._comoment = [[0.0] * len(x) for _ in range(len(x))]
+            return
+        old = list(mean)
+        for i in range(len(x)):
+            mean[i] = ((n + 1) * old[i] - x[i]) / n
+        for i in range(len(x)):
+            for j in range(i, len(x)):
+                com[i][j] -= (x[i] - mean[i]) * (x[j] - old[j])
+
+    def _cov(self, i: int, j: int) -> float:
+        n = len(self._window)
+        if n < 2:
+            return 0.0
+        if i > j:
+            i, j = j, i
+        return self._comoment[i][j] / (n - 1)
+
+    def _corr(self, i: int, j: int) -> float:
+        den = math.sqrt(max(self._cov(i, i), 0.0) * max(self._cov(j, j), 0.0))
+        return self._cov(i, j) / den if den else 0.0
+
+    def cov(self, a: str, b: str) -> float:
+        return self._cov(self._index[a.lower()], self._index[b.lower()])
+
+    def corr(self, a: str, b: str) -> float:
+        return self._corr(self._index[a.lower()], self._index[b.lower()])
+
+    def beta(self, y: str, x: str) -> float:
+        # y 相对 x 的 beta = cov(y, x) / var(x)
+        var = self.cov(x, x)
+        return self.cov(y, x) / var if var else 0.0
+
+    def mean(self, a: str) -> float:
+        return self._mean[self._index[a.lower()]]
+
+    def snapshot(self) -> dict:
+        n = len(self._instruments)
+        return dict(
+            instruments=self._instruments,
+            samples=len(self._window),
+            mean=list(self._mean),
+            cov=[[self._cov(i, j) for j in range(n)] for i in range(n)],
+            corr=[[self._corr(i, j) for j in range(n)] for i in range(n)],
+        )
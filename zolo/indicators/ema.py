@@ -0,0 +1,50 @@
+from .base import Indicator, IndicatorValue, Precomputable
+from . import vector
+
+
+class ExponentialMovingAverage(
+    Indicator, IndicatorValue, Precomputable, alias="ema"
+):
+
+    def __init__(self, period: int, granularity: int = 0):
+        assert period > 0
+        self._period, self._granularity = period, granularity
+        self._alpha = 2.0 / (period + 1)
+        self._cnt = 0
+        self._val: float = 0.0
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def warmup(self) -> int:
+        return 3 * self._period
+
+    @property
+    def ready(self) -> bool:
+        if self.preloaded:
+            return self._cursor + 1 >= self._period
+        return self._cnt >= self._period
+
+    def update(self, x: float) -> float:
+        # 前 period 个值以算术平均作为种子
+        if self._cnt < self._period:
+            self._cnt += 1
+            self._val += (x - self._val) / self._cnt
+        else:
+            self._val += self._alpha * (x - self._val)
+        return self._val
+
+    def precompute(self, columns):
+        return dict(value=vector.ema(columns["close"], self._period))
+
+    def on_bar(self, bar):
+        if self.preloaded and self._advance(bar):
+            self._val = self._output("value")
+            return
+        self.update(float(bar.close))
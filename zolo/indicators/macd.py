@@ -0,0 +1,94 @@
+from .base import Indicator, IndicatorValue, Precomputable
+from .ema import ExponentialMovingAverage
+from . import vector
+
+
+class MACD(Indicator, IndicatorValue, Precomputable, alias="macd"):
+
+    def __init__(
+        self, fast: int = 12, slow: int = 26, signal: int = 9,
+        granularity: int = 0, fast_ema: ExponentialMovingAverage = None,
+        slow_ema: ExponentialMovingAverage = None
+    ):
+        assert fast < slow
+        self._granularity = granularity
+        # 共享的 EMA 由各自的 bar sink 先行更新, 这里只读取
+        self._shared = fast_ema is not None and slow_ema is not None
+        if self._shared:
+            assert fast_ema.period == fast and slow_ema.period == slow
+        self._fast = fast_ema or ExponentialMovingAverage(fast, granularity)
+        self._slow = slow_ema or ExponentialMovingAverage(slow, granularity)
+        self._signal = ExponentialMovingAverage(signal, granularity)
+        self._val: float = 0.0
+
+    @classmethod
+    def dependencies(
+        cls, fast: int = 12, slow: int = 26, signal: int = 9,
+        granularity: int = 0, **kwargs
+    ):
+        return dict(
+            fast_ema=("ema", dict(period=fast, granularity=granularity)),
+            slow_ema=("ema", dict(period=slow, granularity=granularity)),
+        )
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def warmup(self) -> int:
+        return 3 * self._slow.period + self._signal.period
+
+    @property
+    def ready(self) -> bool:
+        if self.preloaded:
+            return self._cursor + 1 >= \
+                max(self._slow.period, self._signal.period)
+        return self._slow.ready and self._signal.ready
+
+    @property
+    def signal(self) -> float:
+        if self.preloaded:
+            return self._output("signal")
+        return self._signal.value
+
+    @property
+    def histogram(self) -> float:
+        return self._val - self.signal
+
+    def update(self, x: float) -> float:
+        if self._shared:
+            self._val = self._fast.value - self._slow.value
+        else:
+            self._val = self._fast.update(x) - self._slow.update(x)
+        self._signal.update(self._val)
+        return self._val
+
+    def warm_up(self, bars):
+        if not self._shared:
+            return super().warm_up(bars)
+        # 共享的 EMA 已是最新状态, 用临时 EMA 重放历史以得到 signal
+        fast = ExponentialMovingAverage(self._fast.period)
+        slow = ExponentialMovingAverage(self._slow.period)
+        for bar in bars:
+            x = float(bar.close)
+            self._val = fast.update(x) - slow.update(x)
+            self._signal.update(self._val)
+
+    def get_state(self) -> dict:
+        # 共享 EMA 时预热会用临时 EMA 重放完整历史, 不需要快照
+        if self._shared:
+            return dict()
+        return super().get_state()
+
+    def precompute(self, columns):
+        close = columns["close"]
+        value = vector.ema(close, self._fast.period) - \
+            vector.ema(close, self._slow.period)
+        return dict(value=value, signal=vector.ema(value, self._signal.period))
+
+    def on_bar(self, bar):
+        if self.preloaded and self._advance(bar):
+            self._val = self._output("value")
+            return
+        self.update(float(bar.close))
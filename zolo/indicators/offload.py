@@ -0,0 +1,160 @@
+import logging
+import multiprocessing as mp
+import time
+import uuid
+from datetime import datetime
+from queue import Empty
+from threading import Thread
+from typing import Type, Dict, Callable, List, Optional
+
+from .base import Indicator, IndicatorValue
+from ..consts import INDICATOR_RESULT, OFFLOAD_RING_CAPACITY
+from ..dtypes import Message, Bar
+from ..gateways.shm import ShmRingWriter, ShmRingReader
+
+log = logging.getLogger(__name__)
+
+
+def _result(ind: Indicator):
+    snapshot = getattr(ind, "snapshot", None)
+    return snapshot() if callable(snapshot) else getattr(ind, "value", None)
+
+
+def _run_worker(
+    cls: Type[Indicator], params: dict, ring: str, results: mp.Queue,
+    stop: mp.Event, idle: float
+):
+    ind = cls(**params)
+    reader = ShmRingReader(ring, from_start=True)
+    while not stop.is_set():
+        bar = reader.read()
+        if bar is None:
+            time.sleep(idle)
+            continue
+        try:
+            ind.on_bar(bar)
+        except Exception as e:
+            log.exception(e)
+            continue
+        # lost: 被写者覆盖而没有算到的 bar 数, 随结果带回主进程
+        results.put((
+            bar.timestamp, _result(ind), getattr(ind, "ready", True),
+            reader.lost
+        ))
+    reader.close()
+
+
+# 耗时指标的代理: bar 经共享内存 ring 送到独立进程计算, 结果通过 mp.Queue 返回,
+# 再以 Message 事件投递回 hub, 分派线程不会被阻塞. value/result 为最近一次结果.
+class OffloadedIndicator(IndicatorValue):
+
+    def __init__(
+        self, cls: Type[Indicator], params: dict, idle: float = 0.0005,
+        capacity: int = OFFLOAD_RING_CAPACITY
+    ):
+        self._cls, self._params, self._idle = cls, params, idle
+        # 预热长度由真实指标的参数决定, 在主进程构造一个实例取得
+        self._warmup = cls(**params).warmup
+        self._name = f"zolo_ind_{uuid.uuid4().hex[:12]}"
+        self._ring = ShmRingWriter(self._name, capacity)
+        self._results = mp.Queue()
+        self._stop = mp.Event()
+        self._process: Optional[mp.Process] = None
+        self._collector: Optional[Thread] = None
+        self._val = 0.0
+        self.result = None
+        self.ready = False
+        self.timestamp: Optional[datetime] = None
+        self.lost = 0
+        _workers.append(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def alias(self) -> str:
+        return getattr(self._cls, "alias")
+
+    @property
+    def granularity(self):
+        return self._params.get("granularity")
+
+    @property
+    def period(self):
+        return self._params.get("period", 0)
+
+    @property
+    def instruments(self):
+        return self._params.get("instruments", ())
+
+    @property
+    def warmup(self) -> int:
+        return self._warmup
+
+    def start(self, post: Callable[[Message], None]):
+        if self._process:
+            return
+        self._process = mp.Process(
+            target=_run_worker, daemon=True, args=(
+                self._cls, self._params, self._name, self._results,
+                self._stop, self._idle
+            ))
+        self._process.start()
+        self._collector = Thread(target=self._collect, args=(post,),
+                                 daemon=True)
+        self._collector.start()
+
+    def _collect(self, post: Callable[[Message], None]):
+        while not self._stop.is_set():
+            try:
+                ts, res, ready, lost = self._results.get(timeout=0.5)
+            except Empty:
+                continue
+            post(Message(
+                INDICATOR_RESULT, (self._name, ts, res, ready, lost)
+            ))
+
+    def is_result(self, msg: Message) -> bool:
+        return msg.cmd == INDICATOR_RESULT and msg.payload[0] == self._name
+
+    def on_result(self, msg: Message):
+        _, self.timestamp, self.result, self.ready, lost = msg.payload
+        if lost > self.lost:
+            # 子进程跟不上 bar 的写入速度, 丢失的 bar 不会参与计算
+            log.warning(
+                f"[INDICATOR] {self.alias} {self._name} ring overrun, "
+                f"{lost - self.lost} bars lost, {lost} in total"
+            )
+            self.lost = lost
+        if isinstance(self.result, (int, float)):
+            self._val = float(self.result)
+
+    def on_bar(self, bar: Bar):
+        self._ring.write(bar)
+
+    def warm_up(self, bars: List[Bar]):
+        for bar in bars:
+            self._ring.write(bar)
+
+    def get_state(self) -> dict:
+        # 状态在子进程中, 不做快照
+        return dict()
+
+    def stop(self):
+        self._stop.set()
+        if self._process:
+            self._process.join(5)
+            if self._process.is_alive():
+                self._process.terminate()
+        if self._collector:
+            self._collector.join(5)
+        self._ring.close()
+
+
+_workers: List[OffloadedIndicator] = list()
+
+
+def stop_workers():
+    while _workers:
+        _workers.pop().stop()
@@ -0,0 +1,54 @@
+from .base import Indicator, IndicatorValue, WilderAverage, \
+    Precomputable
+from . import vector
+
+
+class RelativeStrengthIndex(
+    Indicator, IndicatorValue, Precomputable, alias="rsi"
+):
+
+    def __init__(self, period: int = 14, granularity: int = 0):
+        self._period, self._granularity = period, granularity
+        self._gain = WilderAverage(period)
+        self._loss = WilderAverage(period)
+        self._prev: float = None
+        self._val: float = 50.0
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def warmup(self) -> int:
+        return 3 * self._period + 1
+
+    @property
+    def ready(self) -> bool:
+        if self.preloaded:
+            return self._cursor >= self._period
+        return self._gain.ready
+
+    def update(self, x: float) -> float:
+        if self._prev is not None:
+            diff = x - self._prev
+            gain = self._gain.update(max(diff, 0.0))
+            loss = self._loss.update(max(-diff, 0.0))
+            if loss:
+                self._val = 100.0 - 100.0 / (1.0 + gain / loss)
+            else:
+                self._val = 100.0 if gain else 50.0
+        self._prev = x
+        return self._val
+
+    def precompute(self, columns):
+        return dict(value=vector.rsi(columns["close"], self._period))
+
+    def on_bar(self, bar):
+        if self.preloaded and self._advance(bar):
+            self._val = self._output("value")
+            return
+        self.update(float(bar.close))
@@ -1,19 +1,113 @@
+from array import array
+from datetime import timedelta
+from typing import List, Iterable
+
 from .base import Indicator
-from collections import deque
+from ..consts import UNIX_EPOCH
+from ..dtypes import Bar
+
+COLUMNS = (
+    "open", "close", "high", "low", "volume", "currency_volume", "timestamp"
+)
+
+
+class Column:
+    # 环形缓冲区的一列: 每个值写两次(i 与 i + period), 任意窗口在内存中连续,
+    # 切片返回 memoryview, 不复制数据
+
+    def __init__(self, series: "BarSeries", buf: array):
+        self._series, self._buf = series, buf
+
+    def _base(self) -> int:
+        # 最旧的可用数据在 buf 中的位置
+        period, cnt = self._series.period, self._series.count
+        return (cnt - 1) % period + period - len(self) + 1
+
+    def __len__(self):
+        return min(self._series.count, self._series.period)
+
+    def __getitem__(self, item):
+        length = len(self)
+        if isinstance(item, slice):
+            start, stop, step = item.indices(length)
+            if step != 1:
+                raise ValueError("Only contiguous windows are supported")
+            base = self._base()
+            return memoryview(self._buf)[base + start:base + max(start, stop)]
+        if item < 0:
+            item += length
+        if not 0 <= item < length:
+            raise IndexError(item)
+        return self._buf[self._base() + item]
+
+    def __iter__(self) -> Iterable[float]:
+        return iter(self[:])
+
+    def __repr__(self):
+        return f"Column({self[:].tolist()})"
 
 
 class BarSeries(Indicator, alias="series"):
 
     def __init__(self, period: int, granularity: int):
+        assert period > 0
         self._period, self._granularity = period, granularity
-        self._bars = deque(maxlen=period)
-    
+        self._cnt = 0
+        self._bufs = {col: array("d", bytes(16 * period)) for col in COLUMNS}
+        self._last: Bar = None
+
+    @property
+    def count(self) -> int:
+        return self._cnt
+
     @property
-    def bars(self):
-        return list(self._bars)
+    def bars(self) -> List[Bar]:
+        # 兼容旧接口: 由列数据重建 Bar, 最新的在前
+        if not self._last:
+            return []
+        cols = [Column(self, self._bufs[col])[:] for col in COLUMNS]
+        return [
+            Bar(self._last.exchange, self._last.market,
+                self._last.instrument_id, UNIX_EPOCH + timedelta(seconds=ts),
+                o, c, h, l, v, cv, self._last.granularity)
+            for o, c, h, l, v, cv, ts in reversed(list(zip(*cols)))
+        ]
 
     def on_bar(self, bar):
-        self._bars.appendleft(bar)
+        i = self._cnt % self._period
+        values = (
+            bar.open, bar.close, bar.high, bar.low, bar.volume,
+            bar.currency_volume, (bar.timestamp - UNIX_EPOCH).total_seconds()
+        )
+        for col, val in zip(COLUMNS, values):
+            buf = self._bufs[col]
+            buf[i] = buf[i + self._period] = float(val)
+        self._cnt += 1
+        self._last = bar
+
+    @property
+    def opens(self) -> Column:
+        return Column(self, self._bufs["open"])
+
+    @property
+    def closes(self) -> Column:
+        return Column(self, self._bufs["close"])
+
+    @property
+    def highs(self) -> Column:
+        return Column(self, self._bufs["high"])
+
+    @property
+    def lows(self) -> Column:
+        return Column(self, self._bufs["low"])
+
+    @property
+    def volumes(self) -> Column:
+        return Column(self, self._bufs["volume"])
+
+    @property
+    def timestamps(self) -> Column:
+        return Column(self, self._bufs["timestamp"])
 
     @property
     def period(self):
@@ -1,43 +1,41 @@
 import logging
 
+from .base import IndicatorValue, Precomputable
 from .series import BarSeries
+from . import vector
 
 log = logging.getLogger(__name__)
 
 
-class SimpleMovingAverage(BarSeries, alias="sma"):
+class SimpleMovingAverage(
+    BarSeries, IndicatorValue, Precomputable, alias="sma"
+):
     def __init__(self, period: int, granularity: int):
         super().__init__(period, granularity)
         self._val: float = 0.0
-
-    def on_bar(self, bar):
-        super().on_bar(bar)
-        self._val = sum(float(bar.close) for bar in self.bars) / self.period
+        self._sum: float = 0.0
 
     @property
-    def value(self):
-        return self._val
-
-    def __float__(self):
-        return self._val
-
-    def __repr__(self):
-        return str(self._val)
+    def ready(self) -> bool:
+        return self.count >= self._period
 
-    def __eq__(self, other):
-        return self._val == float(other)
+    def precompute(self, columns):
+        return dict(value=vector.window_sum(columns["close"], self.period) /
+                    self.period)
 
-    def __gt__(self, other):
-        return self._val > float(other)
+    def _resume(self, bar, end):
+        # 预计算期间 bar 序列照常更新, 窗口和直接由序列求出
+        self._unload()
+        self._sum = sum(self.closes)
 
-    def __lt__(self, other):
-        return self._val < float(other)
-
-    def __ge__(self, other):
-        return self._val >= float(other)
-
-    def __le__(self, other):
-        return self._val <= float(other)
-
-    def __format__(self, format_spec):
-        return self._val.__format__(format_spec)
+    def on_bar(self, bar):
+        if self.preloaded and self._advance(bar):
+            super().on_bar(bar)
+            self._val = self._output("value")
+            return
+        # 窗口已满时先减去即将被挤出的最旧 bar
+        if self.count >= self._period:
+            self._sum -= self.closes[0]
+        super().on_bar(bar)
+        self._sum += float(bar.close)
+        self._val = self._sum / self.period
@@ -0,0 +1,98 @@
+import logging
+import os
+import pickle
+import time
+from datetime import datetime
+from typing import Dict, Tuple, Set
+
+from .base import Indicator
+from .cache import ind_cache, IndicatorCache
+from ..consts import INDICATOR_SNAPSHOT_INTERVAL, INDICATOR_SNAPSHOT_MAX_AGE
+
+log = logging.getLogger(__name__)
+
+_PATH = ""
+_INTERVAL = INDICATOR_SNAPSHOT_INTERVAL
+_MAX_AGE = INDICATOR_SNAPSHOT_MAX_AGE
+
+
+def config_indicator_store(
+    path: str, interval: float = INDICATOR_SNAPSHOT_INTERVAL,
+    max_age: float = INDICATOR_SNAPSHOT_MAX_AGE
+):
+    global _PATH, _INTERVAL, _MAX_AGE
+    _PATH, _INTERVAL, _MAX_AGE = path, interval, max_age
+    ind_store.load()
+
+
+# 指标状态快照: 定时将缓存中全部指标的内部状态与最后处理的 bar 时间写入本地文件,
+# 重启后在 TradingContext.indicator 中恢复, 之后只需重放快照以后的 bar.
+class IndicatorStore:
+
+    def __init__(self, cache: IndicatorCache):
+        self._cache = cache
+        self._states: Dict[Tuple, dict] = dict()
+        self._restored: Set[int] = set()
+        self._saved_at: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(_PATH)
+
+    def load(self):
+        self._states.clear()
+        if not self.enabled or not os.path.exists(_PATH):
+            return
+        try:
+            with open(_PATH, "rb") as f:
+                res = pickle.load(f)
+        except Exception as e:
+            log.exception(e)
+            return
+        if time.time() - res["saved_at"] > _MAX_AGE:
+            log.warning(f"[INDICATOR] snapshot {_PATH} is outdated, ignore")
+            return
+        self._states = res["states"]
+        log.info(f"[INDICATOR] load {len(self._states)} states from {_PATH}")
+
+    def restore(self, ind: Indicator) -> bool:
+        # 依赖的子指标先恢复
+        for dep in self._cache.dependencies(ind):
+            self.restore(dep)
+        if id(ind) in self._restored:
+            return True
+        res = self._states.get(self._cache.key_of(ind))
+        if not res or not res["state"]:
+            return False
+        ind.set_state(res["state"])
+        self._cache.set_last_ts(ind, res["last_ts"])
+        self._restored.add(id(ind))
+        return True
+
+    def save(self):
+        if not self.enabled:
+            return
+        states = {
+            key: dict(state=ind.get_state(), last_ts=self._cache.last_ts(ind))
+            for key, ind in self._cache.items()
+        }
+        payload = pickle.dumps(
+            dict(saved_at=time.time(), states=states), pickle.HIGHEST_PROTOCOL
+        )
+        # 先写临时文件再替换, 避免进程中断留下损坏的快照
+        tmp = f"{_PATH}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, _PATH)
+        self._saved_at = time.monotonic()
+
+    def on_timer(self, ts: datetime):
+        if time.monotonic() - self._saved_at < _INTERVAL:
+            return
+        try:
+            self.save()
+        except Exception as e:
+            log.exception(e)
+
+
+ind_store: IndicatorStore = IndicatorStore(ind_cache)
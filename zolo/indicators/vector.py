@@ -0,0 +1,125 @@
+from typing import Dict, Iterable, Tuple, List
+
+from ..consts import VECTOR_WINDOW_CHUNK
+from ..dtypes import Bar
+
+# numpy/scipy 只在回测预计算时需要: pip install zolo[backtest]
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# scipy 可选, 没有时 smooth 退回逐个迭代
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+
+def bar_key(exchange: str, market: str, instrument_id: str,
+            granularity: int) -> Tuple[str, str, str, int]:
+    return exchange.lower(), market.lower(), instrument_id.lower(), \
+        int(granularity)
+
+
+def bar_columns(bars: Iterable[Bar]) -> Dict[Tuple, Dict[str, object]]:
+    # 按 (exchange, market, instrument_id, granularity) 拆分为列
+    if np is None:
+        raise ImportError(
+            "numpy is required to precompute indicators, "
+            "install zolo[backtest]"
+        )
+    rows = dict()
+    for bar in bars:
+        key = bar_key(bar.exchange, bar.market, bar.instrument_id,
+                      bar.granularity)
+        rows.setdefault(key, list()).append(bar)
+    res = dict()
+    for key, items in rows.items():
+        res[key] = dict(
+            timestamp=[bar.timestamp for bar in items],
+            **{
+                col: np.array([float(getattr(bar, col)) for bar in items])
+                for col in ("open", "close", "high", "low", "volume")
+            }
+        )
+    return res
+
+
+def rolling(x, period: int, reduce):
+    # 逐个窗口直接归约, 不用累计和相减: 长序列/高价位时累计和会丢失精度.
+    # 前 period - 1 个值取已有的部分窗口, 与流式计算的预热阶段一致
+    x = np.asarray(x, dtype=float)
+    res = np.empty_like(x)
+    head = min(period - 1, len(x))
+    for i in range(head):
+        res[i] = reduce(x[:i + 1], axis=-1)
+    if len(x) < period:
+        return res
+    view = np.lib.stride_tricks.sliding_window_view(x, period)
+    step = max(VECTOR_WINDOW_CHUNK // period, 1)
+    for i in range(0, len(view), step):
+        res[head + i:head + i + step] = reduce(view[i:i + step], axis=-1)
+    return res
+
+
+def window_sum(x, period: int):
+    return rolling(x, period, np.sum)
+
+
+def smooth(x, period: int, alpha: float):
+    # 前 period 个值取累计均值作种子, 之后 y = y + alpha * (x - y)
+    x = np.asarray(x, dtype=float)
+    res = np.empty_like(x)
+    head = min(period, len(x))
+    res[:head] = np.cumsum(x[:head]) / np.arange(1, head + 1)
+    if len(x) <= period:
+        return res
+    if lfilter:
+        res[period:], _ = lfilter(
+            [alpha], [1.0, alpha - 1.0], x[period:],
+            zi=[(1.0 - alpha) * res[period - 1]]
+        )
+        return res
+    val, tail = res[period - 1], list()
+    for v in x[period:].tolist():
+        val += alpha * (v - val)
+        tail.append(val)
+    res[period:] = tail
+    return res
+
+
+def ema(x, period: int):
+    return smooth(x, period, 2.0 / (period + 1))
+
+
+def wilder(x, period: int):
+    return smooth(x, period, 1.0 / period)
+
+
+def true_range(high, low, close):
+    res = high - low
+    if len(res) > 1:
+        prev = close[:-1]
+        res[1:] = np.maximum(
+            res[1:], np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev))
+        )
+    return res
+
+
+def rsi(close, period: int):
+    res = np.full(len(close), 50.0)
+    if len(close) < 2:
+        return res
+    diff = np.diff(close)
+    gain = wilder(np.maximum(diff, 0.0), period)
+    loss = wilder(np.maximum(-diff, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        val = 100.0 - 100.0 / (1.0 + gain / loss)
+    res[1:] = np.where(loss > 0, val, np.where(gain > 0, 100.0, 50.0))
+    return res
+
+
+def rolling_std(x, period: int):
+    return rolling(x, period, np.mean), rolling(x, period, np.std)
+
@@ -0,0 +1,200 @@
+import math
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Tuple, Optional, List
+
+from .base import Indicator, IndicatorValue
+from ..consts import UNIX_EPOCH, VOLUME_EPSILON
+
+
+def typical_price(bar) -> float:
+    return (float(bar.high) + float(bar.low) + float(bar.close)) / 3
+
+
+class SessionVWAP(Indicator, IndicatorValue, alias="vwap"):
+    # 按交易时段(默认 UTC 自然日)累计, 新时段开始时清零
+
+    def __init__(
+        self, granularity: int, session_hours: int = 24, offset_hours: int = 0
+    ):
+        assert session_hours > 0
+        self._granularity = granularity
+        self._session = session_hours * 3600
+        self._offset = offset_hours * 3600
+        self._key: Optional[int] = None
+        self._pv, self._volume = 0.0, 0.0
+        self._val: float = 0.0
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @property
+    def warmup(self) -> int:
+        # 一个时段的 bar 数(granularity 以分钟计), 重启后补齐当前时段
+        if not self._granularity:
+            return 0
+        return self._session // (self._granularity * 60)
+
+    def session_of(self, ts: datetime) -> int:
+        return int(((ts - UNIX_EPOCH).total_seconds() - self._offset)
+                   // self._session)
+
+    def on_bar(self, bar):
+        key = self.session_of(bar.timestamp)
+        if key != self._key:
+            self._key, self._pv, self._volume = key, 0.0, 0.0
+        volume = float(bar.volume)
+        self._pv += typical_price(bar) * volume
+        self._volume += volume
+        if self._volume:
+            self._val = self._pv / self._volume
+
+
+class AnchoredVWAP(Indicator, IndicatorValue, alias="avwap"):
+    # 从锚点(如突破/开仓时刻)开始累计, 可随时重新锚定
+
+    def __init__(self, granularity: int, anchor: datetime = UNIX_EPOCH):
+        self._granularity = granularity
+        self._anchor = anchor
+        self._pv, self._volume = 0.0, 0.0
+        self._val: float = 0.0
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def anchor(self) -> datetime:
+        return self._anchor
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @property
+    def warmup(self) -> int:
+        # 锚点至今的 bar 数; 未锚定(UNIX_EPOCH)时无法预热, 需从锚点回放
+        if not self._granularity or self._anchor == UNIX_EPOCH:
+            return 0
+        minutes = (datetime.utcnow() - self._anchor).total_seconds() / 60
+        return max(int(minutes // self._granularity) + 1, 0)
+
+    def reanchor(self, anchor: datetime):
+        self._anchor = anchor
+        self._pv, self._volume, self._val = 0.0, 0.0, 0.0
+
+    def on_bar(self, bar):
+        if bar.timestamp < self._anchor:
+            return
+        volume = float(bar.volume)
+        self._pv += typical_price(bar) * volume
+        self._volume += volume
+        if self._volume:
+            self._val = self._pv / self._volume
+
+
+class VolumeProfile(Indicator, alias="vprofile"):
+    # 最近 period 根 bar 的成交量按 tick_size 分桶, 桶为定长数组;
+    # 价格超出范围时以当前价格为中心重建. poc/value area 按需计算.
+
+    def __init__(
+        self, period: int, granularity: int, tick_size: float,
+        buckets: int = 1024, value_area: float = 0.7
+    ):
+        assert tick_size > 0 and buckets > 0 and 0 < value_area <= 1
+        self._granularity, self._period = granularity, period
+        self._tick_size, self._size = tick_size, buckets
+        self._value_area = value_area
+        self._hist = array("d", bytes(8 * buckets))
+        self._base: Optional[int] = None
+        self._window = deque()
+        self._total = 0.0
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    @property
+    def ready(self) -> bool:
+        return len(self._window) == self._period
+
+    def bucket_of(self, price: float) -> int:
+        return int(math.floor(price / self._tick_size))
+
+    def price_of(self, idx: int) -> float:
+        return (self._base + idx) * self._tick_size
+
+    def _recenter(self, bucket: int):
+        self._base = bucket - self._size // 2
+        self._hist = array("d", bytes(8 * self._size))
+        self._total = 0.0
+        for b, volume in self._window:
+            self._put(b, volume)
+
+    def _put(self, bucket: int, volume: float):
+        idx = bucket - self._base
+        if 0 <= idx < self._size:
+            self._hist[idx] += volume
+            self._total += volume
+            if volume < 0 and self._hist[idx] < VOLUME_EPSILON:
+                self._hist[idx] = 0.0
+            if self._total < VOLUME_EPSILON:
+                self._total = 0.0
+
+    def on_bar(self, bar):
+        bucket, volume = self.bucket_of(typical_price(bar)), float(bar.volume)
+        if len(self._window) == self._period:
+            b, v = self._window.popleft()
+            self._put(b, -v)
+        self._window.append((bucket, volume))
+        if self._base is None or not 0 <= bucket - self._base < self._size:
+            self._recenter(bucket)
+        else:
+            self._put(bucket, volume)
+
+    def histogram(self) -> List[Tuple[float, float]]:
+        return [
+            (self.price_of(i), v) for i, v in enumerate(self._hist) if v > 0
+        ]
+
+    def _poc_idx(self) -> int:
+        return max(range(self._size), key=self._hist.__getitem__)
+
+    @property
+    def poc(self) -> float:
+        # point of control: 成交量最大的价格桶
+        if not self._total:
+            return 0.0
+        return self.price_of(self._poc_idx())
+
+    def value_area(self) -> Tuple[float, float]:
+        # 自 poc 向两侧扩展, 每次并入成交量较大的一侧, 直到覆盖 value_area
+        if not self._total:
+            return 0.0, 0.0
+        hist, target = self._hist, self._total * self._value_area
+        low = high = self._poc_idx()
+        acc = hist[low]
+        while acc < target and (low > 0 or high < self._size - 1):
+            down = hist[low - 1] if low > 0 else -1.0
+            up = hist[high + 1] if high < self._size - 1 else -1.0
+            if up >= down:
+                high += 1
+                acc += up
+            else:
+                low -= 1
+                acc += down
+        return self.price_of(low), self.price_of(high + 1)
@@ -0,0 +1,155 @@
+import logging
+import threading
+from collections import defaultdict
+from time import perf_counter
+from typing import Dict, Type, Callable
+
+from .dtypes import Evt, SinkWrapper
+
+log = logging.getLogger(__name__)
+
+# log2 微秒分桶: [0, 1us), [1us, 2us), [2us, 4us) ... [2^22us, inf)
+HISTOGRAM_BUCKETS = 24
+
+
+def sink_name(on_evt: Callable) -> str:
+    name = getattr(on_evt, "__qualname__", None) or repr(on_evt)
+    owner = getattr(on_evt, "__self__", None)
+    if owner is not None:
+        return f"{name}@{id(owner):x}"
+    return name
+
+
+class Histogram:
+    def __init__(self, size: int = HISTOGRAM_BUCKETS):
+        self._buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        idx = int(seconds * 1000000).bit_length()
+        if idx >= len(self._buckets):
+            idx = len(self._buckets) - 1
+        self._buckets[idx] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        # 返回所在桶的上界(秒), 精度为2倍
+        if not self.count:
+            return 0.0
+        rank, acc = q * self.count, 0
+        for idx, cnt in enumerate(self._buckets):
+            acc += cnt
+            if acc >= rank:
+                return (1 << idx) / 1000000
+        return self.max
+
+    def snapshot(self) -> dict:
+        return dict(
+            count=self.count,
+            total=self.total,
+            mean=self.mean,
+            p50=self.percentile(0.5),
+            p99=self.percentile(0.99),
+            max=self.max,
+            buckets=list(self._buckets),
+        )
+
+
+# keyed dispatch 时 on_event/on_sink 来自多个 worker 线程, 统计的读写都加锁
+class EventStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._enabled = False
+        self._begin = perf_counter()
+        self._events: Dict[str, int] = defaultdict(int)
+        self._waits: Dict[str, Histogram] = defaultdict(Histogram)
+        self._sinks: Dict[int, Histogram] = dict()
+        self._sink_names: Dict[int, str] = dict()
+        self._depth = 0
+        self._max_depth = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self):
+        if not self._enabled:
+            self.reset()
+            self._enabled = True
+
+    def disable(self):
+        self._enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._begin = perf_counter()
+            self._events = defaultdict(int)
+            self._waits = defaultdict(Histogram)
+            self._sinks = dict()
+            self._sink_names = dict()
+            self._depth = 0
+            self._max_depth = 0
+
+    def on_dequeue(self, evt: Evt, wait: float, depth: int):
+        with self._lock:
+            self._waits[type(evt).__name__].add(wait)
+            self._depth = depth
+            if depth > self._max_depth:
+                self._max_depth = depth
+
+    def on_event(self, evt_type: Type[Evt]):
+        with self._lock:
+            self._events[evt_type.__name__] += 1
+
+    def on_sink(self, evt_type: Type[Evt], sink: SinkWrapper, elapsed: float):
+        key = id(sink)
+        with self._lock:
+            hist = self._sinks.get(key)
+            if hist is None:
+                hist = self._sinks[key] = Histogram()
+                self._sink_names[key] = \
+                    f"{evt_type.__name__}:{sink_name(sink.on_evt)}"
+            hist.add(elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        elapsed = perf_counter() - self._begin
+        events = {
+            name: dict(
+                count=cnt,
+                rate=cnt / elapsed if elapsed else 0.0,
+                wait=self._waits[name].snapshot() if name in self._waits
+                else None,
+            )
+            for name, cnt in self._events.items()
+        }
+        sinks = sorted(
+            (
+                dict(name=self._sink_names[key], **hist.snapshot())
+                for key, hist in self._sinks.items()
+            ),
+            key=lambda s: s["total"],
+            reverse=True,
+        )
+        return dict(
+            enabled=self._enabled,
+            elapsed=elapsed,
+            events=events,
+            sinks=sinks,
+            queue=dict(depth=self._depth, max_depth=self._max_depth),
+        )
+
+
+evt_stats: EventStats = EventStats()
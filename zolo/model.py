@@ -39,6 +39,7 @@ HistoryBar = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("exchange", String(32)),
+    Column("market", String(32)),
     Column("instrument_id", String(32)),
     Column("timestamp", DateTime),
     Column("open", DECIMAL(20, 7)),
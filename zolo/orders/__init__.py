@@ -5,4 +5,4 @@ from .exe import (
     PeriodicExecutor,
 )
 from .pool import OrderPool
-
+from .aggregate import OrderAggregator, order_aggregator
@@ -0,0 +1,213 @@
+import logging
+from collections import OrderedDict
+from dataclasses import replace, fields
+from datetime import datetime
+from typing import Dict, List, Tuple, Callable, Optional
+from uuid import uuid4
+
+from ..adapters import Adapter
+from ..consts import UNIX_EPOCH, ORDER_AGGREGATE_WINDOW, \
+    ORDER_AGGREGATE_HISTORY
+from ..dtypes import Order, OrderStatus, Lot, Size, Timer, by_size, by_lot
+from ..posts import OrderPost, MarketOrder, LimitIocOrder, OpponentIocOrder, \
+    OptimalIocOrder
+from ..utils import pro_rata, BYPASS_FILTER
+
+log = logging.getLogger(__name__)
+
+# (api_key, instrument_id, side, order_type)
+BatchKey = Tuple[str, str, str, str]
+
+# 只合并立即成交类订单: 挂单需要按原订单各自超时/撤单, 合并后无法撤销其中一笔;
+# FOK 合并后整体成交或整体撤销, 会改变单笔订单的语义
+AGGREGATE_ORDER_TYPES = (
+    MarketOrder, LimitIocOrder, OpponentIocOrder, OptimalIocOrder
+)
+
+
+class _Entry:
+    __slots__ = ("client_oid", "post", "qty", "on_order", "ts")
+
+    def __init__(self, client_oid: str, post: OrderPost, qty: float,
+                 on_order: Optional[Callable], ts: datetime):
+        self.client_oid = client_oid
+        self.post = post
+        self.qty = qty
+        self.on_order = on_order
+        self.ts = ts
+
+
+class _Batch:
+    def __init__(self, adapter: Adapter, ts: datetime):
+        self.adapter = adapter
+        self.opened_at = ts
+        self.entries: List[_Entry] = list()
+
+
+class OrderAggregator:
+    # 同一 key/品种/方向/类型的订单在窗口内合并: 除数量外相同的订单合成一笔,
+    # 其余作为一次批量请求提交; 成交按各自数量比例分配回原订单
+
+    def __init__(self, window: float = ORDER_AGGREGATE_WINDOW):
+        self._window = window
+        self._batches: Dict[BatchKey, _Batch] = dict()
+        # 已提交的合并订单: 交易所 client_oid -> (adapter, 原始订单)
+        self._submitted: Dict[str, Tuple[Adapter, List[_Entry]]] = dict()
+        self._orders: Dict[str, Order] = dict()
+        # 已完成的原始订单只保留最近的一部分供查询
+        self._finished: Dict[str, Order] = OrderedDict()
+        # 外发订单的交易所回报由原始订单代替, 同样只保留最近的一部分
+        self._routed: Dict[str, None] = OrderedDict()
+        self._attached = False
+
+    def config(self, window: float):
+        self._window = window
+
+    @staticmethod
+    def accepts(post: OrderPost) -> bool:
+        return type(post) in AGGREGATE_ORDER_TYPES
+
+    def attach(self, hub):
+        # 所有聚合 context 共用一个 Timer sink, 每个外发订单每次只查询一次
+        if not self._attached:
+            hub.attach_sink(Timer, BYPASS_FILTER, self.refresh)
+            self._attached = True
+
+    @staticmethod
+    def batch_key(adapter: Adapter, post: OrderPost) -> BatchKey:
+        return adapter.credential.api_key, post.instrument_id, post.side, \
+            post.order_type
+
+    def submit(
+        self, adapter: Adapter, post: OrderPost, ts: datetime,
+        on_order: Callable = None
+    ) -> Order:
+        assert self.accepts(post), f"{type(post).__name__} can't be aggregated"
+        key = self.batch_key(adapter, post)
+        if key not in self._batches:
+            self._batches[key] = _Batch(adapter, ts)
+        client_oid = uuid4().hex
+        qty = adapter.estimate_lot(post.instrument_id, post.qty) \
+            if by_size(post.qty) else post.qty
+        self._batches[key].entries.append(
+            _Entry(client_oid, post, qty, on_order, ts)
+        )
+        res = self._orders[client_oid] = Order(
+            exchange=post.exchange, market=post.market, side=post.side,
+            pos_side=post.pos_side, qty=post.qty,
+            instrument_id=post.instrument_id, client_oid=client_oid,
+            order_type=post.order_type, leverage=0, created_at=ts,
+            state=OrderStatus.PREPARING, account=adapter.credential.api_key,
+        )
+        return res
+
+    @staticmethod
+    def _merge(
+        entries: List[_Entry]
+    ) -> List[Tuple[OrderPost, List[_Entry]]]:
+        # 除 qty 外字段完全相同的订单(如同价 IOC 限价单)合成一笔
+        groups: Dict[tuple, List[_Entry]] = dict()
+        for entry in entries:
+            post = entry.post
+            key = (type(post),) + tuple(
+                getattr(post, f.name) for f in fields(post) if f.name != "qty"
+            )
+            groups.setdefault(key, list()).append(entry)
+        res = list()
+        for items in groups.values():
+            qty = sum(entry.qty for entry in items)
+            if all(by_size(entry.post.qty) for entry in items):
+                qty = Size(sum(entry.post.qty for entry in items))
+            elif all(by_lot(entry.qty) for entry in items):
+                qty = Lot(qty)
+            res.append((replace(items[0].post, qty=qty), items))
+        return res
+
+    def flush(self, ts: datetime):
+        for key in list(self._batches):
+            batch = self._batches[key]
+            if (ts - batch.opened_at).total_seconds() < self._window:
+                continue
+            del self._batches[key]
+            merged = self._merge(batch.entries)
+            try:
+                oids = batch.adapter.create_orders(
+                    [post for post, _ in merged]
+                )
+            except Exception as e:
+                log.exception(e)
+                for _, items in merged:
+                    self._allocate(items, None)
+                continue
+            for oid, (_, items) in zip(oids, merged):
+                if not oid:
+                    self._allocate(items, None)
+                    continue
+                self._submitted[oid] = (batch.adapter, items)
+                self._routed[oid] = None
+                while len(self._routed) > ORDER_AGGREGATE_HISTORY:
+                    self._routed.popitem(last=False)
+
+    def poll(self, ts: datetime):
+        for oid in list(self._submitted):
+            adapter, items = self._submitted[oid]
+            try:
+                res = adapter.get_order_by_client_oid(
+                    items[0].post.instrument_id, oid
+                )
+            except Exception as e:
+                log.exception(e)
+                continue
+            if res.done:
+                del self._submitted[oid]
+                self._allocate(items, res)
+
+    def refresh(self, ts: datetime):
+        self.flush(ts)
+        self.poll(ts)
+
+    def _allocate(self, items: List[_Entry], res: Optional[Order]):
+        weights = [entry.qty for entry in items]
+        filled = res.filled if res else 0
+        integral = all(float(w).is_integer() for w in weights) and \
+            float(filled).is_integer()
+        qty = pro_rata(filled, weights, integral)
+        fees = pro_rata(res.fee if res else 0, qty)
+        for entry, q, fee in zip(items, qty, fees):
+            if q >= entry.qty:
+                state = OrderStatus.FULFILLED
+            elif q:
+                state = OrderStatus.PARTIAL_FILED_OTHER_CANCELED
+            else:
+                state = res.state if res else OrderStatus.FAIL
+            order = replace(
+                self._orders.pop(entry.client_oid),
+                qty=q, filled=q, fee=fee, state=state,
+                price=res.price if res else 0,
+                leverage=res.leverage if res else 0,
+                finished_at=res.finished_at if res else UNIX_EPOCH,
+                order_id=res.client_oid if res else "",
+            )
+            self._finished[entry.client_oid] = order
+            while len(self._finished) > ORDER_AGGREGATE_HISTORY:
+                self._finished.popitem(last=False)
+            if entry.on_order and q:
+                entry.on_order(order)
+
+    def is_aggregated(self, client_oid: str) -> bool:
+        return client_oid in self._orders or client_oid in self._finished
+
+    def is_routed(self, client_oid: str) -> bool:
+        # 合并后实际发往交易所的订单
+        return client_oid in self._routed
+
+    def get_order(self, client_oid: str) -> Optional[Order]:
+        return self._orders.get(client_oid) or self._finished.get(client_oid)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(b.entries) for b in self._batches.values()) + \
+            sum(len(items) for _, items in self._submitted.values())
+
+
+order_aggregator = OrderAggregator()
@@ -1,12 +1,38 @@
 import abc
 from contextlib import contextmanager
-from typing import List, Type, Dict, Callable
+from threading import Lock, RLock, local
+from time import perf_counter
+from typing import List, Type, Dict, Callable, Tuple
+from weakref import WeakKeyDictionary
 from .dtypes import SinkWrapper, Message
 import logging
 from .dtypes import Evt, Tick, Bar, Fill, Order, Timer, Trade
+from .metrics import evt_stats
 
 log = logging.getLogger(__name__)
 
+# 锁随 owner 回收; 不能弱引用或不可哈希的 owner 按 id 记录并持有其引用,
+# 避免 owner 回收后 id 被新对象复用而继承旧锁
+_owner_locks: "WeakKeyDictionary[object, RLock]" = WeakKeyDictionary()
+_pinned_locks: Dict[int, Tuple[object, RLock]] = dict()
+_owner_guard = Lock()
+
+
+def owner_lock(on_evt: Callable) -> RLock:
+    # 绑定方法按实例(如同一策略的 on_tick/on_bar)共用一把锁, 其余按函数本身
+    owner = getattr(on_evt, "__self__", on_evt)
+    with _owner_guard:
+        try:
+            res = _owner_locks.get(owner)
+            if res is None:
+                res = _owner_locks[owner] = RLock()
+            return res
+        except TypeError:
+            pass
+        if id(owner) not in _pinned_locks:
+            _pinned_locks[id(owner)] = (owner, RLock())
+        return _pinned_locks[id(owner)][1]
+
 
 class PipelineRegistry:
     registry: Dict[Type[Evt], "Pipeline"] = dict()
@@ -23,9 +49,13 @@ class PipelineRegistry:
 
 
 class Pipeline(abc.ABC):
+    # 多线程分派(KeyedDispatcher)时为 True: 同一实例的 sink 不会并发执行
+    serialize: bool = False
+
     def __init__(self):
-        self._busy = False
+        self._local = local()
         self._sinks: List[SinkWrapper] = list()
+        self._locks: List[RLock] = list()
 
     def __init_subclass__(cls, evt_type: Type[Evt] = None, **kwargs):
         setattr(cls, "_evt_type", evt_type)
@@ -41,26 +71,50 @@ class Pipeline(abc.ABC):
 
     @property
     def busy(self):
-        return self._busy
+        # 按线程记录, 并行分派时各 worker 互不影响
+        return getattr(self._local, "busy", False)
 
     @contextmanager
     def bypass_incoming_events(self):
-        self._busy = True
+        self._local.busy = True
         try:
             yield
         except Exception as e:
             log.exception(e)
             raise e
         finally:
-            self._busy = False
+            self._local.busy = False
 
     def demux(self, evt):
+        if evt_stats.enabled:
+            return self._demux_with_stats(evt)
+        if self.serialize:
+            return self._demux_serialized(evt)
         for sink in self._sinks:
             if sink.filter(evt):
                 sink.on_evt(evt)
 
+    def _demux_serialized(self, evt):
+        for sink, lock in zip(self._sinks, self._locks):
+            if sink.filter(evt):
+                with lock:
+                    sink.on_evt(evt)
+
+    def _demux_with_stats(self, evt):
+        evt_stats.on_event(self.evt_type)
+        for sink, lock in zip(self._sinks, self._locks):
+            if sink.filter(evt):
+                begin = perf_counter()
+                if self.serialize:
+                    with lock:
+                        sink.on_evt(evt)
+                else:
+                    sink.on_evt(evt)
+                evt_stats.on_sink(self.evt_type, sink, perf_counter() - begin)
+
     def attach_sink(self, flt: Callable, on_evt: Callable):
         self._sinks.append(SinkWrapper(flt, on_evt))
+        self._locks.append(owner_lock(on_evt))
 
     def __repr__(self):
         return f"{self.__class__.__name__}"
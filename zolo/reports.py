@@ -0,0 +1,327 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, type_coerce, Float
+
+from .consts import CLOSE, LONG, BENCHMARK_PERIODS_PER_YEAR
+from .db import db_engine
+from .model import AccountJournal, TradeJournal
+
+# 运行结束后的绩效报告: 日志表一次查询载入为列, 全部统计用 numpy 向量化计算
+
+ACCOUNT_COLUMNS = (
+    "timestamp", "instrument_id", "currency", "margin_balance",
+    "wallet_balance", "pos_qty", "home_notional", "realised_pnl",
+    "unrealised_pnl",
+)
+TRADE_COLUMNS = (
+    "close_ts", "instrument_id", "status", "pos_side", "pnl", "commission",
+    "position",
+)
+_TEXT_COLUMNS = ("instrument_id", "currency", "status", "pos_side")
+
+
+# numpy 只在生成报告时需要: pip install zolo[backtest]
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "numpy is required to build reports, install zolo[backtest]"
+        )
+
+
+def _select(tbl, names: tuple, ts_name: str):
+    # 数值列按 Float 取回, 跳过逐行 Decimal 转换
+    return select([
+        getattr(tbl, name) if name == ts_name or name in _TEXT_COLUMNS
+        else type_coerce(getattr(tbl, name), Float).label(name)
+        for name in names
+    ])
+
+
+def _factorize(values) -> Tuple[list, object]:
+    # 字符串列编码为整数, 比 np.unique 在 object 数组上排序快得多
+    lookup = dict()
+    codes = np.fromiter(
+        (lookup.setdefault(v, len(lookup)) for v in values),
+        dtype=np.int64, count=len(values)
+    )
+    return list(lookup), codes
+
+
+def _columns(rows: list, names: tuple, ts_name: str) -> Dict[str, object]:
+    _require_numpy()
+    cols = list(zip(*rows)) if rows else [()] * len(names)
+    res = dict()
+    for name, col in zip(names, cols):
+        if name == ts_name:
+            res[name] = np.array(col, dtype="datetime64[us]")
+        elif name in _TEXT_COLUMNS:
+            res[name] = np.array(col, dtype=object)
+        else:
+            res[name] = np.array(
+                [v if v is not None else 0 for v in col], dtype=float
+            )
+    return res
+
+
+def _between(query, column, start: Optional[datetime],
+             end: Optional[datetime]):
+    if start:
+        query = query.where(column >= start)
+    if end:
+        query = query.where(column <= end)
+    return query
+
+
+def load_account_columns(
+    uid: str, start: datetime = None, end: datetime = None,
+    currency: str = None
+) -> Dict[str, object]:
+    tbl = AccountJournal.c
+    query = _between(
+        _select(tbl, ACCOUNT_COLUMNS, "timestamp").where(tbl.uid == uid),
+        tbl.timestamp, start, end
+    ).order_by(tbl.timestamp)
+    if currency:
+        query = query.where(tbl.currency == currency)
+    with db_engine().connect() as c:
+        rows = c.execute(query).fetchall()
+    return _columns(rows, ACCOUNT_COLUMNS, "timestamp")
+
+
+def load_trade_columns(
+    uid: str, start: datetime = None, end: datetime = None
+) -> Dict[str, object]:
+    tbl = TradeJournal.c
+    query = _between(
+        _select(tbl, TRADE_COLUMNS, "close_ts").where(tbl.uid == uid),
+        tbl.close_ts, start, end
+    ).order_by(tbl.close_ts)
+    with db_engine().connect() as c:
+        rows = c.execute(query).fetchall()
+    return _columns(rows, TRADE_COLUMNS, "close_ts")
+
+
+def split_currency(account: Dict[str, object]) -> Dict[str, dict]:
+    # 币本位各品种的保证金以各自的币计价, 不能直接相加, 按币种拆开后分别统计
+    names, codes = _factorize(account.get("currency", ()))
+    return {
+        name: {k: v[codes == i] for k, v in account.items()}
+        for i, name in enumerate(names)
+    }
+
+
+def _check_currency(account: Dict[str, object]):
+    currency = account.get("currency")
+    if currency is not None and len(set(currency.tolist())) > 1:
+        raise ValueError(
+            "account columns mix several margin currencies, "
+            "build one report per currency with split_currency()"
+        )
+
+
+class _Portfolio:
+    # 各品种最近一次上报值之和: 每条记录只贡献相对本品种上一条记录的变化量,
+    # 按时间累加即得每一行的组合值, 不展开 (记录, 品种) 矩阵, 内存 O(记录数)
+
+    def __init__(self, account: Dict[str, object]):
+        _check_currency(account)
+        _, codes = _factorize(account["instrument_id"])
+        # 按品种分组(组内保持时间顺序), first 标记每个品种的第一条记录
+        self._order = np.argsort(codes, kind="stable")
+        grouped = codes[self._order]
+        self._first = np.append(True, grouped[1:] != grouped[:-1])
+        reported = np.empty_like(self._first)
+        reported[self._order] = self._first
+        ts = account["timestamp"]
+        # 所有品种都上报过之后才开始统计, 否则未上报的品种按 0 计入组合;
+        # 同一时间戳只保留最后一条
+        started = np.cumsum(reported) == self._first.sum()
+        self.keep = started & np.append(ts[1:] != ts[:-1], True)
+        self.ts = ts[self.keep]
+
+    def sum(self, values):
+        grouped = np.asarray(values, dtype=float)[self._order]
+        delta = np.diff(grouped, prepend=0.0)
+        delta[self._first] = grouped[self._first]
+        res = np.empty_like(delta)
+        res[self._order] = delta
+        return np.cumsum(res)[self.keep]
+
+
+def equity_curve(account: Dict[str, object], portfolio: _Portfolio = None):
+    # 每个品种各自记录保证金余额, 组合权益为各品种最近一次余额之和
+    ts = account["timestamp"]
+    if not len(ts):
+        return ts, np.zeros(0)
+    portfolio = portfolio or _Portfolio(account)
+    return portfolio.ts, portfolio.sum(account["margin_balance"])
+
+
+def drawdown_stats(ts, equity) -> dict:
+    if not len(equity):
+        return dict(max_drawdown=0.0, max_duration=0.0, under_water=0.0)
+    peak = np.maximum.accumulate(equity)
+    dd = 1 - equity / np.where(peak > 0, peak, 1)
+    rows = np.arange(len(equity))
+    peak_idx = np.maximum.accumulate(np.where(equity >= peak, rows, 0))
+    seconds = (ts - ts[0]) / np.timedelta64(1, "s")
+    gaps = np.diff(seconds)
+    return dict(
+        max_drawdown=float(dd.max()),
+        max_drawdown_ts=ts[int(dd.argmax())].astype(datetime),
+        max_duration=float((seconds - seconds[peak_idx]).max()),
+        under_water=float(gaps[dd[:-1] > 0].sum()),
+        drawdown=dd,
+    )
+
+
+def daily_returns(ts, equity):
+    if not len(ts):
+        return ts.astype("datetime64[D]"), np.zeros(0)
+    days = ts.astype("datetime64[D]")
+    last = np.append(days[1:] != days[:-1], True)
+    days, closes = days[last], equity[last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(closes[:-1] > 0, closes[1:] / closes[:-1] - 1, 0)
+    return days[1:], ret
+
+
+def return_stats(
+    ts, equity, periods: int = BENCHMARK_PERIODS_PER_YEAR
+) -> dict:
+    _, ret = daily_returns(ts, equity)
+    std = ret.std(ddof=1) if len(ret) > 1 else 0.0
+    down = np.sqrt(np.mean(np.minimum(ret, 0) ** 2)) if len(ret) else 0.0
+    mean = ret.mean() if len(ret) else 0.0
+    total = equity[-1] / equity[0] - 1 if len(equity) and equity[0] else 0.0
+    return dict(
+        total_return=float(total),
+        daily_mean=float(mean),
+        daily_std=float(std),
+        sharp=float(mean / std * np.sqrt(periods)) if std else 0.0,
+        sortino=float(mean / down * np.sqrt(periods)) if down else 0.0,
+        daily_returns=ret,
+    )
+
+
+def exposure_stats(
+    account: Dict[str, object], equity, portfolio: _Portfolio = None
+) -> dict:
+    # equity 为 equity_curve 的结果, 与组合的时间轴一一对应
+    ts = account["timestamp"]
+    if len(ts) < 2:
+        return dict(exposure=0.0, time_in_market=0.0, turnover=0.0)
+    portfolio = portfolio or _Portfolio(account)
+    _, codes = _factorize(account["instrument_id"])
+    notional = np.abs(account["home_notional"])
+    # 按品种分组后按时间排序, 同一品种相邻记录之间的持仓变化计为换手
+    order = np.lexsort((ts, codes))
+    same = codes[order][1:] == codes[order][:-1]
+    traded = np.abs(np.diff(notional[order]))[same].sum()
+    traded += notional[order][np.append(True, ~same)].sum()
+    mean_equity = equity.mean() if len(equity) else 0
+    turnover = float(traded / mean_equity) if mean_equity else 0.0
+    # 各品种的持仓沿用到自己的下一条记录, 组合敞口为各品种之和
+    ts = portfolio.ts
+    if len(ts) < 2:
+        return dict(exposure=0.0, time_in_market=0.0, turnover=turnover)
+    held = portfolio.sum(notional)
+    holding = portfolio.sum(account["pos_qty"] != 0)[:-1] > 0.5
+    seconds = (ts - ts[0]) / np.timedelta64(1, "s")
+    gaps = np.diff(seconds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        leverage = np.where(equity > 0, held / equity, 0)
+    span = seconds[-1] or 1
+    return dict(
+        exposure=float((leverage[:-1] * gaps).sum() / span),
+        time_in_market=float(gaps[holding].sum() / span),
+        turnover=turnover,
+    )
+
+
+def trade_stats(trades: Dict[str, object], bins: int = 20) -> dict:
+    closed = trades["status"] == CLOSE
+    pnl = trades["pnl"][closed]
+    wins, losses = pnl[pnl >= 0], pnl[pnl < 0]
+    profit, loss = wins.sum(), -losses.sum()
+    hist, edges = np.histogram(pnl, bins=bins) if len(pnl) \
+        else (np.zeros(0), np.zeros(0))
+    return dict(
+        trades=int(len(pnl)),
+        wins=int(len(wins)),
+        losses=int(len(losses)),
+        win_rate=float(len(wins) / len(pnl)) if len(pnl) else 0.0,
+        profit=float(profit),
+        loss=float(loss),
+        profit_factor=float(profit / loss) if loss else 0.0,
+        avg_win=float(wins.mean()) if len(wins) else 0.0,
+        avg_loss=float(losses.mean()) if len(losses) else 0.0,
+        expectancy=float(pnl.mean()) if len(pnl) else 0.0,
+        long=int((trades["pos_side"][closed] == LONG).sum()),
+        percentiles=dict(zip(
+            (5, 25, 50, 75, 95),
+            np.percentile(pnl, (5, 25, 50, 75, 95)).tolist()
+        )) if len(pnl) else dict(),
+        histogram=(hist, edges),
+    )
+
+
+def attribution(trades: Dict[str, object]) -> Dict[str, dict]:
+    closed = trades["status"] == CLOSE
+    if not closed.any():
+        return dict()
+    names, codes = _factorize(trades["instrument_id"][closed])
+    pnl, fee = trades["pnl"][closed], trades["commission"][closed]
+    net = np.bincount(codes, weights=pnl, minlength=len(names))
+    fees = np.bincount(codes, weights=fee, minlength=len(names))
+    count = np.bincount(codes, minlength=len(names))
+    wins = np.bincount(codes, weights=pnl >= 0, minlength=len(names))
+    total = np.abs(net).sum() or 1
+    return {
+        name: dict(
+            pnl=float(net[i]), commission=float(fees[i]),
+            trades=int(count[i]), win_rate=float(wins[i] / count[i]),
+            share=float(net[i] / total),
+        )
+        for i, name in enumerate(names)
+    }
+
+
+def build_report(
+    account: Dict[str, object], trades: Dict[str, object],
+    periods: int = BENCHMARK_PERIODS_PER_YEAR
+) -> dict:
+    _require_numpy()
+    portfolio = _Portfolio(account) if len(account["timestamp"]) else None
+    ts, equity = equity_curve(account, portfolio)
+    return dict(
+        start=ts[0].astype(datetime) if len(ts) else None,
+        end=ts[-1].astype(datetime) if len(ts) else None,
+        equity=equity,
+        returns=return_stats(ts, equity, periods),
+        drawdown=drawdown_stats(ts, equity),
+        exposure=exposure_stats(account, equity, portfolio),
+        trades=trade_stats(trades),
+        attribution=attribution(trades),
+    )
+
+
+def performance_report(
+    uid: str, start: datetime = None, end: datetime = None,
+    periods: int = BENCHMARK_PERIODS_PER_YEAR, currency: str = None
+) -> dict:
+    # 账户涉及多个保证金币种时必须指定 currency, 成交只统计该币种下的品种
+    account = load_account_columns(uid, start, end, currency)
+    trades = load_trade_columns(uid, start, end)
+    if currency:
+        keep = np.isin(trades["instrument_id"],
+                       list(set(account["instrument_id"].tolist())))
+        trades = {k: v[keep] for k, v in trades.items()}
+    return build_report(account, trades, periods)
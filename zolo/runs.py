@@ -28,6 +28,8 @@ from .utils import create_filter, create_timer, BYPASS_FILTER, \
     create_in_filter, \
     iterable
 from .engine import vtx
+from .indicators import ind_store, stop_workers
+from .indicators.vector import bar_columns, bar_key
 
 log = logging.getLogger(__name__)
 
@@ -68,6 +70,8 @@ class CryptoRunner:
         )
         evt_hub.attach_sink(Message, flt, evt_hub.gateways.on_message)
         evt_hub.attach_sink(Timer, BYPASS_FILTER, evt_hub.gateways.on_timer)
+        if ind_store.enabled:
+            evt_hub.attach_sink(Timer, BYPASS_FILTER, ind_store.on_timer)
         evt_hub.start_timer()
         evt_hub.start_zmq(self._pipe)
         
@@ -79,15 +83,42 @@ class CryptoRunner:
                 self._loop = False
         
         evt_hub.stop()
+        stop_workers()
+        ind_store.save()
         
         on_stop_cb = getattr(stg, ON_STOP, lambda: print("strategy on stop"))
         on_stop_cb()
 
 
+def replay(events: list):
+    yield from events
+    raise EOFError
+
+
 class BacktestRunner:
-    def __init__(self, datafeed: HybridDataFeed):
+    def __init__(self, datafeed: HybridDataFeed, precompute: bool = False):
         self._loop = True
         self._datafeed = iter(datafeed)
+        self._precompute = precompute
+    
+    def preload(self, stg: Strategy):
+        # 回测数据预先全部载入, 指标一次性向量化计算, 回放时只移动游标
+        events = list()
+        try:
+            for evt in self._datafeed:
+                events.append(evt)
+        except EOFError:
+            pass
+        columns = bar_columns(evt for evt in events if isinstance(evt, Bar))
+        for brk in stg.brokers:
+            for _, ind in brk.list_active_indicators():
+                if not callable(getattr(ind, "preload", None)):
+                    continue
+                key = bar_key(brk.exchange, brk.market, brk.instrument_id,
+                              getattr(ind, "granularity"))
+                if key in columns:
+                    ind.preload(columns[key])
+        self._datafeed = replay(events)
     
     def start(self, stg: Strategy):
         on_start_cb = getattr(stg, ON_START, lambda: print("strategy on start"))
@@ -116,6 +147,9 @@ class BacktestRunner:
         
         evt_hub.attach_sink(Tick, BYPASS_FILTER, vtx.on_tick)
         
+        if self._precompute:
+            self.preload(stg)
+        
         while self._loop:
             try:
                 while True:
@@ -8,7 +8,7 @@ from dataclasses import asdict
 from collections import Iterable
 from time import time
 import logging
-from typing import Union
+from typing import Union, List
 from uuid import uuid4
 
 from zolo.consts import UNIX_EPOCH
@@ -153,6 +153,25 @@ def clone_dataclass_object(obj, **kwargs):
     return type(obj)(**res)
 
 
+def pro_rata(total: float, weights: List[float], integral: bool = False
+             ) -> List[float]:
+    # 按权重分配数量, integral 时用最大余数法保证整数且总和不变
+    base = sum(weights)
+    if not base:
+        return [0] * len(weights)
+    shares = [total * w / base for w in weights]
+    if not integral:
+        return shares
+    res = [int(s) for s in shares]
+    left = int(round(total)) - sum(res)
+    order = sorted(
+        range(len(shares)), key=lambda i: shares[i] - res[i], reverse=True
+    )
+    for i in order[:left]:
+        res[i] += 1
+    return res
+
+
 def calc_entry_price(origin_price, origin_qty, price, amount) -> Decimal:
     origin_qty, amount = abs(origin_qty), abs(amount)
     res = (origin_price * origin_qty + price * amount) / (origin_qty + amount)